@@ -0,0 +1,135 @@
+"""
+Recall-vs-latency of the approximate job indexes against exact search on the same vectors.
+
+Run from embedding-service/:
+    python -m benchmarks.bench_ann --rows 20000 --queries 200 --k 10
+    python -m benchmarks.bench_ann --vectors-npy artifacts/job_vectors.npy
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.ann.evaluation import exact_top_k, recall_latency_report
+from src.ann.hnsw import HNSWIndex
+from src.ann.ivf import IVFIndex
+from src.ann.quantization import QuantizedIndex
+
+
+def synthetic_vectors(rows: int, dim: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """
+    Clustered, L2-normalized vectors; closer to real tower outputs than uniform noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    vectors = centers[rng.integers(0, clusters, rows)] + 0.5 * rng.standard_normal((rows, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def bench_hnsw(vectors: np.ndarray, queries: np.ndarray, exact: np.ndarray, args) -> dict:
+    index = HNSWIndex(dimension=vectors.shape[1], M=args.M, ef_construction=args.ef_construction)
+
+    started = time.perf_counter()
+    index.add([str(i) for i in range(len(vectors))], vectors)
+    index.flush()
+    build_seconds = time.perf_counter() - started
+
+    def search(q, k, ef):
+        return index.search_nodes(q, k, ef)[0]
+
+    return {
+        "index": "hnsw",
+        "M": args.M,
+        "ef_construction": args.ef_construction,
+        "build_seconds": round(build_seconds, 2),
+        "results": recall_latency_report(search, queries, exact, args.k, args.ef, "ef"),
+    }
+
+
+def bench_ivf(vectors: np.ndarray, queries: np.ndarray, exact: np.ndarray, args) -> dict:
+    index = IVFIndex(dimension=vectors.shape[1], nlist=args.nlist)
+
+    started = time.perf_counter()
+    index.train(vectors)
+    index.add([str(i) for i in range(len(vectors))], vectors)
+    build_seconds = time.perf_counter() - started
+
+    def search(q, k, nprobe):
+        return index.search_nodes(q, k, nprobe)[0]
+
+    return {
+        "index": "ivf",
+        "nlist": index.nlist,
+        "build_seconds": round(build_seconds, 2),
+        "results": recall_latency_report(search, queries, exact, args.k, args.nprobe, "nprobe"),
+    }
+
+
+def bench_quantized(kind: str):
+    def bench(vectors: np.ndarray, queries: np.ndarray, exact: np.ndarray, args) -> dict:
+        index = QuantizedIndex(dimension=vectors.shape[1], kind=kind, pq_m=args.pq_m)
+
+        started = time.perf_counter()
+        index.build([str(i) for i in range(len(vectors))], vectors)
+        build_seconds = time.perf_counter() - started
+
+        def search(q, k, rerank_factor):
+            index.rerank_factor = rerank_factor
+            return index.search_rows(q, k, rerank=rerank_factor > 0)[0]
+
+        return {
+            "index": kind,
+            "compression_ratio": index.compression_ratio,
+            "build_seconds": round(build_seconds, 2),
+            "results": recall_latency_report(search, queries, exact, args.k, args.rerank_factor, "rerank_factor"),
+        }
+    return bench
+
+
+BENCHES = {"hnsw": bench_hnsw, "ivf": bench_ivf, "int8": bench_quantized("int8"), "pq": bench_quantized("pq")}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors-npy", type=str, default=None, help="Use real job embeddings instead of synthetic ones")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--M", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--nlist", type=int, default=128)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--pq-m", type=int, default=64)
+    parser.add_argument("--rerank-factor", type=int, nargs="+", default=[0, 2, 4, 10])
+    parser.add_argument("--index", choices=sorted(BENCHES), nargs="+", default=sorted(BENCHES))
+    args = parser.parse_args()
+
+    if args.vectors_npy:
+        vectors = np.load(args.vectors_npy, mmap_mode="r").astype(np.float32)
+    else:
+        vectors = synthetic_vectors(args.rows, args.dim)
+
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    started = time.perf_counter()
+    exact = exact_top_k(queries, vectors, args.k)
+    exact_ms = 1000 * (time.perf_counter() - started) / len(queries)
+
+    report = {
+        "rows": len(vectors),
+        "dim": vectors.shape[1],
+        "k": args.k,
+        "exact_ms_per_query": round(exact_ms, 4),
+        "indexes": [BENCHES[name](vectors, queries, exact, args) for name in args.index],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
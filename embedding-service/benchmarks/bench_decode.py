@@ -0,0 +1,73 @@
+"""
+Decode cost of one job_embedding batch: the old tolist() path vs the Arrow path.
+
+Run from embedding-service/:
+    python -m benchmarks.bench_decode --rows 1024 --dim 1159 --repeats 20
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pyarrow as pa
+import torch
+
+from src.feature_reader import FeatureReader
+
+
+def make_batch(rows: int, dim: int, seed: int = 0) -> pa.Table:
+    rng = np.random.default_rng(seed)
+    values = pa.array(rng.standard_normal(rows * dim))
+    offsets = pa.array(np.arange(0, (rows + 1) * dim, dim, dtype=np.int32))
+    return pa.table({
+        "job_id": [f"job_{i}" for i in range(rows)],
+        "job_embedding": pa.ListArray.from_arrays(offsets, values),
+    })
+
+
+def decode_legacy(df) -> torch.Tensor:
+    # What _transform_to_tensors used to do on a pandas chunk
+    raw_features = np.array(df["job_embedding"].tolist())
+    return torch.tensor(raw_features, dtype=torch.float32)
+
+
+def decode_arrow(table: pa.Table) -> torch.Tensor:
+    return FeatureReader(source_path="")._transform_to_tensors(table)["tensors"]["job_input"]
+
+
+def time_it(fn, batch, repeats: int) -> float:
+    fn(batch)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(batch)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1024)
+    parser.add_argument("--dim", type=int, default=1159)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    table = make_batch(args.rows, args.dim)
+    df = table.to_pandas()  # the old reader already held a DataFrame, so keep this out of the timing
+
+    assert torch.equal(decode_legacy(df), decode_arrow(table))
+
+    legacy = time_it(decode_legacy, df, args.repeats)
+    arrow = time_it(decode_arrow, table, args.repeats)
+
+    print(json.dumps({
+        "rows": args.rows,
+        "dim": args.dim,
+        "legacy_ms": round(legacy * 1000, 3),
+        "arrow_ms": round(arrow * 1000, 3),
+        "speedup": round(legacy / arrow, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
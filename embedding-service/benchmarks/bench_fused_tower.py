@@ -0,0 +1,83 @@
+"""
+CPU throughput of the job tower before and after BatchNorm folding, plus a parity check.
+
+Run from embedding-service/:
+    python -m benchmarks.bench_fused_tower --batch-sizes 256 1024 4096
+"""
+import argparse
+import json
+import time
+
+import torch
+
+from src.inference_export import fuse_tower, verify_parity
+from src.two_tower_training.src_retriever.two_tower.retriver_model_archi import Tower
+
+
+def trained_like_tower(input_dim: int, hidden_dims, output_dim: int, seed: int = 0) -> Tower:
+    """
+    Random Tower whose BatchNorm running stats are populated by a few train-mode passes,
+    so folding is exercised with non-trivial mean/var (a fresh BN is the identity).
+    """
+    torch.manual_seed(seed)
+    tower = Tower(input_dim, hidden_dims, output_dim)
+    tower.train()
+    with torch.no_grad():
+        for _ in range(20):
+            tower(torch.randn(512, input_dim) * 2 + 0.5)
+    return tower.eval()
+
+
+@torch.inference_mode()
+def rows_per_second(module: torch.nn.Module, batch_size: int, input_dim: int, repeats: int) -> float:
+    x = torch.randn(batch_size, input_dim)
+    module(x)  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        module(x)
+    return batch_size * repeats / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input-dim", type=int, default=1159)
+    parser.add_argument("--hidden-dims", type=int, nargs="+", default=[512, 256])
+    parser.add_argument("--output-dim", type=int, default=256)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[64, 256, 1024, 4096])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    tower = trained_like_tower(args.input_dim, args.hidden_dims, args.output_dim)
+    fused = fuse_tower(tower)
+    max_diff = verify_parity(tower, fused, args.input_dim, rows=1024)
+
+    results = []
+    for batch_size in args.batch_sizes:
+        original_rps = rows_per_second(tower, batch_size, args.input_dim, args.repeats)
+        fused_rps = rows_per_second(fused, batch_size, args.input_dim, args.repeats)
+        results.append({
+            "batch_size": batch_size,
+            "original_rows_per_sec": round(original_rps),
+            "fused_rows_per_sec": round(fused_rps),
+            "speedup": round(fused_rps / original_rps, 3),
+        })
+
+    report = {
+        "input_dim": args.input_dim,
+        "hidden_dims": args.hidden_dims,
+        "output_dim": args.output_dim,
+        "threads": torch.get_num_threads(),
+        "original_layers": len(tower.mlp) + 1,
+        "fused_layers": len(fused),
+        "max_abs_diff": max_diff,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
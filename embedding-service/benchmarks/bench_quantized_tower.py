@@ -0,0 +1,76 @@
+"""
+Embedding drift, retrieval recall and CPU throughput of int8 (dynamically quantized) towers
+against float32 ones. Use it to decide whether to set inference_config.quantize_int8.
+
+Run from embedding-service/:
+    python -m benchmarks.bench_quantized_tower --rows 20000 --k 10
+    python -m benchmarks.bench_quantized_tower --features-parquet artifacts/job_features.parquet
+"""
+import argparse
+import json
+
+import torch
+
+from benchmarks.bench_fused_tower import rows_per_second, trained_like_tower
+from src.feature_reader import FeatureReader
+from src.inference_export import fuse_tower, quantization_report, quantize_tower
+from src.model_loader import TowerBundle
+
+
+def load_job_inputs(path: str, rows: int) -> torch.Tensor:
+    batches, total = [], 0
+    for batch in FeatureReader(path, batch_size=min(rows, 4096), streaming=True).stream_batches():
+        batches.append(batch["tensors"]["job_input"])
+        total += len(batches[-1])
+        if total >= rows:
+            break
+    return torch.cat(batches)[:rows]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--features-parquet", type=str, default=None, help="Real job features instead of random inputs")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--job-dim", type=int, default=1159)
+    parser.add_argument("--user-dim", type=int, default=783)
+    parser.add_argument("--hidden-dims", type=int, nargs="+", default=[512, 256])
+    parser.add_argument("--output-dim", type=int, default=256)
+    parser.add_argument("--fuse", action="store_true", help="Fold BatchNorm before quantizing, as ModelLoader does")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    towers = {
+        "job_tower": trained_like_tower(args.job_dim, args.hidden_dims, args.output_dim, seed=0),
+        "user_tower": trained_like_tower(args.user_dim, args.hidden_dims, args.output_dim, seed=1),
+    }
+    if args.fuse:
+        towers = {name: fuse_tower(tower) for name, tower in towers.items()}
+    original = TowerBundle(**towers)
+    quantized = TowerBundle(**{name: quantize_tower(tower) for name, tower in towers.items()})
+
+    if args.features_parquet:
+        job_inputs = load_job_inputs(args.features_parquet, args.rows)
+    else:
+        job_inputs = torch.randn(args.rows, args.job_dim)
+    user_inputs = torch.randn(args.queries, args.user_dim)
+
+    report = {
+        "job_source": args.features_parquet or "random",
+        "fused": args.fuse,
+        "job_to_job": quantization_report(original, quantized, job_inputs, k=args.k),
+        "user_to_job": quantization_report(original, quantized, job_inputs, user_inputs, k=args.k),
+        "throughput": {
+            "batch_size": args.batch_size,
+            "threads": torch.get_num_threads(),
+            "float32_rows_per_sec": round(rows_per_second(original.job_tower, args.batch_size, args.job_dim, args.repeats)),
+            "int8_rows_per_sec": round(rows_per_second(quantized.job_tower, args.batch_size, args.job_dim, args.repeats)),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Where embedding time goes: per-stage timings of FeatureReader, JobEmbedder and VectorWriter
+on a synthetic job-feature file, swept over batch sizes and torch thread counts.
+
+Every configuration runs in a fresh process so its peak RSS is its own. The writer sends
+to an in-memory fake store (optionally with a simulated round-trip latency).
+
+Run from embedding-service/:
+    python -m benchmarks.bench_stages --rows 50000 --batch-sizes 256 1024 4096 --threads 1 2 4
+    python -m benchmarks.bench_stages --output artifacts/bench_stages.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from benchmarks.bench_decode import make_batch
+
+
+def write_synthetic_features(path: str, rows: int, dim: int = 1159, row_group_size: int = 10000, seed: int = 0):
+    """
+    Writes a job-feature Parquet file (job_id, job_embedding list<double>) shaped like the
+    feature repo output, one row group at a time so memory stays flat for large files.
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    writer = None
+    try:
+        for start in range(0, rows, row_group_size):
+            table = make_batch(min(row_group_size, rows - start), dim, seed=seed + start)
+            ids = np.char.add("job_", np.arange(start, start + table.num_rows).astype(str))
+            table = table.set_column(0, "job_id", pa.array(ids.tolist()))
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table, row_group_size=row_group_size)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_config(path: str, batch_size: int, threads: int, args: Dict) -> Dict:
+    """
+    One configuration, meant to run in its own process. Stages run back to back per batch
+    so each one is timed in isolation; the pipelined figure runs them concurrently.
+    """
+    import torch
+
+    from src.embedder import JobEmbedder
+    from src.feature_reader import FeatureReader
+    from src.pipeline import EmbeddingPipeline
+    from src.two_tower_training.src_retriever.two_tower.retriver_model_archi import TwoTowerModel
+    from src.vector_store.memory_backend import InMemoryBackend
+    from src.vector_writer import VectorWriter
+
+    torch.set_num_threads(threads)
+    torch.manual_seed(0)
+    model = TwoTowerModel(user_dim=args["user_dim"], job_dim=args["dim"], output_dim=args["output_dim"])
+    embedder = JobEmbedder(model=model, device="cpu")
+
+    def new_writer():
+        return VectorWriter(
+            backend=InMemoryBackend(latency=args["store_latency"]),
+            dimension=args["output_dim"],
+            parallelism=args["upsert_parallelism"]
+        )
+
+    reader = FeatureReader(path, batch_size=batch_size, streaming=True)
+    writer = new_writer()
+    timings = {"read": 0.0, "embed": 0.0, "write": 0.0}
+    rows = 0
+    try:
+        batches = iter(reader.stream_batches())
+        while True:
+            started = time.perf_counter()
+            batch = next(batches, None)
+            timings["read"] += time.perf_counter() - started
+            if batch is None:
+                break
+
+            started = time.perf_counter()
+            ids, vectors = embedder.compute(batch)
+            timings["embed"] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            writer.upsert_batch(ids=ids, vectors=vectors)
+            timings["write"] += time.perf_counter() - started
+            rows += len(ids)
+    finally:
+        writer.close()
+
+    pipelined_writer = new_writer()
+    try:
+        pipeline = EmbeddingPipeline(
+            reader=FeatureReader(path, batch_size=batch_size, streaming=True),
+            embedder=embedder,
+            writer=pipelined_writer,
+            upsert_workers=args["upsert_workers"]
+        )
+        pipeline.run()
+    finally:
+        pipelined_writer.close()
+
+    sequential = sum(timings.values())
+    return {
+        "batch_size": batch_size,
+        "threads": threads,
+        "rows": rows,
+        "stages": {
+            name: {"seconds": round(seconds, 4), "rows_per_sec": round(rows / max(seconds, 1e-9))}
+            for name, seconds in timings.items()
+        },
+        "sequential_rows_per_sec": round(rows / max(sequential, 1e-9)),
+        "pipelined_rows_per_sec": round(rows / max(pipeline.wall_time, 1e-9)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def input_dim(path: str) -> int:
+    from src.feature_reader import FeatureReader
+
+    first = next(FeatureReader(path, batch_size=1, streaming=True).stream_batches())
+    return first["tensors"]["job_input"].shape[1]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--features-parquet", type=str, default=None, help="Benchmark an existing file instead of a synthetic one")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1159)
+    parser.add_argument("--row-group-size", type=int, default=10000)
+    parser.add_argument("--user-dim", type=int, default=783)
+    parser.add_argument("--output-dim", type=int, default=256)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[256, 1024, 4096])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--store-latency", type=float, default=0.0, help="Seconds per fake upsert call")
+    parser.add_argument("--upsert-parallelism", type=int, default=4)
+    parser.add_argument("--upsert-workers", type=int, default=2)
+    parser.add_argument("--work-dir", type=str, default="artifacts/bench")
+    parser.add_argument("--output", type=str, default=None, help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    path = args.features_parquet
+    if path is None:
+        path = os.path.join(args.work_dir, f"job_features_{args.rows}x{args.dim}.parquet")
+        if not os.path.exists(path):
+            started = time.perf_counter()
+            write_synthetic_features(path, args.rows, args.dim, args.row_group_size)
+            print(f"Wrote {path} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    shared = {
+        "dim": input_dim(path),
+        "user_dim": args.user_dim,
+        "output_dim": args.output_dim,
+        "store_latency": args.store_latency,
+        "upsert_parallelism": args.upsert_parallelism,
+        "upsert_workers": args.upsert_workers,
+    }
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for batch_size in args.batch_sizes:
+        for threads in args.threads:
+            # A fresh process per configuration: peak RSS is per process and never goes down
+            with context.Pool(1) as pool:
+                result = pool.apply(run_config, (path, batch_size, threads, shared))
+            print(f"batch_size={batch_size} threads={threads}: {result['pipelined_rows_per_sec']} rows/s", file=sys.stderr)
+            results.append(result)
+
+    report = {
+        "commit": git_commit(),
+        "source": path,
+        "rows": pq.ParquetFile(path).metadata.num_rows,
+        "dim": shared["dim"],
+        "store_latency": args.store_latency,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import argparse
+import dataclasses
 import os
 import logging
 import sys
@@ -8,7 +10,18 @@ from src.model_loader import ModelLoader
 from src.feature_reader import FeatureReader
 from src.embedder import JobEmbedder
 from src.vector_writer import VectorWriter
-from src.pc_embeds_index import IndexManager 
+from src.vector_store.factory import build_backend
+from src.vector_store.versioning import IndexAliases, VersionPublisher, version_namespace
+from src.pipeline import EmbeddingPipeline
+from src.embedding_manifest import EmbeddingManifest
+from src.checkpoint import EmbeddingCheckpoint
+from src.metrics import EmbeddingMetrics
+from src.tombstones import IndexIdSet, TombstoneSync
+from src.job_metadata import JobMetadataBuilder
+from src.embedding_export import EmbeddingExport
+from src.batch_tuner import build_batch_sizer
+from src.ann.builder import open_ann_index, open_quantized_index
+from src.sharded_runner import ShardedEmbeddingRunner, WorkerSettings, default_torch_threads
 
 from src.config.config_manager import ConfigurationManager
 
@@ -25,7 +38,7 @@ load_dotenv()
 
 
 
-def run_embedding_pipeline():
+def run_embedding_pipeline(force_full: bool = False):
     try:
         
         config_manager = ConfigurationManager()
@@ -34,36 +47,327 @@ def run_embedding_pipeline():
         ml_cfg = config_manager.get_mlflow_config()
         data_cfg = config_manager.get_data_config()
         pc_cfg = config_manager.get_pinecone_config()
+        pipeline_cfg = config_manager.get_pipeline_config()
+        upsert_cfg = config_manager.get_upsert_config()
+        manifest_cfg = config_manager.get_manifest_config()
+        store_cfg = config_manager.get_vector_store_config()
+        ann_cfg = config_manager.get_ann_config()
+        quant_cfg = config_manager.get_quantization_config()
+        inference_cfg = config_manager.get_inference_config()
+        sharding_cfg = config_manager.get_sharding_config()
+        checkpoint_cfg = config_manager.get_checkpoint_config()
+        metrics_cfg = config_manager.get_metrics_config()
+        versioning_cfg = config_manager.get_versioning_config()
+        tombstone_cfg = config_manager.get_tombstone_config()
+        metadata_cfg = config_manager.get_metadata_config()
+        export_cfg = config_manager.get_export_config()
+        batch_tuning_cfg = config_manager.get_batch_tuning_config()
+
+        # Taken from the un-namespaced paths, so garbage collection can find any version's files
+        local_artifacts = namespace_artifacts(manifest_cfg, checkpoint_cfg, ann_cfg, quant_cfg, export_cfg, tombstone_cfg)
+
+        if sharding_cfg.workers > 1:
+            run_sharded(
+                ml_cfg, data_cfg, pc_cfg, pipeline_cfg, upsert_cfg, store_cfg, inference_cfg, sharding_cfg,
+                versioning_cfg, tombstone_cfg, metadata_cfg, batch_tuning_cfg, local_artifacts
+            )
+            return
 
         logging.info("Initializing services with dynamic config...")
-        
-        
-        manager = IndexManager(api_key=pc_cfg.api_key, index_name=pc_cfg.index_name)
-        manager.ensure_index_exists(dimension=pc_cfg.dimension, metric=pc_cfg.metric)
 
     
         import mlflow
         mlflow.set_tracking_uri(ml_cfg.tracking_uri)
         
-        model_wrapper = ModelLoader(ml_cfg.model_name, ml_cfg.model_version)
+        model_wrapper = ModelLoader(
+            ml_cfg.model_name,
+            ml_cfg.model_version,
+            cache_dir=str(ml_cfg.cache_dir) if ml_cfg.cache_dir else None,
+            fuse=inference_cfg.fuse_batchnorm,
+            quantize=inference_cfg.quantize_int8
+        )
         model = model_wrapper.get_model()
-        
+        # A stage alias ("Production") moves to new models; everything keyed by the
+        # model (manifest, cursor, export, namespace) uses the concrete version behind it
+        model_version = model_wrapper.resolve_version()
+
+        # Blue-green: this model version's catalog goes to its own namespace, and every
+        # artifact tied to what was written there (manifest, cursor, local indexes) follows it
+        namespace = None
+        if versioning_cfg.enabled:
+            namespace = version_namespace(versioning_cfg.namespace_prefix, model_version)
+            logging.info(f"Writing catalog to namespace {namespace}")
+            manifest_cfg = dataclasses.replace(manifest_cfg, path=namespaced_path(manifest_cfg.path, namespace))
+            checkpoint_cfg = dataclasses.replace(checkpoint_cfg, path=namespaced_path(checkpoint_cfg.path, namespace))
+            ann_cfg = dataclasses.replace(ann_cfg, path=ann_cfg.path / namespace)
+            quant_cfg = dataclasses.replace(quant_cfg, path=quant_cfg.path / namespace)
+            export_cfg = dataclasses.replace(export_cfg, path=export_cfg.path / namespace)
+            tombstone_cfg = dataclasses.replace(tombstone_cfg, id_set_path=namespaced_path(tombstone_cfg.id_set_path, namespace))
+
+        backend = build_backend(store_cfg, pc_cfg, pool_threads=upsert_cfg.parallelism, namespace=namespace)
+
+        metrics = None
+        if metrics_cfg.enabled:
+            metrics = EmbeddingMetrics()
+            if metrics_cfg.http_port:
+                metrics.registry.serve(metrics_cfg.http_port)
+
+        checkpoint = None
+        start_row = 0
+        if checkpoint_cfg.enabled:
+            checkpoint = EmbeddingCheckpoint(
+                path=str(checkpoint_cfg.path),
+                source_path=str(data_cfg.source_path),
+                model_name=ml_cfg.model_name,
+                model_version=model_version
+            )
+            start_row = checkpoint.load(force_full=force_full or checkpoint_cfg.force_full)
+
+        batch_sizer = build_batch_sizer(batch_tuning_cfg, pipeline_cfg, metrics=metrics)
        
-        reader = FeatureReader(source_path=str(data_cfg.source_path), batch_size=data_cfg.batch_size)
-        embedder = JobEmbedder(model=model)
-        writer = VectorWriter(api_key=pc_cfg.api_key, index_name=pc_cfg.index_name)
+        reader = FeatureReader(
+            source_path=str(data_cfg.source_path),
+            batch_size=data_cfg.batch_size,
+            streaming=data_cfg.streaming,
+            start_row=start_row,
+            metrics=metrics,
+            batch_sizer=batch_sizer
+        )
+        embedder = JobEmbedder(model=model, metrics=metrics, batch_sizer=batch_sizer)
+        writer = VectorWriter(
+            backend=backend,
+            dimension=pc_cfg.dimension,
+            max_records_per_chunk=upsert_cfg.max_records_per_chunk,
+            max_payload_bytes=upsert_cfg.max_payload_bytes,
+            parallelism=upsert_cfg.parallelism,
+            max_retries=upsert_cfg.max_retries,
+            backoff_base=upsert_cfg.backoff_base,
+            backoff_max=upsert_cfg.backoff_max,
+            metrics=metrics
+        )
 
       
         logging.info(f"Starting batch embedding from {data_cfg.source_path}...")
-        for batch_count, batch in enumerate(reader.stream_batches()):
-            job_ids, vectors = embedder.compute(batch)
-            writer.upsert_batch(ids=job_ids, vectors=vectors)
-            logging.info(f"Processed batch {batch_count + 1} ({len(job_ids)} jobs)")
+        manifest = None
+        if manifest_cfg.enabled:
+            manifest = EmbeddingManifest(
+                path=str(manifest_cfg.path),
+                model_name=ml_cfg.model_name,
+                model_version=model_version
+            )
+
+        sinks = []
+        ann_index = None
+        if ann_cfg.enabled:
+            ann_index = open_ann_index(ann_cfg, dimension=pc_cfg.dimension, model_version=model_version)
+            sinks.append(ann_index)
+        quantized_index = None
+        if quant_cfg.enabled:
+            quantized_index = open_quantized_index(quant_cfg, dimension=pc_cfg.dimension, model_version=model_version)
+            sinks.append(quantized_index)
+        export = None
+        if export_cfg.enabled:
+            export = EmbeddingExport(
+                path=str(export_cfg.path),
+                dimension=pc_cfg.dimension,
+                model_name=ml_cfg.model_name,
+                model_version=model_version
+            )
+            sinks.append(export)
+        id_set, tombstones = None, None
+        if tombstone_cfg.enabled:
+            id_set = IndexIdSet(str(tombstone_cfg.id_set_path))
+            tombstones = TombstoneSync(
+                id_set=id_set,
+                writer=writer,
+                batch_size=tombstone_cfg.delete_batch_size,
+                max_delete_fraction=tombstone_cfg.max_delete_fraction,
+                manifest=manifest,
+                metrics=metrics,
+                indexes=[index for index in (ann_index, quantized_index) if index is not None]
+            )
+            if tombstone_cfg.seed_from_backend:
+                tombstones.seed_from_backend()
+            # Records ids as they are written, so even a failed run's writes are tracked
+            sinks.append(id_set)
+
+        metadata = None
+        if metadata_cfg.enabled:
+            # Location, remote flag and employment type ride along with each vector so retrieval can filter on them
+            metadata = JobMetadataBuilder(str(metadata_cfg.source_path))
+
+        pipeline = EmbeddingPipeline(
+            reader=reader,
+            embedder=embedder,
+            writer=writer,
+            queue_depth=pipeline_cfg.queue_depth,
+            embed_workers=pipeline_cfg.embed_workers,
+            upsert_workers=pipeline_cfg.upsert_workers,
+            manifest=manifest,
+            sinks=sinks,
+            checkpoint=checkpoint,
+            metrics=metrics,
+            metadata=metadata
+        )
+        source_ids = None
+        try:
+            pipeline.run()
+            # Only a finished run clears the cursor; a failed one resumes from it
+            if checkpoint is not None:
+                checkpoint.clear()
+
+            if tombstones is not None or namespace is not None or export is not None:
+                source_ids = reader.read_ids()
+            if tombstones is not None:
+                tombstones.sync(source_ids)
+            if namespace is not None:
+                publish_catalog(backend, namespace, source_ids, versioning_cfg, local_artifacts)
+        finally:
+            writer.close()
+            if id_set is not None:
+                id_set.save()
+            # Entries are only recorded after a successful upsert, so a partial run is safe to keep
+            if manifest is not None:
+                manifest.save()
+            if ann_index is not None:
+                ann_index.save(str(ann_cfg.path))
+            if quantized_index is not None:
+                # Also measures recall@10 against float32 and records it next to the index
+                quantized_index.save(str(quant_cfg.path))
+            if export is not None:
+                # After a failed run source_ids is None and every exported row is kept
+                export.save(live_ids=source_ids)
+                export.close()
+            if batch_sizer is not None:
+                batch_sizer.log_summary()
+            if metrics is not None:
+                metrics.log_summary()
+                if metrics_cfg.textfile_path:
+                    metrics.registry.write_textfile(str(metrics_cfg.textfile_path))
+                metrics.registry.shutdown()
         logging.info("Pipeline completed successfully.")
 
     except Exception as e:
         logging.error("An error occurred during the embedding pipeline execution.")
         raise RecommendationsystemDataServie(e, sys) from e
 
+def namespaced_path(path, namespace: str):
+    # artifacts/embedding_manifest.json -> artifacts/embedding_manifest.model-v3.json
+    return path.with_name(f"{path.stem}.{namespace}{path.suffix}")
+
+def namespace_artifacts(manifest_cfg, checkpoint_cfg, ann_cfg, quant_cfg, export_cfg, tombstone_cfg):
+    """
+    Returns a function giving the local files and directories written for a namespace.
+    """
+    def paths(namespace: str):
+        return [
+            namespaced_path(manifest_cfg.path, namespace),
+            namespaced_path(checkpoint_cfg.path, namespace),
+            namespaced_path(tombstone_cfg.id_set_path, namespace),
+            ann_cfg.path / namespace,
+            quant_cfg.path / namespace,
+            export_cfg.path / namespace,
+        ]
+    return paths
+
+def publish_catalog(backend, namespace, source_ids, versioning_cfg, local_artifacts=None):
+    """
+    Verifies the freshly written namespace, points the alias at it and drops old versions
+    along with their local artifacts.
+    """
+    publisher = VersionPublisher(
+        aliases=IndexAliases(str(versioning_cfg.aliases_path)),
+        alias=versioning_cfg.alias,
+        namespace_prefix=versioning_cfg.namespace_prefix,
+        keep_versions=versioning_cfg.keep_versions,
+        local_artifacts=local_artifacts
+    )
+    publisher.publish(
+        backend,
+        namespace,
+        source_ids,
+        sample_size=versioning_cfg.verify_sample,
+        timeout=versioning_cfg.verify_timeout
+    )
+
+def run_sharded(
+    ml_cfg, data_cfg, pc_cfg, pipeline_cfg, upsert_cfg, store_cfg, inference_cfg, sharding_cfg, versioning_cfg, tombstone_cfg,
+    metadata_cfg=None, batch_tuning_cfg=None, local_artifacts=None
+):
+    mlflow.set_tracking_uri(ml_cfg.tracking_uri)
+
+    # Resolve the version once and export the towers, so workers load from the local
+    # cache instead of each downloading the model
+    # (the shard state is keyed by the concrete version, never by a stage alias)
+    if ml_cfg.cache_dir:
+        model_version = ModelLoader(ml_cfg.model_name, ml_cfg.model_version, cache_dir=str(ml_cfg.cache_dir)).warm_cache()
+    else:
+        model_version = ModelLoader(ml_cfg.model_name, ml_cfg.model_version).resolve_version()
+
+    namespace = None
+    if versioning_cfg.enabled:
+        namespace = version_namespace(versioning_cfg.namespace_prefix, model_version)
+        tombstone_cfg = dataclasses.replace(tombstone_cfg, id_set_path=namespaced_path(tombstone_cfg.id_set_path, namespace))
+
+    logging.info(
+        f"Sharded embedding with {sharding_cfg.workers} workers; "
+        "the manifest, ANN and quantized index sinks and the embedding export are not used in this mode"
+    )
+    runner = ShardedEmbeddingRunner(
+        settings=WorkerSettings(
+            ml_cfg=ml_cfg,
+            data_cfg=data_cfg,
+            pc_cfg=pc_cfg,
+            pipeline_cfg=pipeline_cfg,
+            upsert_cfg=upsert_cfg,
+            store_cfg=store_cfg,
+            inference_cfg=inference_cfg,
+            model_version=model_version,
+            torch_threads=default_torch_threads(sharding_cfg.workers, sharding_cfg.torch_threads),
+            namespace=namespace,
+            metadata_cfg=metadata_cfg,
+            batch_tuning_cfg=batch_tuning_cfg
+        ),
+        workers=sharding_cfg.workers,
+        state_dir=str(sharding_cfg.state_dir),
+        shards_per_worker=sharding_cfg.shards_per_worker,
+        resume=sharding_cfg.resume
+    )
+    runner.run()
+    if namespace is None and not tombstone_cfg.enabled:
+        return
+
+    source_ids = FeatureReader(str(data_cfg.source_path)).read_ids()
+    backend = build_backend(store_cfg, pc_cfg, pool_threads=upsert_cfg.parallelism, namespace=namespace)
+    writer = VectorWriter(
+        backend=backend,
+        dimension=pc_cfg.dimension,
+        parallelism=upsert_cfg.parallelism,
+        max_retries=upsert_cfg.max_retries,
+        backoff_base=upsert_cfg.backoff_base,
+        backoff_max=upsert_cfg.backoff_max
+    )
+    try:
+        if tombstone_cfg.enabled:
+            id_set = IndexIdSet(str(tombstone_cfg.id_set_path))
+            tombstones = TombstoneSync(
+                id_set=id_set,
+                writer=writer,
+                batch_size=tombstone_cfg.delete_batch_size,
+                max_delete_fraction=tombstone_cfg.max_delete_fraction
+            )
+            if tombstone_cfg.seed_from_backend:
+                tombstones.seed_from_backend()
+            tombstones.sync(source_ids)
+            id_set.save()
+        if namespace is not None:
+            publish_catalog(backend, namespace, source_ids, versioning_cfg, local_artifacts)
+    finally:
+        writer.close()
+    logging.info("Sharded pipeline completed successfully.")
+
 if __name__ == "__main__":
-    run_embedding_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force-full", action="store_true", help="Ignore the resume checkpoint and embed from row 0")
+    args = parser.parse_args()
+    run_embedding_pipeline(force_full=args.force_full)
\ No newline at end of file
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from dotenv import load_dotenv
+
+from src.model_loader import ModelLoader
+from src.inference_export import tower_input_dim
+from src.embedding_export import ExportedCatalog
+from src.vector_store.versioning import version_namespace
+from src.serving.user_store import UserStore
+from src.user_topk import UserTopKBuilder
+
+from src.config.config_manager import ConfigurationManager
+
+from src.utils.logging import logging
+from src.utils.exception import RecommendationsystemDataServie
+
+load_dotenv()
+
+
+def run_precompute(full: bool = False):
+    try:
+        config_manager = ConfigurationManager()
+        ml_cfg = config_manager.get_mlflow_config()
+        inference_cfg = config_manager.get_inference_config()
+        versioning_cfg = config_manager.get_versioning_config()
+        export_cfg = config_manager.get_export_config()
+        serving_cfg = config_manager.get_serving_config()
+        precompute_cfg = config_manager.get_precompute_config()
+
+        import mlflow
+        mlflow.set_tracking_uri(ml_cfg.tracking_uri)
+
+        loader = ModelLoader(
+            ml_cfg.model_name,
+            ml_cfg.model_version,
+            cache_dir=str(ml_cfg.cache_dir) if ml_cfg.cache_dir else None,
+            towers=("user_tower",),
+            fuse=inference_cfg.fuse_batchnorm,
+            quantize=inference_cfg.quantize_int8
+        )
+        user_tower = loader.get_model().user_tower.eval()
+        model_version = loader.resolve_version()
+
+        # The job matrix comes from the embedding export of the same model version
+        export_path = export_cfg.path
+        if versioning_cfg.enabled:
+            export_path = export_path / version_namespace(versioning_cfg.namespace_prefix, model_version)
+        catalog = ExportedCatalog.open(str(export_path))
+        if catalog.model_version != str(model_version):
+            raise ValueError(
+                f"The embedding export at {export_path} is for model version {catalog.model_version}, "
+                f"not {model_version}; run the embedding pipeline with export_config enabled first"
+            )
+
+        users = UserStore(str(serving_cfg.user_features_path))
+        if tower_input_dim(user_tower) != users.input_dim:
+            raise ValueError(
+                f"user_tower expects {tower_input_dim(user_tower)} features but {serving_cfg.user_features_path} "
+                f"has {users.input_dim}"
+            )
+
+        @torch.inference_mode()
+        def embed(features: np.ndarray) -> np.ndarray:
+            return F.normalize(user_tower(torch.from_numpy(features)), p=2, dim=1).numpy()
+
+        builder = UserTopKBuilder(
+            path=str(precompute_cfg.path),
+            embed=embed,
+            catalog=catalog,
+            k=precompute_cfg.k,
+            embed_batch_size=precompute_cfg.embed_batch_size,
+            query_block=precompute_cfg.query_block,
+            catalog_block=precompute_cfg.catalog_block,
+            threads=precompute_cfg.threads or os.cpu_count() or 1
+        )
+        builder.build(list(users.index), users.features, full=full)
+
+    except Exception as e:
+        logging.error("An error occurred while precomputing user top-k jobs.")
+        raise RecommendationsystemDataServie(e, sys) from e
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="Recompute every user instead of only the changed ones")
+    args = parser.parse_args()
+    run_precompute(full=args.full)
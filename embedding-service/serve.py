@@ -0,0 +1,137 @@
+import asyncio
+import sys
+
+import torch
+from dotenv import load_dotenv
+
+from src.model_loader import ModelLoader
+from src.inference_export import tower_input_dim
+from src.vector_store.factory import build_backend
+from src.vector_store.versioning import resolve_live_namespace, version_namespace
+from src.metrics import ServingMetrics
+from src.serving.user_store import UserStore
+from src.serving.embedding_cache import UserEmbeddingCache
+from src.user_topk import UserTopKStore
+from src.serving.ranker_features import RankerFeatureBuilder
+from src.serving.recommender import BoosterRanker, LiveIndex, TwoStageRecommender
+from src.serving.http_server import RecommendationServer
+
+from src.config.config_manager import ConfigurationManager
+
+from src.utils.logging import logging
+from src.utils.exception import RecommendationsystemDataServie
+
+load_dotenv()
+
+
+def build_recommender(config_manager: ConfigurationManager, metrics=None) -> TwoStageRecommender:
+    ml_cfg = config_manager.get_mlflow_config()
+    pc_cfg = config_manager.get_pinecone_config()
+    store_cfg = config_manager.get_vector_store_config()
+    inference_cfg = config_manager.get_inference_config()
+    versioning_cfg = config_manager.get_versioning_config()
+    serving_cfg = config_manager.get_serving_config()
+    cache_cfg = config_manager.get_user_cache_config()
+    precompute_cfg = config_manager.get_precompute_config()
+
+    if store_cfg.backend != "local":
+        logging.warning(
+            f"Serving from the '{store_cfg.backend}' vector store; every request pays a network "
+            "round-trip. Use the local backend to stay within the latency budget"
+        )
+
+    # With a local cache and a numeric version the user tower loads without the registry
+    loader = ModelLoader(
+        ml_cfg.model_name,
+        ml_cfg.model_version,
+        cache_dir=str(ml_cfg.cache_dir) if ml_cfg.cache_dir else None,
+        towers=("user_tower",),
+        fuse=inference_cfg.fuse_batchnorm,
+        quantize=inference_cfg.quantize_int8
+    )
+    user_tower = loader.get_model().user_tower
+    model_version = loader.resolve_version()
+
+    user_store = UserStore(str(serving_cfg.user_features_path), str(serving_cfg.user_profiles_path))
+    if tower_input_dim(user_tower) != user_store.input_dim:
+        raise ValueError(
+            f"user_tower expects {tower_input_dim(user_tower)} features but {serving_cfg.user_features_path} "
+            f"has {user_store.input_dim}"
+        )
+
+    index = LiveIndex(
+        open_index=lambda namespace: build_backend(store_cfg, pc_cfg, namespace=namespace),
+        resolve=lambda: resolve_live_namespace(versioning_cfg)
+    )
+    if versioning_cfg.enabled and index.namespace != version_namespace(versioning_cfg.namespace_prefix, model_version):
+        logging.warning(
+            f"The live catalog is {index.namespace} but the user tower is version {model_version}; "
+            "their embeddings may not share a space"
+        )
+
+    cache = None
+    if cache_cfg.enabled:
+        cache = UserEmbeddingCache(
+            max_entries=cache_cfg.max_entries,
+            ttl_seconds=cache_cfg.ttl_seconds,
+            disk_path=str(cache_cfg.disk_path) if cache_cfg.disk_path else None,
+            metrics=metrics
+        )
+
+    precomputed = None
+    if precompute_cfg.enabled:
+        precomputed = UserTopKStore.open(str(precompute_cfg.path))
+        logging.info(f"Loaded precomputed top-{precomputed.k} jobs of {len(precomputed)} users")
+        if precomputed.k < serving_cfg.candidates:
+            logging.warning(
+                f"The precomputed store keeps {precomputed.k} jobs per user but retrieval hands "
+                f"{serving_cfg.candidates} to the ranker; it will not be used"
+            )
+
+    ranker = BoosterRanker(str(serving_cfg.ranker_path))
+    return TwoStageRecommender(
+        user_tower=user_tower,
+        index=index,
+        ranker=ranker,
+        ranker_features=RankerFeatureBuilder(str(serving_cfg.jobs_path), feature_names=ranker.feature_names),
+        user_store=user_store,
+        model_version=model_version,
+        candidates=serving_cfg.candidates,
+        max_top_k=serving_cfg.max_top_k,
+        max_candidates=serving_cfg.max_candidates,
+        cache=cache,
+        precomputed=precomputed,
+        metrics=metrics
+    )
+
+
+def run_server():
+    try:
+        config_manager = ConfigurationManager()
+        ml_cfg = config_manager.get_mlflow_config()
+        serving_cfg = config_manager.get_serving_config()
+
+        import mlflow
+        mlflow.set_tracking_uri(ml_cfg.tracking_uri)
+        torch.set_num_threads(serving_cfg.torch_threads)
+
+        metrics = ServingMetrics()
+        server = RecommendationServer(
+            build_recommender(config_manager, metrics=metrics),
+            host=serving_cfg.host,
+            port=serving_cfg.port,
+            executor_threads=serving_cfg.executor_threads,
+            refresh_interval=serving_cfg.refresh_interval,
+            batch_max_size=serving_cfg.batch_max_size,
+            batch_max_wait_ms=serving_cfg.batch_max_wait_ms,
+            metrics=metrics
+        )
+        asyncio.run(server.serve_forever())
+
+    except Exception as e:
+        logging.error("An error occurred in the recommendation service.")
+        raise RecommendationsystemDataServie(e, sys) from e
+
+
+if __name__ == "__main__":
+    run_server()
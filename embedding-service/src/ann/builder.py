@@ -0,0 +1,80 @@
+from typing import Optional
+
+from src.utils.logging import logging
+
+
+def _same_model(index, model_version: Optional[str], path) -> bool:
+    # Graph, centroids and codebooks all depend on the embedding space of the model that built them
+    if model_version is None or index.model_version == str(model_version):
+        return True
+    logging.info(
+        f"Index at {path} was built from model version {index.model_version}, not {model_version}; rebuilding"
+    )
+    return False
+
+
+def open_ann_index(ann_cfg, dimension: int, model_version: Optional[str] = None):
+    """
+    Opens the index at ann_cfg.path so new vectors are inserted incrementally,
+    or creates an empty one on the first run or when another model version built it.
+    """
+    if ann_cfg.index_type == "hnsw":
+        from src.ann.hnsw import HNSWIndex
+
+        if (ann_cfg.path / "meta.json").exists():
+            index = HNSWIndex.load(str(ann_cfg.path), mmap=False)
+            if _same_model(index, model_version, ann_cfg.path):
+                index.ef_search = ann_cfg.ef_search
+                return index
+
+        logging.info(f"Creating new HNSW index at {ann_cfg.path}")
+        return HNSWIndex(
+            dimension=dimension,
+            M=ann_cfg.M,
+            ef_construction=ann_cfg.ef_construction,
+            ef_search=ann_cfg.ef_search,
+            model_version=model_version
+        )
+
+    if ann_cfg.index_type == "ivf":
+        from src.ann.ivf import IVFIndex
+
+        if (ann_cfg.path / "meta.json").exists():
+            index = IVFIndex.load(str(ann_cfg.path), mmap=False)
+            if _same_model(index, model_version, ann_cfg.path):
+                index.nprobe = ann_cfg.nprobe
+                return index
+
+        logging.info(f"Creating new IVF index at {ann_cfg.path}")
+        # Centroids are trained afresh on the first vectors of this model
+        return IVFIndex(dimension=dimension, nlist=ann_cfg.nlist, nprobe=ann_cfg.nprobe, model_version=model_version)
+
+    raise ValueError(f"Unknown ANN index type '{ann_cfg.index_type}'")
+
+
+def open_quantized_index(quant_cfg, dimension: int, model_version: Optional[str] = None):
+    """
+    Opens the compressed catalog at quant_cfg.path (reusing its trained quantizer),
+    or creates an empty one on the first run or when another model version built it.
+    """
+    from src.ann.quantization import QuantizedIndex
+
+    if (quant_cfg.path / "meta.json").exists():
+        index = QuantizedIndex.load(str(quant_cfg.path), mmap=True)
+        if index.kind != quant_cfg.kind:
+            logging.info(f"Quantization kind changed from {index.kind} to {quant_cfg.kind}; rebuilding")
+        elif quant_cfg.rerank_factor > 0 and index.full_vectors is None:
+            logging.info("Re-ranking was switched on but the index keeps no float32 vectors; rebuilding")
+        elif _same_model(index, model_version, quant_cfg.path):
+            index.rerank_factor = quant_cfg.rerank_factor
+            if not index.rerank_factor:
+                index.drop_vectors()
+            return index
+
+    return QuantizedIndex(
+        dimension=dimension,
+        kind=quant_cfg.kind,
+        pq_m=quant_cfg.pq_m,
+        rerank_factor=quant_cfg.rerank_factor,
+        model_version=model_version
+    )
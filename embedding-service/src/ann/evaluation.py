@@ -0,0 +1,66 @@
+import time
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+def exact_top_k(queries: np.ndarray, vectors: np.ndarray, k: int, block_rows: int = 65536) -> np.ndarray:
+    """
+    Brute-force dot-product top-k, used as ground truth. Returns row indices of shape (n_queries, k), best first.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    k = min(k, len(vectors))
+
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+        scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+        rows = np.concatenate(
+            [best_rows, np.broadcast_to(np.arange(start, start + len(block)), (len(queries), len(block)))], axis=1
+        )
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_rows = np.take_along_axis(rows, top, axis=1)
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_rows, order, axis=1)
+
+
+def recall_at_k(approx: Sequence[Sequence], exact: Sequence[Sequence], k: int) -> float:
+    """
+    Mean fraction of the exact top-k that the approximate top-k also returned.
+    Works on row indices or ids, as long as both sides use the same kind.
+    """
+    hits, total = 0, 0
+    for approx_row, exact_row in zip(approx, exact):
+        truth = set(list(exact_row)[:k])
+        hits += len(truth.intersection(list(approx_row)[:k]))
+        total += len(truth)
+    return hits / max(total, 1)
+
+
+def recall_latency_report(
+    search: Callable[[np.ndarray, int, int], Sequence[Sequence]],
+    queries: np.ndarray,
+    exact: np.ndarray,
+    k: int,
+    settings: List[int],
+    setting_name: str,
+) -> List[Dict]:
+    """
+    Runs `search(queries, k, setting)` for every setting (ef, nprobe, ...) and returns
+    one row per setting with recall@k against `exact` and per-query latency.
+    `search` must return row indices comparable with `exact`.
+    """
+    report = []
+    for setting in settings:
+        started = time.perf_counter()
+        approx = search(queries, k, setting)
+        elapsed = time.perf_counter() - started
+        report.append({
+            setting_name: setting,
+            f"recall_at_{k}": round(recall_at_k(approx, exact, k), 4),
+            "ms_per_query": round(1000 * elapsed / max(len(queries), 1), 4),
+        })
+    return report
@@ -0,0 +1,397 @@
+import heapq
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.ann.storage import save_array, save_arrays, save_json
+from src.utils.logging import logging
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+class HNSWIndex:
+    """
+    Hierarchical Navigable Small World graph over job embeddings (Malkov & Yashunin).
+
+    Similarity is the dot product, which matches the L2-normalized outputs of
+    JobEmbedder and the `dotproduct` metric of the vector DB.
+
+    Storage:
+      vectors     (capacity, dim) float32
+      layer0      (capacity, 2*M) int32 neighbor lists, padded with -1
+      upper       level -> {node -> int32 neighbors}; only ~1/M of the nodes live above layer 0
+    Upserting an existing id tombstones the old node and inserts a new one; tombstoned
+    nodes still route searches but are never returned. Once they pass
+    `max_deleted_fraction` of the graph, it is rebuilt from the live nodes only.
+
+    add() only buffers the vectors; the graph is built by flush(), which save() and the
+    first search after an add call. As a pipeline sink the insertions (pure Python, the
+    slow part) therefore run once after the run instead of on the upsert stage.
+    Inserts are serialized by a lock; do not search while another thread is adding.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        M: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        initial_capacity: int = 1024,
+        seed: int = 42,
+        max_deleted_fraction: float = 0.25,
+        model_version: Optional[str] = None,
+    ):
+        """
+        :param M: Links per node on the upper layers (2*M on layer 0). Higher = better recall, more memory.
+        :param ef_construction: Candidate list size while inserting. Higher = better graph, slower build.
+        :param ef_search: Default candidate list size at query time. Must be >= k; trades latency for recall.
+        :param max_deleted_fraction: Share of tombstoned nodes above which flush() rebuilds the graph.
+        :param model_version: Model that produced the vectors; an index of another model is rebuilt, not extended.
+        """
+        self.dimension = dimension
+        self.model_version = model_version
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.level_mult = 1.0 / np.log(M)
+        self.max_deleted_fraction = max_deleted_fraction
+
+        self._reset(max(1, initial_capacity))
+        # id -> vector added since the last flush; the latest add of an id wins
+        self._pending: Dict[str, np.ndarray] = {}
+
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.id_to_node) + sum(1 for record_id in self._pending if record_id not in self.id_to_node)
+
+    def _reset(self, capacity: int):
+        self.capacity = capacity
+        self.vectors = np.zeros((self.capacity, self.dimension), dtype=np.float32)
+        self.layer0 = np.full((self.capacity, self.M0), -1, dtype=np.int32)
+        self.node_levels = np.zeros(self.capacity, dtype=np.int8)
+        self.deleted = np.zeros(self.capacity, dtype=bool)
+        self.upper: Dict[int, Dict[int, np.ndarray]] = {}
+
+        self.ids: List[str] = []
+        self.id_to_node: Dict[str, int] = {}
+        self.count = 0
+        self.entry_point = -1
+        self.max_level = -1
+
+    # ---- building ----
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        """
+        Buffers (new or replacing) vectors for the next flush(). Can be called again as new jobs arrive.
+        """
+        vectors = np.array(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of shape (n, {self.dimension}), got {vectors.shape}")
+
+        with self._lock:
+            for record_id, vector in zip(ids, vectors):
+                self._pending[str(record_id)] = vector
+
+    def flush(self):
+        """
+        Inserts the buffered vectors into the graph, or rebuilds it when the nodes they
+        replace would leave more than max_deleted_fraction of it tombstoned.
+        """
+        with self._lock:
+            self._flush_pending()
+
+    def delete(self, ids: Sequence[str]) -> int:
+        deleted = 0
+        with self._lock:
+            for record_id in map(str, ids):
+                pending = self._pending.pop(record_id, None)
+                node = self.id_to_node.pop(record_id, None)
+                if node is not None:
+                    self._ensure_capacity(self.count)
+                    self.deleted[node] = True
+                if node is not None or pending is not None:
+                    deleted += 1
+        return deleted
+
+    def _flush_pending(self):
+        pending, self._pending = self._pending, {}
+        replaced = sum(1 for record_id in pending if record_id in self.id_to_node)
+        # Every node no longer mapped from an id is a tombstone
+        dead = self.count - len(self.id_to_node) + replaced
+        if dead and dead > self.max_deleted_fraction * (self.count + len(pending)):
+            self._rebuild(pending, dead)
+        elif pending:
+            self._insert_all(pending)
+
+    def _rebuild(self, pending: Dict[str, np.ndarray], dead: int):
+        logging.info(f"Rebuilding HNSW graph without its {dead} tombstoned nodes ({self.count + len(pending)} in total)")
+        live = [(record_id, node) for record_id, node in self.id_to_node.items() if record_id not in pending]
+        ids = [record_id for record_id, _ in live] + list(pending)
+        vectors = np.concatenate([
+            np.asarray(self.vectors[[node for _, node in live]], dtype=np.float32).reshape(-1, self.dimension),
+            np.asarray(list(pending.values()), dtype=np.float32).reshape(-1, self.dimension),
+        ])
+        self._reset(max(1, len(ids)))
+        self._insert_all(dict(zip(ids, vectors)))
+
+    def _insert_all(self, items: Dict[str, np.ndarray]):
+        self._ensure_capacity(self.count + len(items))
+        for record_id, vector in items.items():
+            old = self.id_to_node.get(record_id)
+            if old is not None:
+                self.deleted[old] = True
+
+            node = self.count
+            self.count += 1
+            self.vectors[node] = vector
+            self.ids.append(record_id)
+            self.id_to_node[record_id] = node
+            self._insert(node)
+
+    def _insert(self, node: int):
+        q = self.vectors[node]
+        level = int(-np.log(max(self._rng.random(), 1e-12)) * self.level_mult)
+        self.node_levels[node] = level
+
+        if self.entry_point < 0:
+            self.entry_point, self.max_level = node, level
+            return
+
+        # Greedy descent through the layers above the new node's level
+        entry = [self.entry_point]
+        for layer in range(self.max_level, level, -1):
+            entry = [self._search_layer(q, entry, 1, layer)[0][1]]
+
+        for layer in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(q, entry, self.ef_construction, layer)
+            neighbors = self._select_neighbors(found, self.M)
+            self._set_neighbors(node, layer, neighbors)
+            for neighbor in neighbors:
+                self._link(neighbor, node, layer)
+            entry = [n for _, n in found]
+
+        if level > self.max_level:
+            self.entry_point, self.max_level = node, level
+
+    def _link(self, node: int, new: int, layer: int):
+        current = self._neighbors(node, layer)
+        max_links = self.M0 if layer == 0 else self.M
+
+        if len(current) < max_links:
+            self._set_neighbors(node, layer, np.append(current, new))
+            return
+
+        # Full: keep the most diverse max_links among the old links and the new one
+        candidates = np.append(current, new)
+        sims = self.vectors[candidates] @ self.vectors[node]
+        order = np.argsort(-sims)
+        ranked = [(float(sims[i]), int(candidates[i])) for i in order]
+        self._set_neighbors(node, layer, self._select_neighbors(ranked, max_links))
+
+    def _select_neighbors(self, ranked: List[Tuple[float, int]], m: int) -> List[int]:
+        """
+        Neighbor selection heuristic: walk candidates best first and keep one only if it is
+        closer to the base node than to every neighbor kept so far. This keeps links
+        spread across directions instead of clustering them.
+        """
+        selected: List[int] = []
+        for sim, candidate in ranked:
+            if len(selected) >= m:
+                break
+            if selected and float((self.vectors[selected] @ self.vectors[candidate]).max()) > sim:
+                continue
+            selected.append(candidate)
+        return selected
+
+    # ---- searching ----
+
+    def search(self, queries: np.ndarray, k: int = 10, ef: Optional[int] = None) -> Tuple[List[List[str]], np.ndarray]:
+        """
+        Top-k search for a batch of queries.
+        :return: (ids per query, scores of shape (n_queries, k) padded with -inf)
+        """
+        nodes, scores = self.search_nodes(queries, k, ef)
+        ids = [[self.ids[n] for n in row if n >= 0] for row in nodes]
+        return ids, scores
+
+    def search_nodes(self, queries: np.ndarray, k: int = 10, ef: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Same as search() but returns internal node numbers (row order of insertion), padded with -1.
+        """
+        if self._pending:
+            self.flush()
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        ef = max(ef or self.ef_search, k)
+
+        nodes = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        if self.entry_point < 0:
+            return nodes, scores
+
+        for i, q in enumerate(queries):
+            entry = [self.entry_point]
+            for layer in range(self.max_level, 0, -1):
+                entry = [self._search_layer(q, entry, 1, layer)[0][1]]
+
+            found = [(s, n) for s, n in self._search_layer(q, entry, ef, 0) if not self.deleted[n]][:k]
+            for j, (s, n) in enumerate(found):
+                nodes[i, j] = n
+                scores[i, j] = s
+        return nodes, scores
+
+    def _search_layer(self, q: np.ndarray, entry: List[int], ef: int, layer: int) -> List[Tuple[float, int]]:
+        """
+        Best-first search on one layer. Returns up to ef (similarity, node) pairs, best first.
+        """
+        visited = set(entry)
+        entry_sims = (self.vectors[entry] @ q).tolist()
+        candidates = [(-s, n) for s, n in zip(entry_sims, entry)]  # max-heap on similarity
+        results = [(s, n) for s, n in zip(entry_sims, entry)]  # min-heap holding the best ef
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if -neg_sim < results[0][0] and len(results) >= ef:
+                break
+
+            fresh = [n for n in self._neighbors(node, layer).tolist() if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+
+            for s, n in zip((self.vectors[fresh] @ q).tolist(), fresh):
+                if len(results) < ef or s > results[0][0]:
+                    heapq.heappush(candidates, (-s, n))
+                    heapq.heappush(results, (s, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    # ---- graph storage ----
+
+    def _neighbors(self, node: int, layer: int) -> np.ndarray:
+        if layer == 0:
+            row = self.layer0[node]
+            return row[row >= 0]
+        return self.upper.get(layer, {}).get(node, _EMPTY)
+
+    def _set_neighbors(self, node: int, layer: int, neighbors):
+        neighbors = np.asarray(neighbors, dtype=np.int32)
+        if layer == 0:
+            self.layer0[node] = -1
+            self.layer0[node, :len(neighbors)] = neighbors
+        else:
+            self.upper.setdefault(layer, {})[node] = neighbors
+
+    def _ensure_capacity(self, needed: int):
+        """
+        Grows the arrays, and turns read-only memory-mapped arrays into writable ones
+        the first time an index loaded with mmap=True is modified.
+        """
+        writable = self.vectors.flags.writeable and self.layer0.flags.writeable and self.deleted.flags.writeable
+        if needed <= self.capacity and writable:
+            return
+
+        capacity = max(needed, self.capacity * 2 if needed > self.capacity else self.capacity)
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        layer0 = np.full((capacity, self.M0), -1, dtype=np.int32)
+        node_levels = np.zeros(capacity, dtype=np.int8)
+        deleted = np.zeros(capacity, dtype=bool)
+
+        vectors[:self.count] = self.vectors[:self.count]
+        layer0[:self.count] = self.layer0[:self.count]
+        node_levels[:self.count] = self.node_levels[:self.count]
+        deleted[:self.count] = self.deleted[:self.count]
+
+        self.vectors, self.layer0, self.node_levels, self.deleted = vectors, layer0, node_levels, deleted
+        self.capacity = capacity
+
+    # ---- persistence ----
+
+    def save(self, path: str):
+        self.flush()
+        out = Path(path)
+        out.mkdir(parents=True, exist_ok=True)
+
+        # Readers may have vectors.npy and layer0.npy memory-mapped; every file is replaced, never rewritten
+        save_array(out / "vectors.npy", self.vectors[:self.count])
+        save_array(out / "layer0.npy", self.layer0[:self.count])
+        save_array(out / "node_levels.npy", self.node_levels[:self.count])
+        save_array(out / "deleted.npy", self.deleted[:self.count])
+
+        upper_nodes, upper_layers, upper_links = [], [], []
+        for layer, nodes in self.upper.items():
+            for node, neighbors in nodes.items():
+                padded = np.full(self.M, -1, dtype=np.int32)
+                padded[:len(neighbors)] = neighbors
+                upper_nodes.append(node)
+                upper_layers.append(layer)
+                upper_links.append(padded)
+        save_arrays(
+            out / "upper.npz",
+            nodes=np.asarray(upper_nodes, dtype=np.int32),
+            layers=np.asarray(upper_layers, dtype=np.int8),
+            links=np.asarray(upper_links, dtype=np.int32).reshape(-1, self.M),
+        )
+
+        save_json(out / "ids.json", self.ids)
+        meta = {
+            "model_version": self.model_version,
+            "dimension": self.dimension,
+            "M": self.M,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+            "count": self.count,
+            "entry_point": self.entry_point,
+            "max_level": self.max_level,
+        }
+        # Last, so a crash mid-save never points meta.json at arrays that were not written
+        save_json(out / "meta.json", meta)
+        logging.info(f"Saved HNSW index with {len(self)} vectors to {out}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "HNSWIndex":
+        """
+        :param mmap: Memory-map the vectors and layer-0 links instead of reading them,
+                     so opening a large index is near-instant and pages load on demand.
+        """
+        src = Path(path)
+        with open(src / "meta.json", "r") as f:
+            meta = json.load(f)
+
+        index = cls(
+            dimension=meta["dimension"],
+            M=meta["M"],
+            ef_construction=meta["ef_construction"],
+            ef_search=meta["ef_search"],
+            initial_capacity=1,
+            model_version=meta.get("model_version"),
+        )
+        mode = "r" if mmap else None
+        index.vectors = np.load(src / "vectors.npy", mmap_mode=mode)
+        index.layer0 = np.load(src / "layer0.npy", mmap_mode=mode)
+        index.node_levels = np.load(src / "node_levels.npy")
+        index.deleted = np.load(src / "deleted.npy")
+        index.count = index.capacity = meta["count"]
+        index.entry_point = meta["entry_point"]
+        index.max_level = meta["max_level"]
+
+        upper = np.load(src / "upper.npz")
+        for node, layer, links in zip(upper["nodes"].tolist(), upper["layers"].tolist(), upper["links"]):
+            index.upper.setdefault(layer, {})[node] = links[links >= 0]
+
+        with open(src / "ids.json", "r") as f:
+            index.ids = json.load(f)
+        index.id_to_node = {
+            record_id: node for node, record_id in enumerate(index.ids) if not index.deleted[node]
+        }
+        logging.info(f"Loaded HNSW index with {len(index)} vectors from {src} (mmap={mmap})")
+        return index
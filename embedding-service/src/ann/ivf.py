@@ -0,0 +1,336 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.ann.storage import save_array, save_json
+from src.utils.logging import logging
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 20, seed: int = 42) -> np.ndarray:
+    """
+    k-means on the unit sphere: points go to the centroid with the highest dot product
+    and centroids are re-normalized after every update. Matches dot-product retrieval
+    on L2-normalized embeddings.
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n_clusters = min(n_clusters, len(vectors))
+
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=n_clusters)
+
+        # Re-seed empty clusters with random points so every list stays usable
+        empty = np.nonzero(counts == 0)[0]
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), size=len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Inverted-file index: k-means centroids partition the catalog into `nlist` lists and a
+    query only scans the `nprobe` lists whose centroids score highest.
+
+    Each list holds a contiguous float32 block, so scanning it is one matrix product.
+    add() and delete() only append chunks to a list and note removed nodes; a list is
+    consolidated into one block again before it is searched or saved, so a catalog
+    build copies every vector once instead of once per batch. A replaced or deleted id
+    leaves a dead node behind; save() renumbers the live nodes and drops the dead ones,
+    so nightly re-embeds don't grow the index.
+    Until the index is trained, add() buffers vectors; training happens automatically
+    once `train_size` vectors have arrived (or explicitly via train()).
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        nlist: int = 256,
+        nprobe: int = 8,
+        train_size: Optional[int] = None,
+        n_iter: int = 20,
+        seed: int = 42,
+        model_version: Optional[str] = None,
+    ):
+        """
+        :param nlist: Number of k-means partitions. ~sqrt(catalog size) is a good start.
+        :param nprobe: Lists scanned per query. Higher = better recall, slower.
+        :param train_size: Vectors to buffer before auto-training (default 39 * nlist).
+        :param model_version: Model that produced the vectors; an index of another model is rebuilt, not extended.
+        """
+        self.dimension = dimension
+        self.model_version = model_version
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size or 39 * nlist
+        self.n_iter = n_iter
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.list_vectors: List[np.ndarray] = []
+        self.list_nodes: List[np.ndarray] = []
+        # Appended since the last consolidation, per list: (vectors, nodes) chunks
+        self._list_chunks: List[List[Tuple[np.ndarray, np.ndarray]]] = []
+        self._removed_nodes: Set[int] = set()
+        self._dirty_lists: Set[int] = set()
+
+        self.ids: List[str] = []
+        self.id_to_node: Dict[str, int] = {}
+        self.node_list: Dict[int, int] = {}
+
+        self._pending_ids: List[str] = []
+        self._pending_vectors: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.id_to_node) + sum(len(v) for v in self._pending_vectors)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    # ---- building ----
+
+    def train(self, vectors: np.ndarray):
+        with self._lock:
+            self._train(np.asarray(vectors, dtype=np.float32))
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of shape (n, {self.dimension}), got {vectors.shape}")
+
+        with self._lock:
+            if not self.is_trained:
+                self._pending_ids.extend(str(i) for i in ids)
+                self._pending_vectors.append(vectors.copy())
+                if sum(len(v) for v in self._pending_vectors) >= self.train_size:
+                    self._flush_pending()
+                return
+            self._add(list(ids), vectors)
+
+    def delete(self, ids: Sequence[str]) -> int:
+        with self._lock:
+            if not self.is_trained:
+                self._flush_pending()
+            nodes = [self.id_to_node.pop(str(i)) for i in ids if str(i) in self.id_to_node]
+            self._remove_nodes(nodes)
+        return len(nodes)
+
+    def _flush_pending(self):
+        if not self._pending_vectors:
+            return
+        vectors = np.concatenate(self._pending_vectors)
+        ids = self._pending_ids
+        self._pending_ids, self._pending_vectors = [], []
+        if not self.is_trained:
+            self._train(vectors)
+        self._add(ids, vectors)
+
+    def _train(self, vectors: np.ndarray):
+        self.centroids = spherical_kmeans(vectors, self.nlist, self.n_iter, self.seed)
+        self.nlist = len(self.centroids)
+        self.list_vectors = [np.empty((0, self.dimension), dtype=np.float32) for _ in range(self.nlist)]
+        self.list_nodes = [np.empty(0, dtype=np.int64) for _ in range(self.nlist)]
+        self._list_chunks = [[] for _ in range(self.nlist)]
+        self._removed_nodes, self._dirty_lists = set(), set()
+        logging.info(f"Trained IVF centroids: nlist={self.nlist} on {len(vectors)} vectors")
+
+    def _add(self, ids: List[str], vectors: np.ndarray):
+        # An id repeated within the batch keeps its last vector
+        last = {str(record_id): row for row, record_id in enumerate(ids)}
+        if len(last) != len(ids):
+            rows = sorted(last.values())
+            ids, vectors = [ids[row] for row in rows], vectors[rows]
+
+        replaced = [self.id_to_node[str(i)] for i in ids if str(i) in self.id_to_node]
+        self._remove_nodes(replaced)
+
+        nodes = np.arange(len(self.ids), len(self.ids) + len(ids), dtype=np.int64)
+        for node, record_id in zip(nodes.tolist(), ids):
+            self.ids.append(str(record_id))
+            self.id_to_node[str(record_id)] = node
+
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+        for list_no in np.unique(assignment).tolist():
+            rows = np.nonzero(assignment == list_no)[0]
+            self._list_chunks[list_no].append((vectors[rows], nodes[rows]))
+            self._dirty_lists.add(list_no)
+            for node in nodes[rows].tolist():
+                self.node_list[node] = list_no
+
+    def _remove_nodes(self, nodes: List[int]):
+        for node in nodes:
+            self._dirty_lists.add(self.node_list.pop(node))
+            self._removed_nodes.add(node)
+
+    def _consolidate(self):
+        """
+        Merges each changed list's chunks into one block and drops its removed nodes.
+        """
+        removed = np.fromiter(self._removed_nodes, dtype=np.int64, count=len(self._removed_nodes))
+        for list_no in self._dirty_lists:
+            chunks = self._list_chunks[list_no]
+            vectors = np.concatenate([self.list_vectors[list_no]] + [v for v, _ in chunks])
+            nodes = np.concatenate([self.list_nodes[list_no]] + [n for _, n in chunks])
+            if len(removed):
+                keep = ~np.isin(nodes, removed)
+                vectors, nodes = vectors[keep], nodes[keep]
+            self.list_vectors[list_no], self.list_nodes[list_no] = vectors, nodes
+            self._list_chunks[list_no] = []
+        self._removed_nodes, self._dirty_lists = set(), set()
+
+    def _compact(self):
+        """
+        Renumbers the live nodes 0..n-1 and forgets the ids of replaced and deleted ones.
+        Call on consolidated lists only.
+        """
+        dead = len(self.ids) - len(self.id_to_node)
+        if not dead:
+            return
+        live = np.fromiter(sorted(self.node_list), dtype=np.int64, count=len(self.node_list))
+        remap = np.full(len(self.ids), -1, dtype=np.int64)
+        remap[live] = np.arange(len(live), dtype=np.int64)
+
+        self.ids = [self.ids[node] for node in live.tolist()]
+        self.list_nodes = [remap[nodes] for nodes in self.list_nodes]
+        self.node_list = {int(remap[node]): list_no for node, list_no in self.node_list.items()}
+        self.id_to_node = {record_id: int(remap[node]) for record_id, node in self.id_to_node.items()}
+        logging.info(f"Compacted IVF index: dropped {dead} dead nodes, {len(live)} live")
+
+    # ---- searching ----
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> Tuple[List[List[str]], np.ndarray]:
+        nodes, scores = self.search_nodes(queries, k, nprobe)
+        ids = [[self.ids[n] for n in row if n >= 0] for row in nodes]
+        return ids, scores
+
+    def search_nodes(self, queries: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns insertion-order node numbers of shape (n_queries, k), padded with -1, and their scores.
+        Queries are grouped per probed list so each list is scanned with a single matrix product.
+        """
+        with self._lock:
+            if not self.is_trained:
+                self._flush_pending()
+            if self._dirty_lists:
+                self._consolidate()
+
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_queries = len(queries)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+
+        nodes = np.full((n_queries, k), -1, dtype=np.int64)
+        scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+        if not self.is_trained or n_queries == 0:
+            return nodes, scores
+
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        part_scores: List[List[np.ndarray]] = [[] for _ in range(n_queries)]
+        part_nodes: List[List[np.ndarray]] = [[] for _ in range(n_queries)]
+        for list_no in np.unique(probes).tolist():
+            list_vectors = self.list_vectors[list_no]
+            if not len(list_vectors):
+                continue
+            query_rows = np.nonzero((probes == list_no).any(axis=1))[0]
+            block = queries[query_rows] @ list_vectors.T
+
+            keep = min(k, block.shape[1])
+            top = np.argpartition(-block, keep - 1, axis=1)[:, :keep]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            top_nodes = self.list_nodes[list_no][top]
+            for j, q in enumerate(query_rows.tolist()):
+                part_scores[q].append(top_scores[j])
+                part_nodes[q].append(top_nodes[j])
+
+        for q in range(n_queries):
+            if not part_scores[q]:
+                continue
+            q_scores = np.concatenate(part_scores[q])
+            q_nodes = np.concatenate(part_nodes[q])
+            order = np.argsort(-q_scores)[:k]
+            nodes[q, :len(order)] = q_nodes[order]
+            scores[q, :len(order)] = q_scores[order]
+        return nodes, scores
+
+    # ---- persistence ----
+
+    def save(self, path: str):
+        with self._lock:
+            if not self.is_trained:
+                self._flush_pending()
+            if self._dirty_lists:
+                self._consolidate()
+            self._compact()
+
+            out = Path(path)
+            out.mkdir(parents=True, exist_ok=True)
+
+            # Lists are stored back to back; offsets[i]:offsets[i+1] is list i
+            sizes = [len(v) for v in self.list_vectors]
+            offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+            vectors = np.concatenate(self.list_vectors) if sizes else np.empty((0, self.dimension), np.float32)
+            nodes = np.concatenate(self.list_nodes) if sizes else np.empty(0, np.int64)
+
+            # Readers may have list_vectors.npy memory-mapped; every file is replaced, never rewritten
+            save_array(out / "centroids.npy", self.centroids if self.is_trained else np.empty((0, self.dimension), np.float32))
+            save_array(out / "list_vectors.npy", vectors)
+            save_array(out / "list_nodes.npy", nodes)
+            save_array(out / "list_offsets.npy", offsets)
+            save_json(out / "ids.json", self.ids)
+
+            meta = {
+                "index_type": "ivf",
+                "model_version": self.model_version,
+                "dimension": self.dimension,
+                "nlist": self.nlist,
+                "nprobe": self.nprobe,
+            }
+            # Last, so a crash mid-save never points meta.json at arrays that were not written
+            save_json(out / "meta.json", meta)
+        logging.info(f"Saved IVF index with {len(self.id_to_node)} vectors to {out}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "IVFIndex":
+        src = Path(path)
+        with open(src / "meta.json", "r") as f:
+            meta = json.load(f)
+
+        index = cls(
+            dimension=meta["dimension"], nlist=meta["nlist"], nprobe=meta["nprobe"], model_version=meta.get("model_version")
+        )
+        centroids = np.load(src / "centroids.npy")
+        if not len(centroids):
+            return index
+
+        mode = "r" if mmap else None
+        vectors = np.load(src / "list_vectors.npy", mmap_mode=mode)
+        nodes = np.load(src / "list_nodes.npy")
+        offsets = np.load(src / "list_offsets.npy")
+
+        index.centroids = centroids
+        # Views into the (possibly memory-mapped) block; consolidation replaces a list with an in-memory copy
+        index.list_vectors = [vectors[offsets[i]:offsets[i + 1]] for i in range(len(centroids))]
+        index.list_nodes = [nodes[offsets[i]:offsets[i + 1]] for i in range(len(centroids))]
+        index._list_chunks = [[] for _ in range(len(centroids))]
+        for list_no, list_nodes in enumerate(index.list_nodes):
+            for node in list_nodes.tolist():
+                index.node_list[node] = list_no
+
+        with open(src / "ids.json", "r") as f:
+            index.ids = json.load(f)
+        index.id_to_node = {index.ids[node]: node for node in index.node_list}
+        logging.info(f"Loaded IVF index with {len(index)} vectors from {src} (mmap={mmap})")
+        return index
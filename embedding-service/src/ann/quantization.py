@@ -0,0 +1,463 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.ann.evaluation import exact_top_k, recall_at_k
+from src.ann.storage import save_array, save_arrays, save_json
+from src.utils.logging import logging
+
+
+class ScalarQuantizer:
+    """
+    Per-dimension int8 quantization: each dimension's [min, max] range is mapped to 256 levels.
+    4x smaller than float32.
+    """
+
+    def __init__(self):
+        self.offset: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+    @property
+    def code_bytes_per_dim(self) -> float:
+        return 1.0
+
+    def train(self, vectors: np.ndarray):
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        self.offset = ((low + high) / 2).astype(np.float32)
+        self.scale = (np.maximum(high - low, 1e-12) / 255.0).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self.offset) / self.scale)
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale + self.offset
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Asymmetric dot products: queries stay float32, only the catalog is quantized.
+        q . (c * scale + offset) = (q * scale) . c + q . offset, so the codes are never decoded.
+        """
+        return (queries * self.scale) @ codes.T.astype(np.float32) + (queries @ self.offset)[:, None]
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"offset": self.offset, "scale": self.scale}
+
+    def load_state(self, state):
+        self.offset, self.scale = state["offset"], state["scale"]
+
+
+class ProductQuantizer:
+    """
+    Splits each vector into `m` sub-vectors and replaces every sub-vector with the id of its
+    nearest of 256 k-means centroids, so a vector costs `m` bytes. With dimension 256 and
+    m=64 that is 16x smaller than float32.
+    """
+
+    def __init__(self, dimension: int, m: int = 64, n_iter: int = 10, seed: int = 42):
+        if dimension % m:
+            raise ValueError(f"dimension {dimension} is not divisible by m={m}")
+        self.dimension = dimension
+        self.m = m
+        self.sub_dim = dimension // m
+        self.n_iter = n_iter
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None  # (m, 256, sub_dim)
+
+    @property
+    def code_bytes_per_dim(self) -> float:
+        return self.m / self.dimension
+
+    def train(self, vectors: np.ndarray, max_train: int = 16384):
+        # 256 centroids per sub-space converge long before the full catalog is seen
+        if len(vectors) > max_train:
+            rng = np.random.default_rng(self.seed)
+            vectors = vectors[rng.choice(len(vectors), size=max_train, replace=False)]
+
+        books = np.zeros((self.m, 256, self.sub_dim), dtype=np.float32)
+        for j in range(self.m):
+            sub = vectors[:, j * self.sub_dim:(j + 1) * self.sub_dim]
+            centers = _kmeans(sub, 256, self.n_iter, self.seed + j)
+            books[j, :len(centers)] = centers
+        self.codebooks = books
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            sub = vectors[:, j * self.sub_dim:(j + 1) * self.sub_dim]
+            codes[:, j] = _nearest(sub, self.codebooks[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.concatenate([self.codebooks[j][codes[:, j]] for j in range(self.m)], axis=1)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Asymmetric distance computation: one (m, 256) lookup table of sub-vector dot
+        products per query, then every catalog score is a sum of m table lookups.
+        """
+        sub_queries = queries.reshape(len(queries), self.m, self.sub_dim)
+        # (m, 256, n_queries): gathering whole rows of query scores per code is ~10x
+        # faster than gathering one column per query
+        tables = np.ascontiguousarray(np.einsum("qms,mcs->mcq", sub_queries, self.codebooks), dtype=np.float32)
+
+        scores = np.zeros((len(codes), len(queries)), dtype=np.float32)
+        for j in range(self.m):
+            scores += tables[j][codes[:, j]]
+        return scores.T
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+    def load_state(self, state):
+        self.codebooks = state["codebooks"]
+
+
+class QuantizedIndex:
+    """
+    Compressed copy of the job catalog for local retrieval.
+
+    Search scans the int8 / PQ codes with asymmetric scoring, then (optionally) re-ranks
+    the best `rerank_factor * k` candidates with the full-precision vectors. The float32
+    vectors are only kept and saved when re-ranking is on, and as they are only touched
+    for that re-rank, they stay memory-mapped on disk. Codes and vectors grow by doubling
+    their capacity, so adding batch after batch copies each row a constant number of times.
+
+    Like IVFIndex, add() buffers vectors until the quantizer is trained (automatically
+    after `train_size` vectors, or on save/build); later adds are encoded with the
+    existing quantizer so nightly deltas don't retrain it.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        kind: str = "int8",
+        pq_m: int = 64,
+        rerank_factor: int = 4,
+        train_size: int = 50000,
+        model_version: Optional[str] = None,
+    ):
+        """
+        :param kind: "int8" (scalar, 4x smaller) or "pq" (product quantization, 32/pq_m x smaller).
+        :param rerank_factor: Candidates re-scored in float32 per requested result; 0 disables re-ranking.
+        :param train_size: Vectors to buffer before training the quantizer.
+        :param model_version: Model that produced the vectors; an index of another model is rebuilt, not extended.
+        """
+        if kind == "int8":
+            self.quantizer = ScalarQuantizer()
+        elif kind == "pq":
+            self.quantizer = ProductQuantizer(dimension, m=pq_m)
+        else:
+            raise ValueError(f"Unknown quantization kind '{kind}', expected 'int8' or 'pq'")
+
+        self.kind = kind
+        self.dimension = dimension
+        self.model_version = model_version
+        self.rerank_factor = rerank_factor
+        self.train_size = train_size
+        self.trained = False
+
+        # Both have spare capacity past len(ids); full vectors only when re-ranking
+        self._codes: Optional[np.ndarray] = None
+        self._vectors: Optional[np.ndarray] = None
+        self.ids: List[str] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.last_recall: Dict[str, float] = {}
+
+        self._pending_ids: List[str] = []
+        self._pending_vectors: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids) + sum(len(v) for v in self._pending_vectors)
+
+    @property
+    def compression_ratio(self) -> float:
+        return 4.0 / self.quantizer.code_bytes_per_dim
+
+    @property
+    def codes(self) -> Optional[np.ndarray]:
+        return None if self._codes is None else self._codes[:len(self.ids)]
+
+    @property
+    def full_vectors(self) -> Optional[np.ndarray]:
+        return None if self._vectors is None else self._vectors[:len(self.ids)]
+
+    def drop_vectors(self):
+        """
+        Forgets the float32 vectors, e.g. when re-ranking is switched off for an existing index.
+        """
+        with self._lock:
+            self._vectors = None
+
+    # ---- building ----
+
+    def build(self, ids: Sequence[str], vectors: np.ndarray):
+        """
+        Trains the quantizer on the given catalog and encodes it in one go.
+        """
+        with self._lock:
+            self._pending_ids = [str(i) for i in ids]
+            self._pending_vectors = [np.asarray(vectors, dtype=np.float32)]
+            self._flush_pending()
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of shape (n, {self.dimension}), got {vectors.shape}")
+
+        with self._lock:
+            if not self.trained:
+                self._pending_ids.extend(str(i) for i in ids)
+                self._pending_vectors.append(vectors.copy())
+                if sum(len(v) for v in self._pending_vectors) >= self.train_size:
+                    self._flush_pending()
+                return
+            self._add([str(i) for i in ids], vectors)
+
+    def _flush_pending(self):
+        if not self._pending_vectors:
+            return
+        vectors = np.concatenate(self._pending_vectors)
+        ids = self._pending_ids
+        self._pending_ids, self._pending_vectors = [], []
+
+        if not self.trained:
+            self.quantizer.train(vectors)
+            self.trained = True
+            self._codes = self.quantizer.encode(vectors[:0])
+            self._vectors = vectors[:0] if self.rerank_factor > 0 else None
+            logging.info(f"Trained {self.kind} quantizer on {len(vectors)} vectors")
+            if self._vectors is None:
+                # Nothing float32 is kept afterwards, so recall is measured while the vectors are at hand
+                self.last_recall = self._recall_on(vectors)
+                logging.info(f"{self.kind} index recall vs float32 on the training vectors: {self.last_recall}")
+        self._add(ids, vectors)
+
+    def _add(self, ids: List[str], vectors: np.ndarray):
+        codes = self.quantizer.encode(vectors)
+        fresh = set(ids) - self.id_to_row.keys()
+        self._ensure_capacity(len(self.ids) + len(fresh))
+
+        for i, record_id in enumerate(ids):
+            row = self.id_to_row.get(record_id)
+            if row is None:
+                row = self.id_to_row[record_id] = len(self.ids)
+                self.ids.append(record_id)
+            self._codes[row] = codes[i]
+            if self._vectors is not None:
+                self._vectors[row] = vectors[i]
+
+    def _ensure_capacity(self, needed: int):
+        """
+        Grows the arrays geometrically, and turns read-only memory-mapped arrays into
+        writable ones the first time a loaded index is modified.
+        """
+        capacity = len(self._codes)
+        writable = self._codes.flags.writeable and (self._vectors is None or self._vectors.flags.writeable)
+        if needed <= capacity and writable:
+            return
+
+        capacity = max(needed, 2 * capacity if needed > capacity else capacity, 1024)
+        count = len(self.ids)
+        codes = np.empty((capacity,) + self._codes.shape[1:], dtype=self._codes.dtype)
+        codes[:count] = self._codes[:count]
+        self._codes = codes
+        if self._vectors is not None:
+            vectors = np.empty((capacity, self.dimension), dtype=np.float32)
+            vectors[:count] = self._vectors[:count]
+            self._vectors = vectors
+
+    def delete(self, ids: Sequence[str]) -> int:
+        """
+        Removes the given ids. The last row moves into each freed row, so the arrays stay
+        dense and nothing is re-encoded.
+        """
+        gone = {str(i) for i in ids}
+        deleted = set()
+        with self._lock:
+            if self._pending_ids and gone & set(self._pending_ids):
+                keep = [i for i, record_id in enumerate(self._pending_ids) if record_id not in gone]
+                deleted.update(gone & set(self._pending_ids))
+                vectors = np.concatenate(self._pending_vectors)
+                self._pending_ids = [self._pending_ids[i] for i in keep]
+                self._pending_vectors = [vectors[keep]]
+
+            rows = [self.id_to_row.pop(record_id) for record_id in gone if record_id in self.id_to_row]
+            if rows:
+                self._ensure_capacity(len(self.ids))
+            # Highest first, so the row moved into a freed slot is never one still to be deleted
+            for row in sorted(rows, reverse=True):
+                last = len(self.ids) - 1
+                deleted.add(self.ids[row])
+                if row != last:
+                    moved = self.ids[last]
+                    self.ids[row] = moved
+                    self.id_to_row[moved] = row
+                    self._codes[row] = self._codes[last]
+                    if self._vectors is not None:
+                        self._vectors[row] = self._vectors[last]
+                self.ids.pop()
+        return len(deleted)
+
+    # ---- searching ----
+
+    def search_rows(self, queries: np.ndarray, k: int = 10, rerank: bool = True, block_rows: int = 16384) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            if not self.trained:
+                self._flush_pending()
+
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        rerank = rerank and self.rerank_factor > 0 and self._vectors is not None
+        depth = min(len(self.ids), k * self.rerank_factor if rerank else k)
+        k = min(k, depth)
+
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.ids), block_rows):
+            block = self.quantizer.scores(queries, self.codes[start:start + block_rows])
+            scores = np.concatenate([best_scores, block], axis=1)
+            rows = np.concatenate(
+                [best_rows, np.broadcast_to(np.arange(start, start + block.shape[1]), block.shape)], axis=1
+            )
+            top = np.argpartition(-scores, depth - 1, axis=1)[:, :depth]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+
+        if rerank and depth:
+            candidates = np.asarray(self.full_vectors[best_rows.ravel()]).reshape(*best_rows.shape, self.dimension)
+            best_scores = np.einsum("qd,qcd->qc", queries, candidates)
+
+        order = np.argsort(-best_scores, axis=1)[:, :k]
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def search(self, queries: np.ndarray, k: int = 10, rerank: bool = True) -> Tuple[List[List[str]], np.ndarray]:
+        rows, scores = self.search_rows(queries, k, rerank)
+        return [[self.ids[r] for r in row] for row in rows], scores
+
+    def measure_recall(self, queries: Optional[np.ndarray] = None, k: int = 10, sample: int = 256, seed: int = 0) -> Dict[str, float]:
+        """
+        Recall@k of the compressed index against exact float32 search, with and without re-ranking.
+        Without explicit queries, a random sample of catalog vectors is used. Needs the
+        float32 vectors, which are only kept with re-ranking on; otherwise the recall
+        measured on the training vectors is returned.
+        """
+        if self.full_vectors is None:
+            return self.last_recall
+        if queries is None:
+            rng = np.random.default_rng(seed)
+            rows = rng.choice(len(self.ids), size=min(sample, len(self.ids)), replace=False)
+            queries = np.asarray(self.full_vectors[np.sort(rows)])
+
+        exact = exact_top_k(queries, self.full_vectors, k)
+        report = {f"recall_at_{k}_adc": round(recall_at_k(self.search_rows(queries, k, rerank=False)[0], exact, k), 4)}
+        if self.rerank_factor > 0:
+            report[f"recall_at_{k}_reranked"] = round(recall_at_k(self.search_rows(queries, k, rerank=True)[0], exact, k), 4)
+        self.last_recall = report
+        return report
+
+    def _recall_on(self, vectors: np.ndarray, k: int = 10, sample: int = 256, seed: int = 0) -> Dict[str, float]:
+        """
+        ADC recall@k within `vectors` alone, for an index that does not keep them.
+        """
+        rng = np.random.default_rng(seed)
+        queries = vectors[np.sort(rng.choice(len(vectors), size=min(sample, len(vectors)), replace=False))]
+        exact = exact_top_k(queries, vectors, k)
+        scores = self.quantizer.scores(queries, self.quantizer.encode(vectors))
+        approx = np.argsort(-scores, axis=1)[:, :k]
+        return {f"recall_at_{k}_adc": round(recall_at_k(approx, exact, k), 4)}
+
+    # ---- persistence ----
+
+    def save(self, path: str, measure_recall: bool = True):
+        """
+        :param measure_recall: Measure recall@10 against float32 first and store it in meta.json.
+        """
+        with self._lock:
+            self._flush_pending()
+        if not self.trained:
+            logging.info(f"Quantized index is empty; nothing saved to {path}")
+            return
+        if measure_recall and len(self.ids) and self.full_vectors is not None:
+            logging.info(f"{self.kind} index recall vs float32: {self.measure_recall()}")
+
+        out = Path(path)
+        out.mkdir(parents=True, exist_ok=True)
+        save_array(out / "codes.npy", self.codes)
+        if self.full_vectors is not None:
+            save_array(out / "vectors.npy", self.full_vectors)
+        else:
+            (out / "vectors.npy").unlink(missing_ok=True)
+        save_arrays(out / "quantizer.npz", **self.quantizer.state())
+        save_json(out / "ids.json", self.ids)
+
+        meta = {
+            "kind": self.kind,
+            "model_version": self.model_version,
+            "dimension": self.dimension,
+            "pq_m": getattr(self.quantizer, "m", None),
+            "rerank_factor": self.rerank_factor,
+            "has_vectors": self.full_vectors is not None,
+            "compression_ratio": self.compression_ratio,
+            "recall": self.last_recall,
+        }
+        # Last, so a crash mid-save never points meta.json at arrays that were not written
+        save_json(out / "meta.json", meta)
+        logging.info(f"Saved {self.kind} index with {len(self)} vectors to {out}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "QuantizedIndex":
+        """
+        :param mmap: Leave the float32 vectors on disk; re-ranking reads only a few rows per query.
+        """
+        src = Path(path)
+        with open(src / "meta.json", "r") as f:
+            meta = json.load(f)
+
+        index = cls(
+            dimension=meta["dimension"],
+            kind=meta["kind"],
+            pq_m=meta["pq_m"] or 64,
+            rerank_factor=meta["rerank_factor"],
+            model_version=meta.get("model_version"),
+        )
+        index.quantizer.load_state(np.load(src / "quantizer.npz"))
+        index.trained = True
+        index._codes = np.load(src / "codes.npy")
+        if meta.get("has_vectors", True):
+            index._vectors = np.load(src / "vectors.npy", mmap_mode="r" if mmap else None)
+        index.last_recall = meta.get("recall", {})
+        with open(src / "ids.json", "r") as f:
+            index.ids = json.load(f)
+        index.id_to_row = {record_id: row for row, record_id in enumerate(index.ids)}
+        return index
+
+
+def _kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int, seed: int) -> np.ndarray:
+    """
+    Plain (euclidean) k-means for PQ sub-spaces.
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = _nearest(vectors, centroids)
+        counts = np.bincount(assignment, minlength=n_clusters)
+        # bincount per dimension is far faster than np.add.at for the small PQ sub-spaces
+        sums = np.stack(
+            [np.bincount(assignment, weights=vectors[:, d], minlength=n_clusters) for d in range(vectors.shape[1])],
+            axis=1,
+        )
+        empty = counts == 0
+        centroids = np.where(empty[:, None], centroids, sums / np.maximum(counts, 1)[:, None])
+    return centroids.astype(np.float32)
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin ||v - c||^2 = argmin (||c||^2 - 2 v.c)
+    distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+    return np.argmin(distances, axis=1)
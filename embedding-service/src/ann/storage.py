@@ -0,0 +1,34 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+def save_array(path: Path, array: np.ndarray):
+    """
+    Writes an .npy file through a temp file and os.replace. A reader (or the index being
+    saved) may have the current file memory-mapped; truncating it in place would pull the
+    pages out from under that mapping.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.asarray(array))
+    os.replace(tmp_path, path)
+
+
+def save_arrays(path: Path, **arrays: np.ndarray):
+    """
+    Same as save_array for an .npz archive.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def save_json(path: Path, payload):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
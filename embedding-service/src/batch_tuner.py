@@ -0,0 +1,236 @@
+import os
+import statistics
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+from src.utils.logging import logging
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    Resident set size of this process right now, or None where it cannot be read.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 2**20
+
+
+class AdaptiveBatchSizer:
+    """
+    Picks the reader's batch size from measured forward-pass throughput instead of a fixed value.
+
+    probing: starting at `min_size`, each candidate size runs `probe_batches` batches and
+             the size doubles while the median rows/sec improves by more than `min_gain`,
+             up to `max_size` or the memory cap. The best size is kept.
+    tuned:   the per-row latency at the chosen size is tracked over the last `drift_window`
+             batches. If their median drifts more than `drift_tolerance` from what the probe
+             measured (other load on the box, thermal throttling, a different mix of rows), the
+             neighbours of the current size are probed again and the best of the three is kept.
+             Using a median over a full window keeps single slow batches (a GC pause, the
+             reader holding the GIL) from triggering a re-probe.
+
+    The memory cap is on this process's RSS. Before moving to a larger size the growth is
+    projected from the bytes per row observed so far times the batches in flight, and the
+    size is halved straight away whenever RSS goes over the cap.
+
+    The reader asks next_size() before cutting each batch and the embedder reports every
+    forward pass to observe(). Batches already queued when the size changes were cut at the
+    old size, so observations are attributed to the size the batch was cut at. Throughput is
+    per row actually embedded: with the embedding manifest on, most batches lose their
+    unchanged rows before the forward pass, and a batch is still a sample of its cut size.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 128,
+        max_size: int = 16384,
+        probe_batches: int = 5,
+        min_gain: float = 0.05,
+        drift_tolerance: float = 0.25,
+        drift_window: int = 20,
+        max_rss_mb: Optional[float] = None,
+        in_flight: int = 1,
+        metrics=None,
+    ):
+        """
+        :param probe_batches: Batches measured per candidate size; their median is used.
+        :param min_gain: Relative rows/sec improvement needed to keep doubling.
+        :param drift_tolerance: Relative change of per-row latency that triggers a re-probe.
+        :param drift_window: Batches whose median latency is compared with the probe.
+        :param max_rss_mb: Memory cap for this process. None disables the memory check.
+        :param in_flight: Batches alive at once (queued, embedding, being written), for the memory projection.
+        :param metrics: EmbeddingMetrics; the current size goes to embedding_batch_size.
+        """
+        if not 0 < min_size <= max_size:
+            raise ValueError("Expected 0 < min_size <= max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.probe_batches = max(1, probe_batches)
+        self.min_gain = min_gain
+        self.drift_tolerance = drift_tolerance
+        self.drift_window = max(1, drift_window)
+        self.max_rss_mb = max_rss_mb
+        self.in_flight = max(1, in_flight)
+        self.metrics = metrics
+
+        self.size = min_size
+        self.phase = "probing"
+        self._candidates: List[int] = [min_size]
+        self._samples: Dict[int, List[float]] = {}  # size -> rows/sec of each measured batch
+        self._results: Dict[int, float] = {}  # size -> median rows/sec of its probe
+        self._baseline: Optional[float] = None  # seconds/row at the chosen size
+        self._recent: deque = deque(maxlen=self.drift_window)  # seconds/row of the latest batches
+        self._bytes_per_row = 0.0
+        self._rss_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+        if self.max_rss_mb is not None and current_rss_mb() is None:
+            logging.warning("Cannot read this process's RSS here; adaptive batch sizing runs without the memory cap")
+            self.max_rss_mb = None
+        self._set_size(min_size)
+
+    def next_size(self) -> int:
+        with self._lock:
+            return self.size
+
+    def observe(self, rows: int, seconds: float, size: Optional[int] = None):
+        """
+        Records one forward pass of `rows` rows that took `seconds`.
+        :param size: Batch size the reader cut the batch at; defaults to `rows`.
+        """
+        if rows <= 0 or seconds <= 0:
+            return
+        rss = current_rss_mb() if self.max_rss_mb is not None else None
+
+        with self._lock:
+            if rss is not None and rss > self.max_rss_mb and self.size > self.min_size:
+                self._over_cap(rss)
+                return
+            if (size or rows) != self.size:
+                # A batch cut before the last change, or the short last batch of the source
+                return
+
+            if rss is not None:
+                self._track_memory(rss)
+            if self.phase == "probing":
+                self._probe(rows / seconds)
+            else:
+                self._track_drift(seconds / rows)
+
+    def log_summary(self):
+        best = self._results.get(self.size)
+        rate = f", {best:.0f} rows/s when probed" if best else ""
+        logging.info(f"Adaptive batch size settled at {self.size} rows{rate} ({self.phase})")
+
+    # ---- decisions ----
+
+    def _probe(self, rows_per_second: float):
+        samples = self._samples.setdefault(self.size, [])
+        samples.append(rows_per_second)
+        if len(samples) < self.probe_batches:
+            return
+
+        self._results[self.size] = statistics.median(samples)
+        logging.info(f"Batch size probe: {self.size} rows -> {self._results[self.size]:.0f} rows/s")
+
+        larger = self.size * 2
+        improving = all(self._results[self.size] > (1 + self.min_gain) * rate
+                        for size, rate in self._results.items() if size < self.size)
+        if self.size == self._candidates[-1] and improving and larger <= self.max_size and self._fits(larger):
+            self._candidates.append(larger)
+
+        pending = [size for size in self._candidates if size not in self._results]
+        if pending:
+            self._set_size(pending[0])
+            return
+
+        best = max(self._results, key=self._results.get)
+        self.phase = "tuned"
+        self._baseline = 1.0 / self._results[best]
+        self._recent.clear()
+        self._set_size(best)
+        logging.info(f"Adaptive batch size: chose {best} rows at {self._results[best]:.0f} rows/s")
+
+    def _track_drift(self, seconds_per_row: float):
+        self._recent.append(seconds_per_row)
+        if len(self._recent) < self.drift_window:
+            return
+        current = statistics.median(self._recent)
+        drift = current / self._baseline - 1.0
+        if abs(drift) <= self.drift_tolerance:
+            return
+
+        logging.info(
+            f"Forward latency at batch size {self.size} drifted {drift:+.0%} "
+            f"({1.0 / current:.0f} rows/s); probing neighbouring sizes"
+        )
+        neighbours = [self.size // 2, self.size, self.size * 2]
+        self._candidates = [
+            size for size in neighbours
+            if self.min_size <= size <= self.max_size and (size <= self.size or self._fits(size))
+        ]
+        self._samples, self._results = {}, {}
+        self.phase = "probing"
+        self._set_size(self._candidates[0])
+
+    def _over_cap(self, rss: float):
+        smaller = max(self.size // 2, self.min_size)
+        logging.warning(f"RSS {rss:.0f}MB is over the {self.max_rss_mb:.0f}MB cap; batch size {self.size} -> {smaller}")
+        # Never probe above this size again; re-measure it before settling
+        self.max_size = smaller
+        self._candidates, self._samples, self._results = [smaller], {}, {}
+        self.phase = "probing"
+        self._set_size(smaller)
+
+    # ---- memory ----
+
+    def _track_memory(self, rss: float):
+        self._rss_at.setdefault(self.size, rss)
+        sizes = sorted(self._rss_at)
+        if len(sizes) >= 2 and sizes[-1] > sizes[0]:
+            growth = (self._rss_at[sizes[-1]] - self._rss_at[sizes[0]]) * 2**20
+            per_row = growth / ((sizes[-1] - sizes[0]) * self.in_flight)
+            self._bytes_per_row = max(self._bytes_per_row, per_row)
+
+    def _fits(self, size: int) -> bool:
+        if self.max_rss_mb is None:
+            return True
+        rss = current_rss_mb()
+        projected = rss + (size - self.size) * self.in_flight * self._bytes_per_row / 2**20
+        if projected > self.max_rss_mb:
+            logging.info(f"Batch size {size} would take RSS to ~{projected:.0f}MB, over the {self.max_rss_mb:.0f}MB cap")
+            return False
+        return True
+
+    def _set_size(self, size: int):
+        self.size = size
+        if self.metrics is not None:
+            self.metrics.batch_size.set(size)
+
+
+def build_batch_sizer(tuning_cfg, pipeline_cfg, metrics=None) -> Optional[AdaptiveBatchSizer]:
+    """
+    The sizer for a pipeline run with `pipeline_cfg`, or None when adaptive sizing is off.
+    """
+    if not tuning_cfg.enabled:
+        return None
+    return AdaptiveBatchSizer(
+        min_size=tuning_cfg.min_batch_size,
+        max_size=tuning_cfg.max_batch_size,
+        probe_batches=tuning_cfg.probe_batches,
+        min_gain=tuning_cfg.min_gain,
+        drift_tolerance=tuning_cfg.drift_tolerance,
+        drift_window=tuning_cfg.drift_window,
+        max_rss_mb=tuning_cfg.max_rss_mb,
+        # Both queues full, plus one batch in every embed and upsert worker
+        in_flight=2 * pipeline_cfg.queue_depth + pipeline_cfg.embed_workers + pipeline_cfg.upsert_workers,
+        metrics=metrics
+    )
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict
+
+from src.utils.commons import file_fingerprint
+from src.utils.logging import logging
+
+
+class EmbeddingCheckpoint:
+    """
+    Persists how far into the source file a run has written its vectors, so a failed
+    run restarts from there instead of from row 0.
+
+    The pipeline numbers batches as it reads them and reports each one once its vectors
+    are written. Upsert workers finish out of order, so the cursor only advances over the
+    contiguous prefix of written batches: every row before it is known to be written.
+    The cursor is tied to the source file fingerprint and the model version; if either
+    changed it is ignored. A run that finishes clears it, so the next run is a full one.
+    """
+
+    def __init__(self, path: str, source_path: str, model_name: str, model_version: str):
+        self.path = Path(path)
+        self.key = {
+            "source": file_fingerprint(source_path),
+            "model_name": model_name,
+            "model_version": str(model_version),
+        }
+        self.row_offset = 0
+
+        # batch number -> end row, for batches read but not yet written
+        self._pending: Dict[int, int] = {}
+        self._written: Dict[int, int] = {}
+        self._next_batch = 0
+        self._lock = threading.Lock()
+
+    def load(self, force_full: bool = False) -> int:
+        """
+        Returns the row to resume from (0 for a full run).
+        """
+        self.row_offset = 0
+        if force_full:
+            logging.info("Full run forced; ignoring any embedding checkpoint.")
+            self.clear()
+            return 0
+        if not self.path.exists():
+            return 0
+
+        with open(self.path, "r") as f:
+            payload = json.load(f)
+        if payload.get("key") != self.key:
+            logging.info(f"Checkpoint {self.path} is for another source file or model version; starting from row 0.")
+            return 0
+
+        self.row_offset = int(payload["row_offset"])
+        logging.info(f"Resuming from checkpoint at row {self.row_offset}")
+        return self.row_offset
+
+    def track(self, batch_no: int, end_row: int):
+        """
+        Registers a batch as read. Batches must be numbered 0, 1, 2, ... in file order.
+        """
+        with self._lock:
+            self._pending[batch_no] = end_row
+
+    def complete(self, batch_no: int):
+        """
+        Marks a batch as written (or skipped) and saves the cursor if it moved.
+        """
+        with self._lock:
+            self._written[batch_no] = self._pending.pop(batch_no)
+
+            moved = False
+            while self._next_batch in self._written:
+                self.row_offset = self._written.pop(self._next_batch)
+                self._next_batch += 1
+                moved = True
+            if moved:
+                self._save()
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"key": self.key, "row_offset": self.row_offset}, f)
+        os.replace(tmp_path, self.path)
@@ -1,20 +1,165 @@
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 @dataclass(frozen=True)
 class MLflowConfig:
     model_name: str
     model_version: str
     tracking_uri: str
+    cache_dir: Optional[Path]  # local cache of exported towers; None disables it
 
 @dataclass(frozen=True)
 class DataConfig:
     source_path: Path
     batch_size: int
+    streaming: bool
 
 @dataclass(frozen=True)
 class PineconeConfig:
     index_name: str
     dimension: int
     metric: str
-    api_key: str  # We will pull this from env vars
\ No newline at end of file
+    api_key: str  # We will pull this from env vars
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    queue_depth: int
+    embed_workers: int
+    upsert_workers: int
+
+@dataclass(frozen=True)
+class UpsertConfig:
+    max_records_per_chunk: int
+    max_payload_bytes: int
+    parallelism: int
+    max_retries: int
+    backoff_base: float
+    backoff_max: float
+
+@dataclass(frozen=True)
+class ManifestConfig:
+    enabled: bool
+    path: Path
+
+@dataclass(frozen=True)
+class VectorStoreConfig:
+    backend: str  # "pinecone" or "local"
+    local_path: Path
+
+@dataclass(frozen=True)
+class AnnConfig:
+    enabled: bool
+    index_type: str  # "hnsw" or "ivf"
+    path: Path
+    M: int
+    ef_construction: int
+    ef_search: int
+    nlist: int
+    nprobe: int
+
+@dataclass(frozen=True)
+class QuantizationConfig:
+    enabled: bool
+    kind: str  # "int8" or "pq"
+    pq_m: int
+    rerank_factor: int
+    path: Path
+
+@dataclass(frozen=True)
+class InferenceConfig:
+    fuse_batchnorm: bool
+    quantize_int8: bool
+
+@dataclass(frozen=True)
+class ShardingConfig:
+    workers: int  # processes; 1 keeps the single-process pipeline
+    shards_per_worker: int
+    torch_threads: int  # intra-op threads per worker; 0 means cores / workers
+    state_dir: Path
+    resume: bool
+
+@dataclass(frozen=True)
+class CheckpointConfig:
+    enabled: bool
+    path: Path
+    force_full: bool  # ignore the saved cursor and start from row 0
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    enabled: bool
+    textfile_path: Optional[Path]  # Prometheus text file written at the end of a run
+    http_port: int  # 0 disables the local /metrics endpoint
+
+@dataclass(frozen=True)
+class VersioningConfig:
+    enabled: bool
+    alias: str  # what readers resolve
+    namespace_prefix: str  # a model version's catalog goes to <prefix><version>
+    aliases_path: Path
+    keep_versions: int  # published versions kept for rollback, the live one included
+    verify_sample: int
+    verify_timeout: float
+
+@dataclass(frozen=True)
+class TombstoneConfig:
+    enabled: bool
+    id_set_path: Path  # job_ids known to be in the index
+    delete_batch_size: int
+    max_delete_fraction: float  # refuse to delete more than this share of the index in one run
+    seed_from_backend: bool  # on the first run, take the indexed ids from the store; that run only logs
+
+@dataclass(frozen=True)
+class MetadataConfig:
+    enabled: bool
+    source_path: Path  # cleaned job data the filterable fields are read from
+
+@dataclass(frozen=True)
+class ExportConfig:
+    enabled: bool
+    path: Path  # memory-mappable copy of the catalog: embeddings .npy, ids, manifest
+
+@dataclass(frozen=True)
+class BatchTuningConfig:
+    enabled: bool  # pick the batch size from measured throughput; data_config.batch_size is then the read granularity
+    min_batch_size: int
+    max_batch_size: int
+    probe_batches: int  # batches measured per candidate size
+    min_gain: float  # keep doubling while rows/sec improves by more than this
+    drift_tolerance: float  # re-probe when per-row latency moves this much
+    drift_window: int  # batches whose median latency is checked for drift
+    max_rss_mb: Optional[float]  # memory cap per process, None for no cap
+
+@dataclass(frozen=True)
+class ServingConfig:
+    host: str
+    port: int
+    candidates: int  # jobs retrieved per request and passed to the ranker
+    max_top_k: int
+    max_candidates: int  # cap on the top-N a request may ask for
+    executor_threads: int  # requests computed at once
+    torch_threads: int  # intra-op threads per user-tower forward pass
+    refresh_interval: float  # seconds between checks of the index alias
+    batch_max_size: int  # user-tower requests coalesced into one forward pass
+    batch_max_wait_ms: float  # longest a request waits for its batch; 0 disables micro-batching
+    ranker_path: Path  # booster saved by model-training-service train_ranker
+    user_features_path: Path
+    user_profiles_path: Path
+    jobs_path: Path
+
+@dataclass(frozen=True)
+class UserCacheConfig:
+    enabled: bool
+    max_entries: int  # user embeddings kept in memory
+    ttl_seconds: float
+    disk_path: Optional[Path]  # shared on-disk tier; None keeps the cache in memory only
+
+@dataclass(frozen=True)
+class PrecomputeConfig:
+    enabled: bool  # serve known users from the precomputed store
+    path: Path  # user -> top-k jobs store written by precompute.py
+    k: int
+    embed_batch_size: int
+    query_block: int  # users per block of the blocked search
+    catalog_block: int  # jobs per block
+    threads: int  # 0 uses every CPU
@@ -2,7 +2,7 @@ import yaml
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from src.config.config_entities import MLflowConfig, DataConfig, PineconeConfig
+from src.config.config_entities import MLflowConfig, DataConfig, PineconeConfig, PipelineConfig, UpsertConfig, ManifestConfig, VectorStoreConfig, AnnConfig, QuantizationConfig, InferenceConfig, ShardingConfig, CheckpointConfig, MetricsConfig, VersioningConfig, TombstoneConfig, MetadataConfig, ExportConfig, BatchTuningConfig, ServingConfig, UserCacheConfig, PrecomputeConfig
 
 load_dotenv()
 
@@ -16,14 +16,16 @@ class ConfigurationManager:
         return MLflowConfig(
             model_name=config['model_name'],
             model_version=str(config['model_version']),
-            tracking_uri=config['tracking_uri']
+            tracking_uri=config['tracking_uri'],
+            cache_dir=Path(config['cache_dir']) if config.get('cache_dir') else None
         )
 
     def get_data_config(self) -> DataConfig:
         config = self.config['data_config']
         return DataConfig(
             source_path=Path(config['source_path']),
-            batch_size=config['batch_size']
+            batch_size=config['batch_size'],
+            streaming=config.get('streaming', False)
         )
 
     def get_pinecone_config(self) -> PineconeConfig:
@@ -33,4 +35,182 @@ class ConfigurationManager:
             dimension=config['dimension'],
             metric=config['metric'],
             api_key=os.getenv("PINECONE_API_KEY")
-        )
\ No newline at end of file
+        )
+
+    def get_pipeline_config(self) -> PipelineConfig:
+        config = self.config['pipeline_config']
+        return PipelineConfig(
+            queue_depth=config['queue_depth'],
+            embed_workers=config['embed_workers'],
+            upsert_workers=config['upsert_workers']
+        )
+
+    def get_upsert_config(self) -> UpsertConfig:
+        config = self.config['upsert_config']
+        return UpsertConfig(
+            max_records_per_chunk=config['max_records_per_chunk'],
+            max_payload_bytes=config['max_payload_bytes'],
+            parallelism=config['parallelism'],
+            max_retries=config['max_retries'],
+            backoff_base=config['backoff_base'],
+            backoff_max=config['backoff_max']
+        )
+
+    def get_manifest_config(self) -> ManifestConfig:
+        config = self.config['manifest_config']
+        return ManifestConfig(
+            enabled=config['enabled'],
+            path=Path(config['path'])
+        )
+
+    def get_vector_store_config(self) -> VectorStoreConfig:
+        config = self.config['vector_store_config']
+        return VectorStoreConfig(
+            backend=config['backend'],
+            local_path=Path(config['local_path'])
+        )
+
+    def get_ann_config(self) -> AnnConfig:
+        config = self.config['ann_config']
+        return AnnConfig(
+            enabled=config['enabled'],
+            index_type=config['index_type'],
+            path=Path(config['path']),
+            M=config.get('M', 16),
+            ef_construction=config.get('ef_construction', 200),
+            ef_search=config.get('ef_search', 64),
+            nlist=config.get('nlist', 256),
+            nprobe=config.get('nprobe', 8)
+        )
+
+    def get_quantization_config(self) -> QuantizationConfig:
+        config = self.config['quantization_config']
+        return QuantizationConfig(
+            enabled=config['enabled'],
+            kind=config['kind'],
+            pq_m=config.get('pq_m', 64),
+            rerank_factor=config.get('rerank_factor', 4),
+            path=Path(config['path'])
+        )
+
+    def get_inference_config(self) -> InferenceConfig:
+        config = self.config['inference_config']
+        return InferenceConfig(
+            fuse_batchnorm=config['fuse_batchnorm'],
+            quantize_int8=config.get('quantize_int8', False)
+        )
+
+    def get_sharding_config(self) -> ShardingConfig:
+        config = self.config.get('sharding_config', {})
+        return ShardingConfig(
+            workers=config.get('workers', 1),
+            shards_per_worker=config.get('shards_per_worker', 4),
+            torch_threads=config.get('torch_threads', 0),
+            state_dir=Path(config.get('state_dir', 'artifacts/shard_state')),
+            resume=config.get('resume', True)
+        )
+
+    def get_checkpoint_config(self) -> CheckpointConfig:
+        config = self.config.get('checkpoint_config', {})
+        return CheckpointConfig(
+            enabled=config.get('enabled', True),
+            path=Path(config.get('path', 'artifacts/embedding_checkpoint.json')),
+            force_full=config.get('force_full', False)
+        )
+
+    def get_metrics_config(self) -> MetricsConfig:
+        config = self.config.get('metrics_config', {})
+        return MetricsConfig(
+            enabled=config.get('enabled', True),
+            textfile_path=Path(config['textfile_path']) if config.get('textfile_path') else None,
+            http_port=config.get('http_port', 0)
+        )
+
+    def get_versioning_config(self) -> VersioningConfig:
+        config = self.config.get('versioning_config', {})
+        return VersioningConfig(
+            enabled=config.get('enabled', False),
+            alias=config.get('alias', 'job-embeddings-live'),
+            namespace_prefix=config.get('namespace_prefix', 'model-v'),
+            aliases_path=Path(config.get('aliases_path', 'artifacts/index_aliases.json')),
+            keep_versions=config.get('keep_versions', 2),
+            verify_sample=config.get('verify_sample', 100),
+            verify_timeout=config.get('verify_timeout', 120.0)
+        )
+
+    def get_tombstone_config(self) -> TombstoneConfig:
+        config = self.config.get('tombstone_config', {})
+        return TombstoneConfig(
+            enabled=config.get('enabled', False),
+            id_set_path=Path(config.get('id_set_path', 'artifacts/indexed_ids.txt')),
+            delete_batch_size=config.get('delete_batch_size', 1000),
+            max_delete_fraction=config.get('max_delete_fraction', 0.5),
+            seed_from_backend=config.get('seed_from_backend', False)
+        )
+
+    def get_metadata_config(self) -> MetadataConfig:
+        config = self.config.get('metadata_config', {})
+        return MetadataConfig(
+            enabled=config.get('enabled', False),
+            source_path=Path(config.get('source_path', '../data-service/data/clean_jobs/jobs_clean.json'))
+        )
+
+    def get_export_config(self) -> ExportConfig:
+        config = self.config.get('export_config', {})
+        return ExportConfig(
+            enabled=config.get('enabled', False),
+            path=Path(config.get('path', 'artifacts/embedding_export'))
+        )
+
+    def get_batch_tuning_config(self) -> BatchTuningConfig:
+        config = self.config.get('batch_tuning_config', {})
+        return BatchTuningConfig(
+            enabled=config.get('enabled', False),
+            min_batch_size=config.get('min_batch_size', 128),
+            max_batch_size=config.get('max_batch_size', 16384),
+            probe_batches=config.get('probe_batches', 5),
+            min_gain=config.get('min_gain', 0.05),
+            drift_tolerance=config.get('drift_tolerance', 0.25),
+            drift_window=config.get('drift_window', 20),
+            max_rss_mb=config.get('max_rss_mb')
+        )
+
+    def get_serving_config(self) -> ServingConfig:
+        config = self.config.get('serving_config', {})
+        return ServingConfig(
+            host=config.get('host', '127.0.0.1'),
+            port=config.get('port', 8080),
+            candidates=config.get('candidates', 200),
+            max_top_k=config.get('max_top_k', 100),
+            max_candidates=config.get('max_candidates', 1000),
+            executor_threads=config.get('executor_threads', 4),
+            torch_threads=config.get('torch_threads', 1),
+            refresh_interval=config.get('refresh_interval', 30),
+            batch_max_size=config.get('batch_max_size', 64),
+            batch_max_wait_ms=config.get('batch_max_wait_ms', 2.0),
+            ranker_path=Path(config.get('ranker_path', '../model-training-service/artifacts/ranking_model/model.json')),
+            user_features_path=Path(config.get('user_features_path', '../data-service/data/features/user_features.json')),
+            user_profiles_path=Path(config.get('user_profiles_path', '../data-service/data/clean_users/users_clean.json')),
+            jobs_path=Path(config.get('jobs_path', '../data-service/data/clean_jobs/jobs_clean.json'))
+        )
+
+    def get_user_cache_config(self) -> UserCacheConfig:
+        config = self.config.get('user_cache_config', {})
+        return UserCacheConfig(
+            enabled=config.get('enabled', False),
+            max_entries=config.get('max_entries', 100000),
+            ttl_seconds=config.get('ttl_seconds', 3600),
+            disk_path=Path(config['disk_path']) if config.get('disk_path') else None
+        )
+
+    def get_precompute_config(self) -> PrecomputeConfig:
+        config = self.config.get('precompute_config', {})
+        return PrecomputeConfig(
+            enabled=config.get('enabled', False),
+            path=Path(config.get('path', 'artifacts/user_topk')),
+            k=config.get('k', 200),
+            embed_batch_size=config.get('embed_batch_size', 4096),
+            query_block=config.get('query_block', 512),
+            catalog_block=config.get('catalog_block', 16384),
+            threads=config.get('threads', 0)
+        )
@@ -1,13 +1,18 @@
+import time
 import torch
 import torch.nn.functional as F
 import numpy as np
 from typing import Dict, List, Tuple
 
 class JobEmbedder:
-    def __init__(self, model: torch.nn.Module, device: str = None):
+    def __init__(self, model: torch.nn.Module, device: str = None, metrics=None, batch_sizer=None):
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         self.model = model.to(self.device)
         self.model.eval()
+        # Optional EmbeddingMetrics for forward-pass and normalization time
+        self.metrics = metrics
+        # Optional AdaptiveBatchSizer, fed the time of every batch
+        self.batch_sizer = batch_sizer
 
     @torch.inference_mode()
     def compute(self, batch: Dict) -> Tuple[List[str], np.ndarray]:
@@ -15,10 +20,19 @@ class JobEmbedder:
         
         job_tensors = batch["tensors"]["job_input"].to(self.device)
 
-      
+        started = time.perf_counter()
         job_embeddings = self.model.job_tower(job_tensors)
+        forward_done = time.perf_counter()
 
         # Normalize (Ensures compatibility with the Dot Product training)
         normalized_embeddings = F.normalize(job_embeddings, p=2, dim=1)
+        vectors = normalized_embeddings.cpu().numpy()
 
-        return job_ids, normalized_embeddings.cpu().numpy()
\ No newline at end of file
+        if self.metrics is not None:
+            # On a GPU the forward pass is asynchronous, so its time lands in normalization (.cpu() syncs)
+            self.metrics.forward_seconds.observe(forward_done - started)
+            self.metrics.normalize_seconds.observe(time.perf_counter() - forward_done)
+        if self.batch_sizer is not None:
+            # Forward and normalization together: that is what the batch size trades off
+            self.batch_sizer.observe(len(job_ids), time.perf_counter() - started, size=batch.get("cut_size"))
+        return job_ids, vectors
\ No newline at end of file
@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.logging import logging
+
+MANIFEST_FILE = "export.json"
+
+
+class EmbeddingExport:
+    """
+    Local copy of the normalized job embeddings, for readers that want the whole catalog
+    without going through the vector DB (offline evaluation, exact search, hard-negative mining).
+
+    Layout of `path`:
+      export.json             manifest: model name/version, dimension, count, current file names
+      embeddings.<gen>.npy    float32 matrix of shape (count, dimension), row i belongs to ids[i]
+      ids.<gen>.txt           one job_id per line, in row order
+
+    The .npy opens with np.load(mmap_mode="r") at no cost, whatever the catalog size.
+    Each save writes a new generation of both files and then swaps the manifest atomically,
+    so a reader that goes through the manifest never sees a matrix and an id list that
+    belong to different saves.
+
+    Used as a pipeline sink. Vectors are spooled to disk as they are written, so the run
+    does not hold the catalog in memory. As the pipeline skips unchanged jobs, save() merges
+    the spool into the previous export of the same model version: re-embedded ids replace
+    their old rows and ids no longer in the source can be dropped.
+    """
+
+    def __init__(self, path: str, dimension: int, model_name: str, model_version: str):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.model_name = model_name
+        self.model_version = str(model_version)
+
+        self._spool_path = self.path / f"spool.{os.getpid()}.f32"
+        self._spool = open(self._spool_path, "wb")
+        self._spool_ids: List[str] = []
+        self._lock = threading.Lock()
+
+        self.base: Optional[ExportedCatalog] = None
+        if (self.path / MANIFEST_FILE).exists():
+            previous = ExportedCatalog.open(str(self.path))
+            if previous.model_version == self.model_version and previous.dimension == dimension:
+                self.base = previous
+            else:
+                logging.info(
+                    f"Embedding export at {self.path} is for model version {previous.model_version}; "
+                    f"starting a new one for {self.model_version}"
+                )
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of shape (n, {self.dimension}), got {vectors.shape}")
+        with self._lock:
+            self._spool.write(vectors.tobytes())
+            self._spool_ids.extend(str(i) for i in ids)
+
+    def save(self, live_ids: Optional[Iterable[str]] = None, block_rows: int = 65536):
+        """
+        Writes the merged export and switches the manifest to it.
+        :param live_ids: Ids in the feature source; rows of other ids are dropped. None keeps every row.
+        :param block_rows: Rows copied at a time, which bounds the memory the merge needs.
+        """
+        with self._lock:
+            self._spool.flush()
+            spool_ids = list(self._spool_ids)
+
+        live = {str(i) for i in live_ids} if live_ids is not None else None
+
+        # Where each exported row comes from: (False, base row) or (True, spool row); the latest write wins
+        sources: Dict[str, tuple] = {}
+        if self.base is not None:
+            for row, record_id in enumerate(self.base.ids):
+                sources[record_id] = (False, row)
+        for row, record_id in enumerate(spool_ids):
+            sources[record_id] = (True, row)
+        if live is not None:
+            sources = {record_id: src for record_id, src in sources.items() if record_id in live}
+
+        if not sources:
+            logging.info(f"Embedding export is empty; nothing saved to {self.path}")
+            return
+
+        ids = list(sources)
+        from_spool = np.fromiter((sources[i][0] for i in ids), dtype=bool, count=len(ids))
+        rows = np.fromiter((sources[i][1] for i in ids), dtype=np.int64, count=len(ids))
+
+        spool = None
+        if spool_ids:
+            spool = np.memmap(self._spool_path, dtype=np.float32, mode="r", shape=(len(spool_ids), self.dimension))
+
+        generation = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        vectors_file, ids_file = f"embeddings.{generation}.npy", f"ids.{generation}.txt"
+
+        out = np.lib.format.open_memmap(
+            self.path / vectors_file, mode="w+", dtype=np.float32, shape=(len(ids), self.dimension)
+        )
+        for start in range(0, len(ids), block_rows):
+            end = min(start + block_rows, len(ids))
+            block, block_from_spool = rows[start:end], from_spool[start:end]
+            if block_from_spool.any():
+                out[start:end][block_from_spool] = spool[block[block_from_spool]]
+            if not block_from_spool.all():
+                out[start:end][~block_from_spool] = self.base.vectors[block[~block_from_spool]]
+        out.flush()
+        del out, spool
+
+        with open(self.path / ids_file, "w") as f:
+            f.writelines(f"{record_id}\n" for record_id in ids)
+
+        missing = len(live - sources.keys()) if live is not None else 0
+        if missing:
+            logging.warning(
+                f"{missing} source jobs have no exported embedding (e.g. the export was enabled after they "
+                "were embedded); run with --force-full to export the whole catalog"
+            )
+
+        manifest = {
+            "model_name": self.model_name,
+            "model_version": self.model_version,
+            "dimension": self.dimension,
+            "count": len(ids),
+            "normalized": True,
+            "missing_source_ids": missing,
+            "vectors_file": vectors_file,
+            "ids_file": ids_file,
+            "created_at": time.time(),
+        }
+        tmp_path = self.path / (MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.path / MANIFEST_FILE)
+        logging.info(f"Exported {len(ids)} embeddings ({len(spool_ids)} written this run) to {self.path}")
+
+        self._remove_stale_generations(keep={vectors_file, ids_file})
+        self.base = ExportedCatalog.open(str(self.path))
+
+    def close(self):
+        with self._lock:
+            self._spool.close()
+        self._spool_path.unlink(missing_ok=True)
+
+    def _remove_stale_generations(self, keep: set):
+        keep = keep | {self._spool_path.name}
+        for file in self.path.iterdir():
+            # Spools of crashed runs are swept up here as well
+            if file.name.startswith(("embeddings.", "ids.", "spool.")) and file.name not in keep:
+                try:
+                    file.unlink()
+                except OSError:
+                    # Still mapped by a reader on a platform that forbids it; the next save retries
+                    pass
+
+
+class ExportedCatalog:
+    """
+    Read side of an EmbeddingExport: the matrix memory-mapped read-only, the ids, and the manifest.
+    """
+
+    def __init__(self, path: Path, manifest: Dict, ids: List[str], vectors: np.ndarray):
+        self.path = path
+        self.manifest = manifest
+        self.ids = ids
+        self.vectors = vectors
+        self._rows: Optional[Dict[str, int]] = None
+
+    @property
+    def model_version(self) -> str:
+        return str(self.manifest["model_version"])
+
+    @property
+    def dimension(self) -> int:
+        return self.manifest["dimension"]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row_of(self, record_id: str) -> Optional[int]:
+        if self._rows is None:
+            self._rows = {record_id: row for row, record_id in enumerate(self.ids)}
+        return self._rows.get(str(record_id))
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = True) -> "ExportedCatalog":
+        """
+        :param mmap: Leave the matrix on disk and page it in on access (zero copy).
+        """
+        src = Path(path)
+        with open(src / MANIFEST_FILE, "r") as f:
+            manifest = json.load(f)
+        with open(src / manifest["ids_file"], "r") as f:
+            ids = [line.rstrip("\n") for line in f]
+        vectors = np.load(src / manifest["vectors_file"], mmap_mode="r" if mmap else None)
+        if vectors.shape != (manifest["count"], manifest["dimension"]) or len(ids) != manifest["count"]:
+            raise ValueError(f"Embedding export at {src} does not match its manifest")
+        return cls(src, manifest, ids, vectors)
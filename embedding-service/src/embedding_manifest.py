@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+
+from src.utils.logging import logging
+
+
+class EmbeddingManifest:
+    """
+    Remembers, per job_id, a hash of the input feature vector (and of the metadata
+    upserted with it) that was last embedded and written, together with the model that
+    produced it.
+
+    A run only needs to embed the jobs whose hash is missing or different. When the
+    model name or version changes every entry is dropped, so the whole catalog is redone.
+    """
+
+    def __init__(self, path: str, model_name: str, model_version: str):
+        self.path = Path(path)
+        self.model_name = model_name
+        self.model_version = str(model_version)
+        self.entries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def content_hash(features: np.ndarray, metadata: Optional[Dict] = None) -> str:
+        digest = hashlib.blake2b(np.ascontiguousarray(features).tobytes(), digest_size=16)
+        if metadata:
+            digest.update(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def filter_batch(self, batch: Dict, metadata: Optional[List[Dict]] = None) -> Optional[Dict]:
+        """
+        Drops the rows of a FeatureReader batch whose features are unchanged since the
+        last run. The hashes of the remaining rows are attached under "hashes" so they
+        can be recorded once the vectors are written. Returns None if nothing changed.
+        :param metadata: Per-row metadata upserted with the vectors; a row whose metadata changed is kept.
+        """
+        features = batch["tensors"]["job_input"].numpy()
+        metadata = metadata or [None] * len(features)
+        hashes = [self.content_hash(row, meta) for row, meta in zip(features, metadata)]
+
+        keep = [i for i, (job_id, h) in enumerate(zip(batch["ids"], hashes)) if self.entries.get(str(job_id)) != h]
+        if not keep:
+            return None
+
+        if len(keep) == len(hashes):
+            return {**batch, "hashes": hashes}
+
+        index = torch.as_tensor(keep, dtype=torch.long)
+        return {
+            **batch,
+            "ids": [batch["ids"][i] for i in keep],
+            "tensors": {"job_input": batch["tensors"]["job_input"][index]},
+            "hashes": [hashes[i] for i in keep],
+        }
+
+    def record(self, job_ids: List[str], hashes: List[str]):
+        """
+        Marks jobs as embedded and written. Call only after the upsert succeeded.
+        """
+        with self._lock:
+            for job_id, h in zip(job_ids, hashes):
+                self.entries[str(job_id)] = h
+
+    def forget(self, job_ids: List[str]):
+        """
+        Drops jobs that were deleted from the index.
+        """
+        with self._lock:
+            for job_id in job_ids:
+                self.entries.pop(str(job_id), None)
+
+    def save(self):
+        with self._lock:
+            payload = {
+                "model_name": self.model_name,
+                "model_version": self.model_version,
+                "entries": dict(self.entries),
+            }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        # Atomic swap so a crash mid-write never leaves a half-written manifest
+        os.replace(tmp_path, self.path)
+        logging.info(f"Saved embedding manifest with {len(payload['entries'])} jobs to {self.path}")
+
+    def _load(self):
+        if not self.path.exists():
+            logging.info(f"No embedding manifest at {self.path}; every job will be embedded.")
+            return
+
+        with open(self.path, "r") as f:
+            payload = json.load(f)
+
+        if payload.get("model_name") != self.model_name or str(payload.get("model_version")) != self.model_version:
+            logging.info(
+                f"Manifest was built with {payload.get('model_name')} v{payload.get('model_version')}, "
+                f"now {self.model_name} v{self.model_version}; re-embedding everything."
+            )
+            return
+
+        self.entries = payload.get("entries", {})
+        logging.info(f"Loaded embedding manifest with {len(self.entries)} jobs.")
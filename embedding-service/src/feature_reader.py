@@ -1,35 +1,193 @@
-import pandas as pd
+import time
+import warnings
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import torch
-from typing import Dict, Iterator
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.utils.logging import logging
+
+EXPECTED_JOB_DIM = 1159
 
 class FeatureReader:
-    def __init__(self, source_path: str, batch_size: int = 1024):
+    def __init__(
+        self,
+        source_path: str,
+        batch_size: int = 1024,
+        streaming: bool = False,
+        row_groups: Optional[Sequence[int]] = None,
+        start_row: int = 0,
+        metrics=None,
+        batch_sizer=None,
+    ):
+        """
+        :param source_path: Parquet file with the job features (job_id, job_embedding).
+        :param batch_size: Number of rows per yielded batch.
+        :param streaming: Walk the file record batch by record batch instead of loading it whole.
+                          Memory then grows with batch_size, not with the catalog.
+        :param row_groups: Only read these Parquet row groups (one shard of the file). None reads all.
+        :param start_row: Skip this many rows (of the selected row groups) to resume a run.
+                          Whole row groups before it are never read.
+        :param metrics: EmbeddingMetrics to record read and tensor conversion time into.
+        :param batch_sizer: AdaptiveBatchSizer (src/batch_tuner.py) that sets the size of each batch.
+                            batch_size is then only the granularity of Parquet reads.
+        """
         self.source_path = source_path
         self.batch_size = batch_size
+        self.streaming = streaming
+        self.row_groups = list(row_groups) if row_groups is not None else None
+        self.start_row = start_row
+        self.metrics = metrics
+        self.batch_sizer = batch_sizer
+        self.columns = ["job_id", "job_embedding"]
+
+    def read_ids(self) -> List[str]:
+        """
+        Every job_id of the source (within the selected row groups), reading only that column.
+        """
+        parquet_file = pq.ParquetFile(self.source_path)
+        row_groups = self.row_groups if self.row_groups is not None else range(parquet_file.num_row_groups)
+        table = parquet_file.read_row_groups(list(row_groups), columns=["job_id"])
+        return [str(job_id) for job_id in table.column("job_id").to_pylist()]
 
     def stream_batches(self) -> Iterator[Dict]:
-        df = pd.read_parquet(self.source_path)
-        
-        for i in range(0, len(df), self.batch_size):
-            chunk = df.iloc[i : i + self.batch_size]
-            yield self._transform_to_tensors(chunk)
-
-    def _transform_to_tensors(self, df: pd.DataFrame) -> Dict:
-        job_ids = df['job_id'].values.tolist()
-        
-   
-        # convert the list of lists into a clean 2D numpy array
-        raw_features = np.array(df['job_embedding'].tolist()) 
-        
-       
-        if raw_features.shape[1] != 1159:
-             print(f"Note: Input features have dimension {raw_features.shape[1]}")
+        tables = iter(self._stream_tables() if self.streaming else self._slice_tables())
+        while True:
+            started = time.perf_counter()
+            table = next(tables, None)
+            if table is None:
+                return
+            read_done = time.perf_counter()
+            batch = self._transform_to_tensors(table)
+            # Rows the batch was cut with, before the manifest drops unchanged ones
+            batch["cut_size"] = table.num_rows
+
+            if self.metrics is not None:
+                self.metrics.read_seconds.observe(read_done - started)
+                self.metrics.convert_seconds.observe(time.perf_counter() - read_done)
+            yield batch
+
+    def _slice_tables(self) -> Iterator[pa.Table]:
+        if self.row_groups is None:
+            table = pq.read_table(self.source_path, columns=self.columns)
+        else:
+            table = pq.ParquetFile(self.source_path).read_row_groups(self.row_groups, columns=self.columns)
+        table = table.slice(self.start_row)
+
+        # Table.slice is zero-copy, so the chunks share the loaded buffers
+        offset = 0
+        while offset < table.num_rows:
+            size = self._next_size()
+            yield table.slice(offset, size)
+            offset += size
+
+    def _next_size(self) -> int:
+        return self.batch_sizer.next_size() if self.batch_sizer is not None else self.batch_size
+
+    def _stream_tables(self) -> Iterator[pa.Table]:
+        """
+        Yields tables of exactly the batch size (the last one may be shorter).
+        Record batches never cross row group boundaries, so small leftovers
+        are buffered and stitched onto the next ones.
+        """
+        parquet_file = pq.ParquetFile(self.source_path)
+        row_groups, skip_rows = self._resume_point(parquet_file)
+        if not row_groups:
+            return
+
+        pending: List[pa.RecordBatch] = []
+        pending_rows = 0
+
+        for record_batch in parquet_file.iter_batches(
+            batch_size=self.batch_size, row_groups=row_groups, columns=self.columns
+        ):
+            if skip_rows:
+                skipped = min(skip_rows, record_batch.num_rows)
+                record_batch = record_batch.slice(skipped)
+                skip_rows -= skipped
+                if not record_batch.num_rows:
+                    continue
+            pending.append(record_batch)
+            pending_rows += record_batch.num_rows
+
+            size = self._next_size()
+            while pending_rows >= size:
+                table = pa.Table.from_batches(pending)
+                yield table.slice(0, size)
+
+                rest = table.slice(size)
+                pending = rest.to_batches()
+                pending_rows = rest.num_rows
+                size = self._next_size()
+
+        if pending_rows:
+            yield pa.Table.from_batches(pending)
+
+    def _resume_point(self, parquet_file: pq.ParquetFile) -> Tuple[List[int], int]:
+        """
+        Drops the row groups that lie entirely before start_row.
+        Returns the row groups left to read and the rows to skip in the first of them.
+        """
+        metadata = parquet_file.metadata
+        groups = self.row_groups if self.row_groups is not None else list(range(metadata.num_row_groups))
+        skip_rows = self.start_row
+        while groups and skip_rows >= metadata.row_group(groups[0]).num_rows:
+            skip_rows -= metadata.row_group(groups[0]).num_rows
+            groups = groups[1:]
+        return groups, skip_rows
+
+    @staticmethod
+    def decode_embeddings(column) -> np.ndarray:
+        """
+        Turns a list<double> Arrow column into a contiguous (rows, dim) float32 array.
+        The column is checked to be a fixed-size list and its values are cast to
+        float32 inside Arrow, so there are no per-element Python objects and no
+        float64 NumPy intermediate.
+        """
+        if isinstance(column, pa.ChunkedArray):
+            column = column.combine_chunks()
+
+        if column.null_count:
+            raise ValueError(f"job_embedding has {column.null_count} null rows")
+
+        if len(column) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+
+        if pa.types.is_fixed_size_list(column.type):
+            dim = column.type.list_size
+        else:
+            lengths = pc.min_max(pc.list_value_length(column))
+            dim = lengths["min"].as_py()
+            if dim != lengths["max"].as_py():
+                raise ValueError(
+                    f"job_embedding rows have mixed dimensions ({dim} to {lengths['max'].as_py()})"
+                )
+
+        # Every row has the same length, so the flattened child is a fixed-size
+        # (rows * dim) buffer; casting it in one pass is much cheaper than
+        # casting to fixed_size_list<float32> row by row.
+        flat = column.flatten().cast(pa.float32())
+        return flat.to_numpy(zero_copy_only=True).reshape(len(column), dim)
+
+    def _transform_to_tensors(self, table: pa.Table) -> Dict:
+        job_ids = table.column('job_id').to_pylist()
+
+        raw_features = self.decode_embeddings(table.column('job_embedding'))
+
+        if raw_features.shape[1] != EXPECTED_JOB_DIM:
+            logging.warning(f"Input features have dimension {raw_features.shape[1]}")
+
+        # The Arrow buffer is immutable; torch warns about that but the tower only reads it
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            job_input = torch.from_numpy(raw_features)
 
         return {
             "ids": job_ids,
             "tensors": {
                 # This goes into the model's job_tower
-                "job_input": torch.tensor(raw_features, dtype=torch.float32)
+                "job_input": job_input
             }
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,158 @@
+import copy
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from src.utils.logging import logging
+
+
+def fold_batchnorm(linear: nn.Linear, bn: nn.BatchNorm1d) -> nn.Linear:
+    """
+    Returns a Linear equivalent to bn(linear(x)) in eval mode:
+      scale = gamma / sqrt(running_var + eps)
+      W' = W * scale[:, None]
+      b' = (b - running_mean) * scale + beta
+    """
+    scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+    bias = linear.bias if linear.bias is not None else torch.zeros_like(bn.running_mean)
+
+    fused = nn.Linear(linear.in_features, linear.out_features, bias=True)
+    with torch.no_grad():
+        fused.weight.copy_(linear.weight * scale[:, None])
+        fused.bias.copy_((bias - bn.running_mean) * scale + bn.bias)
+    return fused
+
+
+def fuse_tower(tower: nn.Module) -> nn.Sequential:
+    """
+    Flattens a Tower (Linear -> BatchNorm1d -> ReLU -> Dropout blocks + final projection)
+    into Linear -> ReLU blocks: every BatchNorm is folded into the Linear before it and
+    every Dropout, a no-op at inference, is removed.
+    """
+    layers = []
+    modules = list(tower.mlp)
+    i = 0
+    while i < len(modules):
+        module = modules[i]
+        if isinstance(module, nn.Linear) and i + 1 < len(modules) and isinstance(modules[i + 1], nn.BatchNorm1d):
+            layers.append(fold_batchnorm(module, modules[i + 1]))
+            i += 2
+            continue
+        if not isinstance(module, nn.Dropout):
+            layers.append(copy.deepcopy(module))
+        i += 1
+
+    layers.append(copy.deepcopy(tower.final_projection))
+    fused = nn.Sequential(*layers).eval()
+    for param in fused.parameters():
+        param.requires_grad = False
+    return fused
+
+
+@torch.inference_mode()
+def verify_parity(original: nn.Module, fused: nn.Module, input_dim: int, rows: int = 256, atol: float = 1e-4) -> float:
+    """
+    Runs both modules on the same random batch and raises if their outputs differ by more than atol.
+    Returns the max absolute difference.
+    """
+    device = next(original.parameters()).device
+    x = torch.randn(rows, input_dim, device=device)
+    max_diff = (original.eval()(x) - fused.eval()(x)).abs().max().item()
+    if max_diff > atol:
+        raise ValueError(f"Fused tower drifted from the original: max abs diff {max_diff:.2e} > {atol:.0e}")
+    return max_diff
+
+
+def fuse_model(model: nn.Module, towers: Sequence[str] = ("job_tower",)) -> nn.Module:
+    """
+    Replaces each named tower with its fused version, after checking numerical parity.
+    """
+    from src.model_loader import TowerBundle, tower_config
+
+    fused_towers = {}
+    for name in towers:
+        tower = getattr(model, name)
+        fused = fuse_tower(tower).to(next(tower.parameters()).device)
+        max_diff = verify_parity(tower, fused, tower_config(tower)["input_dim"])
+        logging.info(f"Fused {name}: {len(tower.mlp) + 1} -> {len(fused)} layers, max abs diff {max_diff:.2e}")
+        fused_towers[name] = fused
+    return TowerBundle(**fused_towers)
+
+
+def quantize_tower(tower: nn.Module) -> nn.Module:
+    """
+    Dynamic int8 quantization of every Linear: weights are stored as int8 once, activations
+    are quantized per batch at run time, so no calibration data is needed. CPU only.
+    """
+    quantized = torch.ao.quantization.quantize_dynamic(copy.deepcopy(tower).cpu().eval(), {nn.Linear}, dtype=torch.qint8)
+    for param in quantized.parameters():
+        param.requires_grad = False
+    return quantized
+
+
+@torch.inference_mode()
+def quantization_report(
+    original: nn.Module,
+    quantized: nn.Module,
+    job_inputs: torch.Tensor,
+    user_inputs: Optional[torch.Tensor] = None,
+    k: int = 10,
+) -> Dict:
+    """
+    Compares float32 and int8 towers on the same inputs:
+      - cosine similarity between float32 and int8 job embeddings (mean / min),
+      - recall@k of int8 retrieval against float32 retrieval on the same catalog.
+    Queries are user embeddings when user_inputs is given, otherwise the first tenth of the
+    job embeddings (retrieval of similar jobs).
+    """
+    from src.ann.evaluation import exact_top_k, recall_at_k
+
+    def embed(model, name, x):
+        return F.normalize(getattr(model, name)(x), p=2, dim=1).numpy()
+
+    job_float = embed(original, "job_tower", job_inputs)
+    job_int8 = embed(quantized, "job_tower", job_inputs)
+    cosine = np.sum(job_float * job_int8, axis=1)
+
+    if user_inputs is not None:
+        query_float = embed(original, "user_tower", user_inputs)
+        query_int8 = embed(quantized, "user_tower", user_inputs)
+    else:
+        n_queries = max(len(job_float) // 10, 1)
+        query_float, query_int8 = job_float[:n_queries], job_int8[:n_queries]
+
+    exact = exact_top_k(query_float, job_float, k)
+    approx = exact_top_k(query_int8, job_int8, k)
+    return {
+        "rows": len(job_float),
+        "queries": len(query_float),
+        "cosine_mean": float(cosine.mean()),
+        "cosine_min": float(cosine.min()),
+        f"recall_at_{k}": recall_at_k(approx, exact, k),
+    }
+
+
+def tower_input_dim(tower: nn.Module) -> int:
+    """
+    Input width of a Tower or of a fused/quantized Sequential built from one.
+    """
+    for module in tower.modules():
+        if hasattr(module, "in_features"):
+            return module.in_features
+    raise ValueError("Tower has no Linear layer")
+
+def quantize_model(model: nn.Module, towers: Sequence[str] = ("job_tower",)) -> nn.Module:
+    """
+    Replaces each named tower with a dynamically quantized copy.
+    Drift and recall are not checked here: without real features at load time the check
+    means little, and it would sit on every cold start. Run benchmarks/bench_quantized_tower.py
+    on a feature parquet before turning quantization on.
+    """
+    from src.model_loader import TowerBundle
+
+    quantized = TowerBundle(**{name: quantize_tower(getattr(model, name)) for name in towers})
+    logging.info(f"Quantized {', '.join(towers)} to int8")
+    return quantized
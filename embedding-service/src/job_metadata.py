@@ -0,0 +1,78 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logging import logging
+
+# Metadata key on the vector -> column of the cleaned job data (data-service JobCleaner output).
+# Short keys keep the per-vector payload small; values are already normalized by the cleaner.
+METADATA_COLUMNS = {
+    "city": "job_city",
+    "state": "job_state",
+    "country": "job_country",
+    "remote": "job_is_remote",
+    "employment_type": "job_employment_type",
+}
+
+
+class JobMetadataBuilder:
+    """
+    Looks up filterable metadata for job vectors from the cleaned job data.
+
+    The needed columns are loaded once into NumPy arrays aligned with a pandas index on
+    job_id, so a batch lookup is one get_indexer call plus one take per column instead of
+    a per-job row lookup. Jobs missing from the cleaned data get an empty payload; null
+    values are left out of the payload rather than stored as None.
+    """
+
+    def __init__(self, source_path: str, columns: Optional[Dict[str, str]] = None):
+        """
+        :param source_path: Cleaned jobs as JSON (a list of records) or Parquet.
+        :param columns: Metadata key -> source column, defaults to METADATA_COLUMNS.
+        """
+        self.source_path = Path(source_path)
+        self.columns = dict(columns or METADATA_COLUMNS)
+
+        frame = self._read(["job_id", *self.columns.values()])
+        frame = frame.drop_duplicates(subset="job_id", keep="last")
+        self.index = pd.Index(frame["job_id"].astype(str))
+        self.values = {key: frame[column].to_numpy(dtype=object) for key, column in self.columns.items()}
+        logging.info(f"Loaded metadata ({', '.join(self.columns)}) for {len(self.index)} jobs from {self.source_path}")
+
+    def _read(self, columns: List[str]) -> pd.DataFrame:
+        if self.source_path.suffix == ".parquet":
+            return pd.read_parquet(self.source_path, columns=columns)
+
+        frame = pd.read_json(self.source_path)
+        missing = [c for c in columns if c not in frame.columns]
+        if missing:
+            raise ValueError(f"Cleaned job data at {self.source_path} has no column(s) {missing}")
+        return frame[columns]
+
+    def for_ids(self, job_ids: Sequence[str]) -> List[Dict]:
+        positions = self.index.get_indexer([str(i) for i in job_ids])
+        found = positions >= 0
+        safe = np.where(found, positions, 0)
+
+        columns = {}
+        for key, values in self.values.items():
+            column = values.take(safe)
+            column[~found] = None
+            columns[key] = column
+
+        keys = list(columns)
+        return [
+            {key: _plain(value) for key, value in zip(keys, row) if not _is_null(value)}
+            for row in zip(*columns.values())
+        ]
+
+
+def _is_null(value) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _plain(value):
+    # NumPy scalars are not JSON serializable; vector stores expect plain str/bool/number
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,259 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from src.utils.logging import logging
+
+# Seconds; covers a sub-millisecond decode up to a multi-second throttled upsert
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format(value: float) -> str:
+    # repr keeps full precision (a Unix timestamp would lose its seconds with %g)
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter", f"{self.name} {_format(self.value)}"]
+
+
+class Gauge(Counter):
+    def set(self, value: float):
+        with self._lock:
+            self.value = value
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {_format(self.value)}"]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus sense. Quantiles in the end-of-run
+    summary are interpolated within a bucket, so they are as coarse as the buckets.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+
+        rank = q * total
+        cumulative = 0
+        for slot, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[slot - 1] if slot > 0 else 0.0
+                upper = self.buckets[slot] if slot < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {total}')
+        lines.append(f"{self.name}_sum {_format(value_sum)}")
+        lines.append(f"{self.name}_count {total}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    A minimal in-process metrics registry that renders the Prometheus text format,
+    either to a file (for the node_exporter textfile collector, which suits a batch job)
+    or over a local HTTP endpoint while the run is going.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        out = Path(path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        # The collector may read at any moment, so never let it see a half-written file
+        tmp_path = out.with_suffix(out.suffix + f".{os.getpid()}.tmp")
+        tmp_path.write_text(self.render())
+        os.replace(tmp_path, out)
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        logging.info(f"Serving metrics on http://{host}:{self._server.server_port}/metrics")
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class EmbeddingMetrics:
+    """
+    The metrics of one embedding run. FeatureReader, JobEmbedder, VectorWriter and
+    EmbeddingPipeline each take an optional instance and record into it.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.read_seconds = r.histogram("embedding_read_seconds", "Time to read one batch of rows from Parquet")
+        self.convert_seconds = r.histogram("embedding_tensor_conversion_seconds", "Time to turn one Arrow batch into a tensor")
+        self.forward_seconds = r.histogram("embedding_forward_seconds", "Time of the job tower forward pass for one batch")
+        self.normalize_seconds = r.histogram("embedding_normalization_seconds", "Time to L2-normalize one batch and copy it to NumPy")
+        self.upsert_seconds = r.histogram("embedding_upsert_seconds", "Time to write one batch to the vector store, retries included")
+        self.batch_rows = r.histogram(
+            "embedding_batch_rows", "Rows per embedded batch", buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+        )
+        self.batch_size = r.gauge("embedding_batch_size", "Rows per batch the reader is currently cutting")
+        self.vectors_written = r.counter("embedding_vectors_written_total", "Vectors written to the vector store")
+        self.vectors_deleted = r.counter("embedding_vectors_deleted_total", "Stale vectors deleted by the tombstone sync")
+        self.upsert_retries = r.counter("embedding_upsert_retries_total", "Transient upsert failures that were retried")
+        self.upsert_failures = r.counter("embedding_upsert_failures_total", "Upsert chunks that failed after all retries")
+        self.stage_failures = r.counter("embedding_pipeline_failures_total", "Pipeline stage errors that stopped a run")
+        self.run_seconds = r.gauge("embedding_run_seconds", "Wall time of the last run")
+        self.rows_per_second = r.gauge("embedding_rows_per_second", "Vectors written per second in the last run")
+        self.last_success = r.gauge("embedding_last_success_timestamp_seconds", "Unix time the last run finished successfully")
+
+    def finish(self, wall_time: float, success: bool):
+        self.run_seconds.set(wall_time)
+        self.rows_per_second.set(self.vectors_written.value / wall_time if wall_time > 0 else 0.0)
+        if success:
+            self.last_success.set(time.time())
+
+    def log_summary(self):
+        logging.info(
+            f"Run metrics: {self.vectors_written.value:.0f} vectors written, {self.vectors_deleted.value:.0f} deleted "
+            f"in {self.run_seconds.value:.2f}s "
+            f"({self.rows_per_second.value:.0f} rows/s), retries={self.upsert_retries.value:.0f}, "
+            f"upsert failures={self.upsert_failures.value:.0f}, stage failures={self.stage_failures.value:.0f}"
+        )
+        for histogram in (self.read_seconds, self.convert_seconds, self.forward_seconds, self.normalize_seconds, self.upsert_seconds):
+            if not histogram.count:
+                continue
+            logging.info(
+                f"  {histogram.name}: n={histogram.count} mean={1000 * histogram.sum / histogram.count:.2f}ms "
+                f"p50={1000 * histogram.quantile(0.5):.2f}ms p95={1000 * histogram.quantile(0.95):.2f}ms "
+                f"total={histogram.sum:.2f}s"
+            )
+
+
+class ServingMetrics:
+    """
+    The metrics of the recommendation service, served on its own /metrics route.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.request_seconds = r.histogram("serving_request_seconds", "Time to answer one recommendation request")
+        self.embed_seconds = r.histogram("serving_user_embedding_seconds", "Time to get the user embedding")
+        self.retrieve_seconds = r.histogram("serving_retrieval_seconds", "Time of the top-N vector search")
+        self.rank_seconds = r.histogram("serving_ranking_seconds", "Time to build ranker features and score the candidates")
+        self.requests = r.counter("serving_requests_total", "Recommendation requests answered")
+        self.errors = r.counter("serving_request_errors_total", "Recommendation requests that failed")
+        self.candidates = r.histogram(
+            "serving_candidates", "Candidates retrieved per request", buckets=(10, 25, 50, 100, 200, 500, 1000, 2000)
+        )
+        self.batch_size = r.histogram(
+            "serving_user_tower_batch_size", "Requests coalesced into one user-tower forward pass",
+            buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+        )
+        self.batch_fill = r.histogram(
+            "serving_user_tower_batch_fill", "Batch size as a share of the configured maximum",
+            buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+        )
+        self.queue_delay_seconds = r.histogram(
+            "serving_user_tower_queue_delay_seconds", "Time a request waited for its user-tower batch to start",
+            buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+        )
+        self.user_cache_hits = r.counter("serving_user_cache_hits_total", "User embeddings served from the in-memory cache")
+        self.user_cache_disk_hits = r.counter("serving_user_cache_disk_hits_total", "User embeddings served from the shared disk cache")
+        self.user_cache_misses = r.counter("serving_user_cache_misses_total", "User embeddings that had to be computed")
+        self.user_cache_evictions = r.counter("serving_user_cache_evictions_total", "Entries evicted from the in-memory cache to stay within its size")
+        self.user_cache_invalidations = r.counter("serving_user_cache_invalidations_total", "Cache entries dropped by explicit invalidation")
+        self.user_cache_entries = r.gauge("serving_user_cache_entries", "User embeddings held in memory")
+        self.precomputed_hits = r.counter(
+            "serving_precomputed_hits_total", "Requests answered from the precomputed top-k instead of online retrieval"
+        )
@@ -1,36 +1,202 @@
+import json
+import os
+import shutil
 import mlflow.pytorch
 import torch
 import logging
+from pathlib import Path
+from typing import Dict, Optional, Sequence
 
+from src.two_tower_training.src_retriever.two_tower.retriver_model_archi import Tower
+from src.inference_export import fuse_model, quantize_model
 from src.utils.logging import logging
 
+
+class TowerBundle(torch.nn.Module):
+    """
+    Holds only the towers that were requested (e.g. just `job_tower`), under the same
+    attribute names as TwoTowerModel, so JobEmbedder works with either.
+    """
+    def __init__(self, **towers: torch.nn.Module):
+        super().__init__()
+        for name, tower in towers.items():
+            self.add_module(name, tower)
+
+
+def tower_config(tower: Tower) -> Dict:
+    """
+    Recovers the constructor arguments of a Tower from its layers.
+    """
+    linears = [m for m in tower.mlp if isinstance(m, torch.nn.Linear)]
+    return {
+        "input_dim": linears[0].in_features if linears else tower.final_projection.in_features,
+        "hidden_dims": [m.out_features for m in linears],
+        "output_dim": tower.final_projection.out_features,
+    }
+
+
 class ModelLoader:
-    def __init__(self, model_name: str, stage_or_version: str = "Production"):
+    def __init__(
+        self,
+        model_name: str,
+        stage_or_version: str = "Production",
+        cache_dir: Optional[str] = None,
+        towers: Sequence[str] = ("job_tower",),
+        fuse: bool = False,
+        quantize: bool = False,
+    ):
         """
         :param model_name: The name registered in MLflow (e.g., 'job_tower_two_stage')
         :param stage_or_version: Can be 'Staging', 'Production', or a version number like '1'
+        :param cache_dir: Local cache of exported towers, keyed by model name and version.
+                          A warm start loads the weights from here without touching the registry
+                          (for a numeric version) or downloading the full model.
+        :param towers: Towers to keep in the cache; the loader returns only these on a warm start.
+        :param fuse: Return inference-only towers with BatchNorm folded into the Linear
+                     layers and Dropout removed (see src/inference_export.py).
+        :param quantize: Return towers with dynamically quantized int8 Linear layers.
+                         CPU only; ignored with a warning when a GPU is in use.
         """
         # URI format: "models:/<model_name>/<stage_or_version>"
+        self.model_name = model_name
+        self.stage_or_version = str(stage_or_version)
         self.model_uri = f"models:/{model_name}/{stage_or_version}"
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.towers = tuple(towers)
+        self.fuse = fuse
+        self.quantize = quantize
+        # Pinned by the first resolve_version(), so a stage that moves mid-run can't mix versions
+        self._version: Optional[str] = None
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
     def get_model(self) -> torch.nn.Module:
-        logging.info(f"Loading model from {self.model_uri}...")
-        
+        model = self._load()
+        if self.fuse:
+            model = fuse_model(model, self.towers)
+        if self.quantize:
+            if self.device.type == "cpu":
+                model = quantize_model(model, self.towers)
+            else:
+                logging.warning(f"int8 quantization is CPU only; keeping float32 towers on {self.device}")
+        return model
+
+    def _load(self) -> torch.nn.Module:
+        version = self.resolve_version()
+        if self.cache_dir is not None:
+            cached = self._load_cached(version)
+            if cached is not None:
+                return cached
+
+        # The resolved version rather than the stage URI: the weights must be the ones the cache key,
+        # the manifest and the namespace are named after, even if the stage moves meanwhile
+        model_uri = f"models:/{self.model_name}/{version}"
+        logging.info(f"Loading model from {model_uri} ({self.model_uri})...")
+
         try:
-            
-            model = mlflow.pytorch.load_model(self.model_uri)
-            
-            model.to(self.device)
-            model.eval()
-            
-            
-            for param in model.parameters():
-                param.requires_grad = False
-                
+
+            model = mlflow.pytorch.load_model(model_uri)
+
+            model = self._prepare(model)
+
             logging.info("Model loaded and moved to inference mode.")
+
+            if self.cache_dir is not None:
+                self._export(model, version)
             return model
-            
+
         except Exception as e:
             logging.error(f"Failed to load model from MLflow: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def warm_cache(self) -> str:
+        """
+        Makes sure the requested towers of the resolved version are in the local cache and
+        returns that version, so worker processes can load them without the registry.
+        """
+        if self.cache_dir is None:
+            raise ValueError("warm_cache() needs a cache_dir")
+        version = self.resolve_version()
+        if not (self._cache_path(version) / "towers.json").exists():
+            self._load()
+        return version
+
+    def resolve_version(self) -> str:
+        """
+        A numeric version is used as is. A stage ('Production', ...) costs one registry
+        metadata call, which is still far cheaper than downloading the model. The first
+        answer is kept for the life of the loader, so it always matches the loaded weights.
+        """
+        if self._version is not None:
+            return self._version
+        if self.stage_or_version.isdigit():
+            self._version = self.stage_or_version
+            return self._version
+
+        from mlflow.tracking import MlflowClient
+
+        latest = MlflowClient().get_latest_versions(self.model_name, stages=[self.stage_or_version])
+        if not latest:
+            raise ValueError(f"No version of {self.model_name} in stage {self.stage_or_version}")
+        self._version = str(latest[0].version)
+        return self._version
+
+    def _prepare(self, model: torch.nn.Module) -> torch.nn.Module:
+        model.to(self.device)
+        model.eval()
+
+        for param in model.parameters():
+            param.requires_grad = False
+        return model
+
+    def _cache_path(self, version: str) -> Path:
+        return self.cache_dir / self.model_name / str(version)
+
+    def _load_cached(self, version: str) -> Optional[torch.nn.Module]:
+        path = self._cache_path(version)
+        config_path = path / "towers.json"
+        if not config_path.exists():
+            return None
+
+        with open(config_path, "r") as f:
+            configs = json.load(f)
+        if any(name not in configs for name in self.towers):
+            return None
+
+        towers = {}
+        for name in self.towers:
+            tower = Tower(**configs[name])
+            state = torch.load(path / f"{name}.pt", map_location=self.device, weights_only=True)
+            tower.load_state_dict(state)
+            towers[name] = tower
+
+        logging.info(f"Loaded {', '.join(self.towers)} of {self.model_name} v{version} from cache {path}")
+        return self._prepare(TowerBundle(**towers))
+
+    def _export(self, model: torch.nn.Module, version: str):
+        """
+        Writes the requested towers as plain state dicts plus their architecture config.
+        Written to a temp dir and renamed, so a crash never leaves a half-written cache entry.
+        """
+        path = self._cache_path(version)
+        tmp_path = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+
+        # Keep towers other loaders cached for this version (the pipeline caches job_tower, serving user_tower)
+        configs = {}
+        if (path / "towers.json").exists():
+            with open(path / "towers.json", "r") as f:
+                configs = {name: config for name, config in json.load(f).items() if name not in self.towers}
+            for name in configs:
+                shutil.copy2(path / f"{name}.pt", tmp_path / f"{name}.pt")
+
+        for name in self.towers:
+            tower = getattr(model, name)
+            configs[name] = tower_config(tower)
+            torch.save({k: v.cpu() for k, v in tower.state_dict().items()}, tmp_path / f"{name}.pt")
+        with open(tmp_path / "towers.json", "w") as f:
+            json.dump(configs, f)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        logging.info(f"Cached {', '.join(self.towers)} of {self.model_name} v{version} at {path}")
@@ -0,0 +1,268 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from src.utils.logging import logging
+
+# Marks the end of a stream on a queue
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """
+    Timing counters of one pipeline stage, summed over its workers.
+    busy: time spent doing the stage's own work
+    starved: time spent waiting for input from the upstream queue
+    blocked: time spent waiting for room in the downstream queue (backpressure)
+    """
+    name: str
+    workers: int
+    items: int = 0
+    busy: float = 0.0
+    starved: float = 0.0
+    blocked: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, busy: float = 0.0, starved: float = 0.0, blocked: float = 0.0, items: int = 0):
+        with self._lock:
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+            self.items += items
+
+    def utilization(self, wall_time: float) -> float:
+        if wall_time <= 0:
+            return 0.0
+        return self.busy / (wall_time * self.workers)
+
+
+class EmbeddingPipeline:
+    """
+    Runs read -> embed -> upsert as three concurrent stages connected by bounded queues.
+
+    The reader fills `read_queue`, embed workers drain it into `write_queue` and
+    upsert workers drain that. Both queues hold at most `queue_depth` batches, so
+    a slow stage blocks the ones before it instead of letting batches pile up in memory.
+    """
+
+    def __init__(
+        self,
+        reader,
+        embedder,
+        writer,
+        queue_depth: int = 4,
+        embed_workers: int = 1,
+        upsert_workers: int = 2,
+        poll_interval: float = 0.1,
+        manifest=None,
+        sinks: Optional[List] = None,
+        checkpoint=None,
+        metrics=None,
+        metadata=None,
+    ):
+        if queue_depth < 1 or embed_workers < 1 or upsert_workers < 1:
+            raise ValueError("queue_depth, embed_workers and upsert_workers must all be >= 1")
+
+        self.reader = reader
+        self.embedder = embedder
+        self.writer = writer
+        self.queue_depth = queue_depth
+        self.embed_workers = embed_workers
+        self.upsert_workers = upsert_workers
+        self.poll_interval = poll_interval
+        self.manifest = manifest
+        # Extra consumers of the written vectors (ANN indexes, exports); each needs add(ids, vectors)
+        self.sinks = sinks or []
+        # Resume cursor (src/checkpoint.py); advanced as batches are written
+        self.checkpoint = checkpoint
+        # EmbeddingMetrics (src/metrics.py); the pipeline records batch sizes, failures and the run totals
+        self.metrics = metrics
+        # JobMetadataBuilder (src/job_metadata.py); when set, every vector is upserted with its filterable metadata
+        self.metadata = metadata
+
+        self.read_queue: queue.Queue = queue.Queue(maxsize=queue_depth)
+        self.write_queue: queue.Queue = queue.Queue(maxsize=queue_depth)
+
+        self.stats = {
+            "read": StageStats("read", 1),
+            "embed": StageStats("embed", embed_workers),
+            "upsert": StageStats("upsert", upsert_workers),
+        }
+        self.skipped = 0
+        self.wall_time = 0.0
+
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._errors_lock = threading.Lock()
+        self._embed_remaining = embed_workers
+        self._embed_lock = threading.Lock()
+
+    def run(self) -> Dict[str, StageStats]:
+        threads = [threading.Thread(target=self._guard, args=(self._read_stage,), name="read-0")]
+        threads += [
+            threading.Thread(target=self._guard, args=(self._embed_stage,), name=f"embed-{i}")
+            for i in range(self.embed_workers)
+        ]
+        threads += [
+            threading.Thread(target=self._guard, args=(self._upsert_stage,), name=f"upsert-{i}")
+            for i in range(self.upsert_workers)
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall_time = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.finish(self.wall_time, success=not self._errors)
+
+        if self._errors:
+            raise self._errors[0]
+
+        self.log_report()
+        return self.stats
+
+    def log_report(self):
+        logging.info(f"Pipeline finished in {self.wall_time:.2f}s")
+        if self.manifest is not None:
+            logging.info(f"Skipped {self.skipped} unchanged jobs")
+        for stage in self.stats.values():
+            logging.info(
+                f"[{stage.name}] workers={stage.workers} batches={stage.items} "
+                f"utilization={stage.utilization(self.wall_time):.1%} "
+                f"busy={stage.busy:.2f}s starved={stage.starved:.2f}s blocked={stage.blocked:.2f}s"
+            )
+
+    # ---- stages ----
+
+    def _read_stage(self):
+        stats = self.stats["read"]
+        batches = iter(self.reader.stream_batches())
+        batch_no = 0
+        end_row = getattr(self.reader, "start_row", 0)
+
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            batch = next(batches, _DONE)
+            stats.add(busy=time.perf_counter() - started)
+
+            if batch is _DONE:
+                break
+
+            end_row += len(batch["ids"])
+            if self.checkpoint is not None:
+                self.checkpoint.track(batch_no, end_row)
+            batch = {**batch, "batch_no": batch_no}
+            batch_no += 1
+
+            if self.manifest is not None:
+                total = len(batch["ids"])
+                # Metadata is part of what was written, so a changed location alone re-upserts the job
+                metadata = self.metadata.for_ids(batch["ids"]) if self.metadata is not None else None
+                filtered = self.manifest.filter_batch(batch, metadata)
+                self.skipped += total - (len(filtered["ids"]) if filtered else 0)
+                if filtered is None:
+                    if self.checkpoint is not None:
+                        self.checkpoint.complete(batch["batch_no"])
+                    continue
+                batch = {**filtered, "batch_no": batch["batch_no"]}
+
+            self._put(self.read_queue, batch, stats)
+            stats.add(items=1)
+
+        for _ in range(self.embed_workers):
+            self._put(self.read_queue, _DONE, stats)
+
+    def _embed_stage(self):
+        stats = self.stats["embed"]
+        try:
+            while True:
+                batch = self._get(self.read_queue, stats)
+                if batch is _DONE:
+                    break
+
+                started = time.perf_counter()
+                job_ids, vectors = self.embedder.compute(batch)
+                stats.add(busy=time.perf_counter() - started, items=1)
+                if self.metrics is not None:
+                    self.metrics.batch_rows.observe(len(job_ids))
+
+                self._put(self.write_queue, (job_ids, vectors, batch.get("hashes"), batch.get("batch_no")), stats)
+        finally:
+            # The last embed worker out closes the write queue
+            with self._embed_lock:
+                self._embed_remaining -= 1
+                last = self._embed_remaining == 0
+            if last:
+                for _ in range(self.upsert_workers):
+                    self._put(self.write_queue, _DONE, stats)
+
+    def _upsert_stage(self):
+        stats = self.stats["upsert"]
+        while True:
+            item = self._get(self.write_queue, stats)
+            if item is _DONE:
+                break
+
+            job_ids, vectors, hashes, batch_no = item
+            started = time.perf_counter()
+            metadata = self.metadata.for_ids(job_ids) if self.metadata is not None else None
+            self.writer.upsert_batch(ids=job_ids, vectors=vectors, metadata=metadata)
+            for sink in self.sinks:
+                sink.add(job_ids, vectors)
+            if self.manifest is not None:
+                self.manifest.record(job_ids, hashes)
+            if self.checkpoint is not None:
+                self.checkpoint.complete(batch_no)
+            stats.add(busy=time.perf_counter() - started, items=1)
+            logging.info(f"Upserted batch ({len(job_ids)} jobs)")
+
+    # ---- plumbing ----
+
+    def _guard(self, stage: Callable[[], None]):
+        try:
+            stage()
+        except _PipelineStopped:
+            pass
+        except BaseException as e:
+            with self._errors_lock:
+                self._errors.append(e)
+            if self.metrics is not None:
+                self.metrics.stage_failures.inc()
+            logging.error(f"Pipeline stage {threading.current_thread().name} failed: {e}")
+            self._stop.set()
+
+    def _put(self, q: queue.Queue, item, stats: StageStats):
+        started = time.perf_counter()
+        try:
+            while True:
+                if self._stop.is_set():
+                    raise _PipelineStopped()
+                try:
+                    q.put(item, timeout=self.poll_interval)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            stats.add(blocked=time.perf_counter() - started)
+
+    def _get(self, q: queue.Queue, stats: StageStats):
+        started = time.perf_counter()
+        try:
+            while True:
+                if self._stop.is_set():
+                    raise _PipelineStopped()
+                try:
+                    return q.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    continue
+        finally:
+            stats.add(starved=time.perf_counter() - started)
+
+
+class _PipelineStopped(Exception):
+    """Raised inside a worker when another stage has failed."""
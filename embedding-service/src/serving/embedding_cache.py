@@ -0,0 +1,199 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import numpy as np
+
+from src.utils.logging import logging
+
+CacheKey = Tuple[str, str, str]
+
+
+def profile_hash(features: np.ndarray) -> str:
+    """
+    Digest of a user-tower input row. The tower's output depends on nothing else, so a
+    re-cleaned profile that changes the features never matches an older entry.
+    """
+    row = np.ascontiguousarray(features, dtype=np.float32)
+    return hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest()
+
+
+class UserEmbeddingCache:
+    """
+    LRU + TTL cache of normalized user-tower outputs keyed by (user_id, model version,
+    profile hash), with an optional on-disk tier shared by the processes of a host.
+
+    The memory tier is an OrderedDict in recency order. The disk tier keeps one small
+    .npz per user and version (vector plus the profile hash it was computed from),
+    written atomically, so concurrent replicas can share it without coordination; it
+    is meant for local disk or tmpfs, as reads happen on the request path.
+
+    A changed profile is a miss by construction. invalidate() drops a user from both
+    tiers at once, for when a profile is re-cleaned and the old entries should go
+    before they expire.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        ttl_seconds: float = 3600.0,
+        disk_path: Optional[str] = None,
+        metrics=None,
+    ):
+        """
+        :param max_entries: Entries kept in memory; the least recently used go first.
+        :param ttl_seconds: Age after which an entry is recomputed, in either tier.
+        :param disk_path: Directory of the shared tier; None keeps the cache in memory only.
+        :param metrics: ServingMetrics; counts hits, misses, evictions and invalidations.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.disk_path = Path(disk_path) if disk_path else None
+        self.metrics = metrics
+
+        self._entries: "OrderedDict[CacheKey, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._keys_of_user: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+
+        if self.disk_path is not None:
+            self.disk_path.mkdir(parents=True, exist_ok=True)
+            logging.info(f"User embedding cache shares entries through {self.disk_path}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str, model_version: str, features: np.ndarray) -> Optional[np.ndarray]:
+        key = (str(user_id), str(model_version), profile_hash(features))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._count("user_cache_hits")
+                    return entry[0]
+                self._remove(key)
+
+        vector = self._read_disk(key)
+        if vector is not None:
+            self._insert(key, vector, now)
+            self._count("user_cache_disk_hits")
+            return vector
+
+        self._count("user_cache_misses")
+        return None
+
+    def put(self, user_id: str, model_version: str, features: np.ndarray, vector: np.ndarray):
+        key = (str(user_id), str(model_version), profile_hash(features))
+        # Owned by the cache: callers often hand in a row of a larger batch
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        self._insert(key, vector, time.monotonic())
+        self._write_disk(key, vector)
+
+    def invalidate(self, user_ids: Iterable[str]) -> int:
+        """
+        Drops every cached embedding of the given users, in all model versions.
+        Returns the number of entries removed from memory and disk.
+        """
+        removed = 0
+        for user_id in map(str, user_ids):
+            with self._lock:
+                for key in list(self._keys_of_user.get(user_id, ())):
+                    self._remove(key)
+                    removed += 1
+            if self.disk_path is not None:
+                for path in self.disk_path.glob(f"*/{self._user_file(user_id)}"):
+                    path.unlink(missing_ok=True)
+                    removed += 1
+        self._count("user_cache_invalidations", removed)
+        self._set_size()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_of_user.clear()
+        self._set_size()
+
+    # ---- memory tier ----
+
+    def _insert(self, key: CacheKey, vector: np.ndarray, now: float):
+        evicted = 0
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (vector, now + self.ttl)
+            self._keys_of_user.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+        self._count("user_cache_evictions", evicted)
+        self._set_size()
+
+    def _remove(self, key: CacheKey):
+        # Caller holds the lock
+        self._entries.pop(key, None)
+        keys = self._keys_of_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_of_user[key[0]]
+
+    # ---- disk tier ----
+
+    @staticmethod
+    def _user_file(user_id: str) -> str:
+        # user ids are free text; the digest keeps them out of the file system's way
+        return hashlib.blake2b(user_id.encode("utf-8"), digest_size=16).hexdigest() + ".npz"
+
+    def _disk_file(self, key: CacheKey) -> Path:
+        return self.disk_path / f"v{key[1]}" / self._user_file(key[0])
+
+    def _read_disk(self, key: CacheKey) -> Optional[np.ndarray]:
+        if self.disk_path is None:
+            return None
+        path = self._disk_file(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                return None
+            with np.load(path) as stored:
+                if str(stored["profile_hash"]) != key[2]:
+                    return None
+                vector = stored["vector"]
+        except (OSError, KeyError, ValueError):
+            # Missing, expired or replaced under us: a miss either way
+            return None
+        vector.setflags(write=False)
+        return vector
+
+    def _write_disk(self, key: CacheKey, vector: np.ndarray):
+        if self.disk_path is None:
+            return
+        path = self._disk_file(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.savez(f, vector=vector, profile_hash=np.array(key[2]))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # The shared tier is an optimization; serving goes on without it
+            tmp_path.unlink(missing_ok=True)
+            logging.warning(f"Could not write the user embedding cache entry {path}: {e}")
+
+    # ---- metrics ----
+
+    def _count(self, name: str, amount: int = 1):
+        if self.metrics is not None and amount:
+            getattr(self.metrics, name).inc(amount)
+
+    def _set_size(self):
+        if self.metrics is not None:
+            self.metrics.user_cache_entries.set(len(self._entries))
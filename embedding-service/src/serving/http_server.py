@@ -0,0 +1,251 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set, Tuple
+
+from src.serving.micro_batcher import MicroBatcher
+from src.serving.recommender import RecommendationRequest, RequestError, TwoStageRecommender
+from src.utils.logging import logging
+
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADERS = 100
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class RecommendationServer:
+    """
+    Minimal asyncio HTTP/1.1 server (keep-alive, JSON bodies) in front of a TwoStageRecommender.
+
+      POST /recommend  {"user_id": "..."} or {"features": [...], "skills": [...], "years_of_experience": 3}
+                       plus optional "top_k", "candidates" and a metadata "filter"
+      POST /invalidate {"user_ids": [...]} drops cached embeddings of re-cleaned users
+      GET  /healthz    model version and the namespace being served
+      GET  /metrics    Prometheus text format
+
+    The event loop only parses and writes; the model, the vector search and the booster run
+    on a small thread pool, so slow requests never hold up accepting and reading new ones.
+    User-tower calls of concurrent requests are coalesced by a MicroBatcher.
+    Built on the standard library to keep the serving path free of extra dependencies.
+    """
+
+    def __init__(
+        self,
+        recommender: TwoStageRecommender,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        executor_threads: int = 4,
+        refresh_interval: float = 30.0,
+        batch_max_size: int = 64,
+        batch_max_wait_ms: float = 2.0,
+        metrics=None,
+    ):
+        """
+        :param executor_threads: Requests computed at once.
+        :param refresh_interval: Seconds between checks of the index alias; 0 disables them.
+        :param batch_max_size: Most requests coalesced into one user-tower forward pass.
+        :param batch_max_wait_ms: Longest a request waits for its batch to fill; 0 runs the
+                                  user tower per request instead.
+        :param metrics: ServingMetrics, rendered on /metrics.
+        """
+        self.recommender = recommender
+        self.host = host
+        self.port = port
+        self.refresh_interval = refresh_interval
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(max_workers=executor_threads, thread_name_prefix="recommend")
+        self.batcher = None
+        if batch_max_wait_ms > 0:
+            self.batcher = MicroBatcher(
+                recommender.embed,
+                executor=self.executor,
+                max_batch_size=batch_max_size,
+                max_wait_ms=batch_max_wait_ms,
+                metrics=metrics
+            )
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._background: Set[asyncio.Future] = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logging.info(f"Serving recommendations on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        await self.start()
+        refresher = asyncio.create_task(self._refresh_index()) if self.refresh_interval > 0 else None
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            if refresher is not None:
+                refresher.cancel()
+            self.executor.shutdown(wait=False)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    # ---- request handling ----
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    break
+
+                headers = await self._read_headers(reader)
+                if headers is None:
+                    await self._respond(writer, 400, {"error": f"More than {MAX_HEADERS} headers"}, keep_alive=False)
+                    break
+                length = self._content_length(headers)
+                if length is None:
+                    await self._respond(writer, 400, {"error": "Invalid Content-Length"}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "Request body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                status, payload = await self._dispatch(method, path.split("?", 1)[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> Optional[Dict[str, str]]:
+        """
+        The request's headers, or None when there are more than MAX_HEADERS of them.
+        """
+        headers = {}
+        for _ in range(MAX_HEADERS + 1):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return None
+
+    @staticmethod
+    def _content_length(headers: Dict[str, str]) -> Optional[int]:
+        """
+        The body length, or None when the header is not a non-negative decimal number.
+        """
+        value = headers.get("content-length", "") or "0"
+        if not (value.isascii() and value.isdigit()):
+            return None
+        return int(value)
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, object]:
+        if path == "/recommend":
+            if method != "POST":
+                return 405, {"error": "Use POST"}
+            return await self._recommend(body)
+        if path == "/invalidate":
+            if method != "POST":
+                return 405, {"error": "Use POST"}
+            # Removing the disk tier's files is blocking I/O
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._invalidate, body)
+        if path == "/healthz" and method == "GET":
+            _, namespace = self.recommender.index.current()
+            return 200, {"status": "ok", "model_version": self.recommender.model_version, "namespace": namespace}
+        if path == "/metrics" and method == "GET" and self.metrics is not None:
+            return 200, self.metrics.registry.render()
+        return 404, {"error": f"No route for {method} {path}"}
+
+    async def _recommend(self, body: bytes) -> Tuple[int, object]:
+        started = time.perf_counter()
+        try:
+            request = RecommendationRequest.from_json(json.loads(body or b"{}"))
+            user_vector = candidates = None
+            loop = asyncio.get_running_loop()
+            if self.batcher is not None:
+                features, candidates, user_vector = await loop.run_in_executor(
+                    self.executor, self.recommender.lookup, request
+                )
+                if candidates is None and user_vector is None:
+                    # Coalesced with the other requests in flight into one user-tower pass
+                    user_vector = await self.batcher.submit(features)
+                    # Not awaited: the response does not wait for the cache write
+                    remembered = loop.run_in_executor(self.executor, self.recommender.remember, request, features, user_vector)
+                    self._background.add(remembered)
+                    remembered.add_done_callback(self._cache_write_done)
+            embedded = time.perf_counter()
+
+            result = await loop.run_in_executor(
+                self.executor, self.recommender.recommend, request, user_vector, candidates
+            )
+            if user_vector is not None:
+                result["timings_ms"]["embed"] = round(1000 * (embedded - started), 3)
+                result["timings_ms"]["total"] = round(1000 * (time.perf_counter() - started), 3)
+            status = 200
+        except (json.JSONDecodeError, UnicodeDecodeError, RequestError) as e:
+            # Malformed JSON, an invalid request or an unknown user; anything else is our fault
+            status, result = 400, {"error": str(e)}
+        except Exception as e:
+            logging.error(f"Recommendation failed: {e}")
+            status, result = 500, {"error": "Internal error"}
+
+        if self.metrics is not None:
+            self.metrics.request_seconds.observe(time.perf_counter() - started)
+            (self.metrics.requests if status == 200 else self.metrics.errors).inc()
+        return status, result
+
+    def _cache_write_done(self, future: asyncio.Future):
+        self._background.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logging.warning(f"Could not cache a user embedding: {future.exception()}")
+
+    def _invalidate(self, body: bytes) -> Tuple[int, object]:
+        try:
+            payload = json.loads(body or b"{}")
+            user_ids = payload["user_ids"] if isinstance(payload, dict) else None
+            if not isinstance(user_ids, list):
+                raise ValueError("Expected {\"user_ids\": [...]}")
+        except (ValueError, KeyError) as e:
+            return 400, {"error": str(e).strip("'\"")}
+
+        cache = self.recommender.cache
+        removed = cache.invalidate(user_ids) if cache is not None else 0
+        logging.info(f"Invalidated {removed} cached embedding(s) of {len(user_ids)} user(s)")
+        return 200, {"invalidated": removed}
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    # ---- index refresh ----
+
+    async def _refresh_index(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await loop.run_in_executor(self.executor, self.recommender.index.refresh)
+            except Exception as e:
+                logging.warning(f"Could not refresh the serving index: {e}")
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row model calls into batched ones.
+
+    Requests wait in the event loop until either `max_batch_size` rows are pending or the
+    oldest has waited `max_wait_ms`; then one call of `batch_fn` on the stacked rows runs
+    on the executor and each request gets its own row of the output back. A forward pass of
+    the user tower on 64 rows costs little more than on one, so under load this trades a
+    bounded wait for far fewer passes; when traffic is light a request waits at most
+    `max_wait_ms`.
+
+    Must be used from a single event loop (the HTTP server's).
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[np.ndarray], np.ndarray],
+        executor: Optional[Executor] = None,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        metrics=None,
+    ):
+        """
+        :param batch_fn: Maps a (n, d_in) float32 batch to a (n, d_out) array, row for row.
+        :param executor: Where batch_fn runs; None uses the loop's default executor.
+        :param metrics: ServingMetrics; records batch sizes, fill and queueing delay.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.metrics = metrics
+
+        self._pending: List[Tuple[np.ndarray, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks; an unreferenced batch could be collected mid-flight
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, row: np.ndarray) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        if self._pending:
+            # More than one batch arrived in the same tick; the rest goes out right after
+            self._timer = asyncio.get_running_loop().call_soon(self._flush)
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _forward(self, rows: np.ndarray) -> Tuple[float, float, np.ndarray]:
+        # Runs on the executor; the start is taken there, after any wait for a free thread
+        started = time.perf_counter()
+        outputs = self.batch_fn(rows)
+        return started, time.perf_counter(), outputs
+
+    async def _run(self, batch: List[Tuple[np.ndarray, asyncio.Future, float]]):
+        try:
+            rows = np.stack([row for row, _, _ in batch])
+            loop = asyncio.get_running_loop()
+            started, finished, outputs = await loop.run_in_executor(self.executor, self._forward, rows)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if self.metrics is not None:
+            self.metrics.batch_size.observe(len(batch))
+            self.metrics.batch_fill.observe(len(batch) / self.max_batch_size)
+            # Queueing is everything before the forward pass: the batching window and the executor queue
+            for _, _, enqueued in batch:
+                self.metrics.queue_delay_seconds.observe(started - enqueued)
+            self.metrics.embed_seconds.observe(finished - started)
+        for i, (_, future, _) in enumerate(batch):
+            # A client that disconnected has its future cancelled already
+            if not future.done():
+                future.set_result(outputs[i])
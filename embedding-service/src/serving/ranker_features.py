@@ -0,0 +1,86 @@
+import re
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logging import logging
+
+# Column order the ranker was trained with (model-training-service ranker_config)
+RANKER_FEATURES = ("skill_overlap_score", "experience_gap")
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+# "3+ years", "2-4 years", "5 yrs"; the lower bound is taken as the requirement
+_REQUIRED_YEARS = re.compile(r"(\d{1,2})\s*\+?\s*(?:-|to)?\s*(?:\d{1,2}\s*)?\+?\s*(?:years?|yrs?)\b")
+
+
+class RankerFeatureBuilder:
+    """
+    Builds the ranker's (user, job) cross features for a list of candidates:
+
+      skill_overlap_score  share of the user's skills that appear in the job title or
+                           description, in [0, 1]
+      experience_gap       user years of experience minus the years the description asks
+                           for, rounded and clipped to `gap_range`; 0 when the job states none
+
+    Everything per job is prepared once at startup (token set, required years), so a
+    request costs a few set lookups per candidate and no text scanning.
+    """
+
+    def __init__(self, jobs_path: str, feature_names: Sequence[str] = RANKER_FEATURES, gap_range: Tuple[int, int] = (-5, 5)):
+        """
+        :param jobs_path: Cleaned jobs (data-service JobCleaner output), JSON list or Parquet.
+        :param feature_names: Column order of the returned matrix; must match the booster.
+        :param gap_range: Range experience_gap was generated in for training.
+        """
+        unknown = set(feature_names) - set(RANKER_FEATURES)
+        if unknown:
+            raise ValueError(f"Cannot build ranker feature(s) {sorted(unknown)}")
+        self.feature_names = tuple(feature_names)
+        self.gap_range = gap_range
+
+        path = Path(jobs_path)
+        columns = ["job_id", "job_title", "job_description"]
+        jobs = pd.read_parquet(path, columns=columns) if path.suffix == ".parquet" else pd.read_json(path)[columns]
+        jobs = jobs.drop_duplicates(subset="job_id", keep="last")
+
+        text = (jobs["job_title"].fillna("") + " " + jobs["job_description"].fillna("")).str.lower()
+        self.index = pd.Index(jobs["job_id"].astype(str))
+        self.tokens: List[frozenset] = [frozenset(_TOKEN.findall(t)) for t in text]
+        self.required_years = (
+            text.str.extract(_REQUIRED_YEARS, expand=False).astype(float).to_numpy(dtype=np.float32)
+        )
+        logging.info(
+            f"Prepared ranker features for {len(self.index)} jobs "
+            f"({int(np.isfinite(self.required_years).sum())} state required years)"
+        )
+
+    def build(self, profile: Dict, job_ids: Sequence[str]) -> np.ndarray:
+        """
+        :param profile: Cleaned user fields; uses `skills` and `years_of_experience`.
+        Returns a float32 matrix of shape (len(job_ids), len(feature_names)).
+        """
+        rows = self.index.get_indexer([str(i) for i in job_ids])
+        found = rows >= 0
+        columns = {}
+
+        if "skill_overlap_score" in self.feature_names:
+            skills = [_TOKEN.findall(str(s).lower()) for s in profile.get("skills") or []]
+            skills = [tokens for tokens in skills if tokens]
+            overlap = np.zeros(len(rows), dtype=np.float32)
+            if skills:
+                for i, row in enumerate(rows):
+                    if row >= 0:
+                        job_tokens = self.tokens[row]
+                        overlap[i] = sum(job_tokens.issuperset(tokens) for tokens in skills)
+                overlap /= len(skills)
+            columns["skill_overlap_score"] = overlap
+
+        if "experience_gap" in self.feature_names:
+            years = float(profile.get("years_of_experience") or 0.0)
+            required = np.where(found, self.required_years[np.where(found, rows, 0)], np.nan)
+            gap = np.where(np.isfinite(required), np.rint(years - required), 0.0)
+            columns["experience_gap"] = np.clip(gap, *self.gap_range).astype(np.float32)
+
+        return np.column_stack([columns[name] for name in self.feature_names]).astype(np.float32, copy=False)
@@ -0,0 +1,336 @@
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from src.serving.embedding_cache import UserEmbeddingCache, profile_hash
+from src.serving.ranker_features import RANKER_FEATURES, RankerFeatureBuilder
+from src.serving.user_store import UserStore
+from src.user_topk import UserTopKStore
+from src.utils.logging import logging
+
+
+class RequestError(ValueError):
+    """
+    A request the service cannot answer as sent; the HTTP layer returns it as a 400.
+    """
+
+
+class UnknownUserError(RequestError):
+    """
+    A user_id the user store has no features for.
+    """
+
+
+class BoosterRanker:
+    """
+    The XGBoost ranking model saved by model-training-service's train_ranker (Booster.save_model).
+    """
+
+    def __init__(self, model_path: str, threads: int = 1):
+        """
+        :param threads: XGBoost threads per prediction. A request scores a few hundred rows,
+                        where one thread beats the cost of waking a pool.
+        """
+        try:
+            import xgboost as xgb
+        except ImportError as e:
+            raise ImportError("Serving the ranker needs xgboost (pip install xgboost)") from e
+
+        self.booster = xgb.Booster(model_file=model_path)
+        self.booster.set_param({"nthread": threads})
+        self.feature_names = tuple(self.booster.feature_names or RANKER_FEATURES)
+        logging.info(f"Loaded ranker from {model_path} with features {list(self.feature_names)}")
+
+    def score(self, features: np.ndarray) -> np.ndarray:
+        # inplace_predict skips building a DMatrix, which dominates at this size
+        return np.asarray(self.booster.inplace_predict(features), dtype=np.float32)
+
+
+class LiveIndex:
+    """
+    The vector index retrieval reads from. With blue-green publishing, `resolve()` returns
+    the namespace behind the alias and refresh() reopens the index once it changes, so a
+    running service follows a publish without a restart.
+    """
+
+    def __init__(self, open_index: Callable[[Optional[str]], object], resolve: Callable[[], Optional[str]] = lambda: None):
+        """
+        :param open_index: Opens the backend of a namespace (None for the default one).
+        :param resolve: Current namespace to serve.
+        """
+        self._open_index = open_index
+        self._resolve = resolve
+        self.namespace = resolve()
+        self.backend = open_index(self.namespace)
+        self._lock = threading.Lock()
+
+    def current(self) -> Tuple[object, Optional[str]]:
+        with self._lock:
+            return self.backend, self.namespace
+
+    def refresh(self) -> bool:
+        namespace = self._resolve()
+        if namespace == self.namespace:
+            return False
+        backend = self._open_index(namespace)
+        with self._lock:
+            previous, self.backend, self.namespace = self.backend, backend, namespace
+        logging.info(f"Serving index switched to namespace {namespace}")
+        previous.close()
+        return True
+
+
+@dataclass
+class RecommendationRequest:
+    user_id: Optional[str] = None
+    # Raw user-tower input for users the service has no features for
+    features: Optional[List[float]] = None
+    # Profile fields for the ranker; default to the stored profile of user_id
+    skills: Optional[List[str]] = None
+    years_of_experience: Optional[float] = None
+    top_k: int = 10
+    candidates: Optional[int] = None
+    filter: Optional[Dict] = None
+
+    @classmethod
+    def from_json(cls, payload: Dict) -> "RecommendationRequest":
+        if not isinstance(payload, dict):
+            raise RequestError("Expected a JSON object")
+        unknown = set(payload) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise RequestError(f"Unknown field(s) {sorted(unknown)}")
+        request = cls(**payload)
+        if request.user_id is None and request.features is None:
+            raise RequestError("Give a user_id or the user's features")
+        if request.features is not None and not isinstance(request.features, list):
+            raise RequestError("features must be a list of numbers")
+        if not _positive_int(request.top_k):
+            raise RequestError("top_k must be a positive integer")
+        if request.candidates is not None and not _positive_int(request.candidates):
+            raise RequestError("candidates must be a positive integer")
+        if request.filter is not None and not isinstance(request.filter, dict):
+            raise RequestError("filter must be a JSON object")
+        return request
+
+
+def _positive_int(value) -> bool:
+    # bool is an int subclass; "top_k": true is a client bug, not 1
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+@dataclass
+class Recommendation:
+    job_id: str
+    score: float
+    retrieval_score: float
+    features: Dict[str, float] = field(default_factory=dict)
+
+
+class TwoStageRecommender:
+    """
+    Retrieval with the two-tower model, then ranking with the XGBoost booster:
+
+      user features -> user_tower (or the user embedding cache) -> L2-normalized query
+                    -> top-N jobs from the vector index (exact and filterable on the local store)
+                    -> (skill_overlap_score, experience_gap) per candidate -> booster -> top-K
+
+    Known users with an unchanged profile skip the first two steps when a precomputed
+    UserTopKStore holds their top-N and the request has no filter.
+
+    Every step is synchronous and releases the GIL in torch / NumPy / XGBoost, so the HTTP
+    layer runs it on a thread pool.
+    """
+
+    def __init__(
+        self,
+        user_tower: torch.nn.Module,
+        index: LiveIndex,
+        ranker: BoosterRanker,
+        ranker_features: RankerFeatureBuilder,
+        user_store: UserStore,
+        model_version: str,
+        candidates: int = 200,
+        max_top_k: int = 100,
+        max_candidates: int = 1000,
+        cache: Optional[UserEmbeddingCache] = None,
+        precomputed: Optional[UserTopKStore] = None,
+        metrics=None,
+    ):
+        """
+        :param candidates: Jobs retrieved per request and handed to the ranker (top-N).
+        :param max_candidates: Cap on the top-N a request may ask for.
+        :param cache: Embeddings of returning users; None runs the user tower every time.
+        :param precomputed: Offline top-k jobs per user, used in place of online retrieval.
+        :param metrics: ServingMetrics for per-stage latency.
+        """
+        self.user_tower = user_tower.eval()
+        self.device = next(user_tower.parameters()).device
+        self.index = index
+        self.ranker = ranker
+        self.ranker_features = ranker_features
+        self.user_store = user_store
+        self.model_version = str(model_version)
+        self.candidates = candidates
+        self.max_top_k = max_top_k
+        self.max_candidates = max(max_candidates, candidates, max_top_k)
+        self.cache = cache
+        self.precomputed = precomputed
+        if precomputed is not None and precomputed.model_version != self.model_version:
+            logging.warning(
+                f"Precomputed top-k at {precomputed.path} is for model version {precomputed.model_version}, "
+                f"not {self.model_version}; every request falls back to online retrieval"
+            )
+        self.metrics = metrics
+
+    @torch.inference_mode()
+    def embed(self, features: np.ndarray) -> np.ndarray:
+        """
+        Normalized user-tower outputs for a (n, input_dim) batch of user features.
+        """
+        inputs = torch.from_numpy(np.ascontiguousarray(features, dtype=np.float32)).to(self.device)
+        return F.normalize(self.user_tower(inputs), p=2, dim=1).cpu().numpy()
+
+    def user_features(self, request: RecommendationRequest) -> np.ndarray:
+        if request.features is not None:
+            try:
+                features = np.asarray(request.features, dtype=np.float32)
+            except (TypeError, ValueError) as e:
+                raise RequestError(f"features must be a list of numbers: {e}") from e
+            if features.shape != (self.user_store.input_dim,):
+                raise RequestError(f"Expected {self.user_store.input_dim} user features, got {features.shape}")
+            return features
+
+        features = self.user_store.features_for(request.user_id)
+        if features is None:
+            raise UnknownUserError(f"Unknown user_id '{request.user_id}'; send the user's features instead")
+        return features
+
+    def cached_vector(self, request: RecommendationRequest, features: np.ndarray) -> Optional[np.ndarray]:
+        # Only known users are cached; anonymous feature vectors rarely come back
+        if self.cache is None or request.user_id is None:
+            return None
+        return self.cache.get(request.user_id, self.model_version, features)
+
+    def remember(self, request: RecommendationRequest, features: np.ndarray, user_vector: np.ndarray):
+        if self.cache is not None and request.user_id is not None:
+            self.cache.put(request.user_id, self.model_version, features, user_vector)
+
+    def candidate_count(self, request: RecommendationRequest) -> int:
+        wanted = max(request.candidates or self.candidates, min(request.top_k, self.max_top_k))
+        return min(wanted, self.max_candidates)
+
+    def precomputed_candidates(self, request: RecommendationRequest, features: np.ndarray) -> Optional[List[Tuple[str, float]]]:
+        """
+        The user's retrieval results from the precomputed store, when it can answer the
+        request: a known user whose features are unchanged, no filter, enough entries.
+        """
+        store = self.precomputed
+        if store is None or request.user_id is None or request.filter is not None:
+            return None
+        n = self.candidate_count(request)
+        if n > store.k or store.model_version != self.model_version:
+            return None
+        candidates = store.lookup(request.user_id, profile_hash(features), n)
+        if candidates is not None and self.metrics is not None:
+            self.metrics.precomputed_hits.inc()
+        return candidates
+
+    def lookup(self, request: RecommendationRequest) -> Tuple[np.ndarray, Optional[List[Tuple[str, float]]], Optional[np.ndarray]]:
+        """
+        The user's features and what can stand in for a user-tower pass: precomputed
+        candidates, else a cached embedding (either may be None). Reads the user store and
+        the cache's disk tier, so the HTTP layer runs it off the event loop.
+        """
+        features = self.user_features(request)
+        candidates = self.precomputed_candidates(request, features)
+        user_vector = self.cached_vector(request, features) if candidates is None else None
+        return features, candidates, user_vector
+
+    def profile(self, request: RecommendationRequest) -> Dict:
+        profile = dict(self.user_store.profile_for(request.user_id)) if request.user_id is not None else {}
+        if request.skills is not None:
+            profile["skills"] = request.skills
+        if request.years_of_experience is not None:
+            profile["years_of_experience"] = request.years_of_experience
+        return profile
+
+    def recommend(
+        self,
+        request: RecommendationRequest,
+        user_vector: Optional[np.ndarray] = None,
+        candidates: Optional[List[Tuple[str, float]]] = None,
+    ) -> Dict:
+        """
+        :param user_vector: Normalized user embedding when the caller already has it;
+                            otherwise it comes from the cache or the user tower is run
+                            for this request alone.
+        :param candidates: Retrieval results when the caller already has them (precomputed).
+        """
+        timings = {}
+        started = time.perf_counter()
+
+        embedded_here = False
+        if user_vector is None and candidates is None:
+            features, candidates, user_vector = self.lookup(request)
+            if candidates is None:
+                embedded_here = True
+                if user_vector is None:
+                    user_vector = self.embed(features[None, :])[0]
+                    self.remember(request, features, user_vector)
+                timings["embed"] = time.perf_counter() - started
+
+        top_k = min(request.top_k, self.max_top_k)
+        backend, namespace = self.index.current()
+        retrieved_here = candidates is None
+        if retrieved_here:
+            mark = time.perf_counter()
+            candidates = backend.query(user_vector[None, :], top_k=self.candidate_count(request), filter=request.filter)[0]
+            timings["retrieve"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        items = self.rank(self.profile(request), candidates, top_k)
+        timings["rank"] = time.perf_counter() - mark
+        timings["total"] = time.perf_counter() - started
+
+        if self.metrics is not None:
+            if embedded_here:
+                self.metrics.embed_seconds.observe(timings["embed"])
+            if retrieved_here:
+                self.metrics.retrieve_seconds.observe(timings["retrieve"])
+            self.metrics.rank_seconds.observe(timings["rank"])
+            self.metrics.candidates.observe(len(candidates))
+
+        return {
+            "user_id": request.user_id,
+            "model_version": self.model_version,
+            "namespace": namespace,
+            "items": [asdict(item) for item in items],
+            "timings_ms": {stage: round(1000 * seconds, 3) for stage, seconds in timings.items()},
+        }
+
+    def rank(self, profile: Dict, candidates: Sequence[Tuple[str, float]], top_k: int) -> List[Recommendation]:
+        if not candidates:
+            return []
+        job_ids = [job_id for job_id, _ in candidates]
+        features = self.ranker_features.build(profile, job_ids)
+        scores = self.ranker.score(features)
+
+        keep = min(top_k, len(job_ids))
+        top = np.argpartition(-scores, keep - 1)[:keep]
+        # Ties in the ranker score keep the retrieval order
+        top = top[np.lexsort((top, -scores[top]))]
+        names = self.ranker_features.feature_names
+        return [
+            Recommendation(
+                job_id=job_ids[i],
+                score=float(scores[i]),
+                retrieval_score=float(candidates[i][1]),
+                features={name: float(value) for name, value in zip(names, features[i])},
+            )
+            for i in top
+        ]
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logging import logging
+
+
+class UserStore:
+    """
+    Local lookup of what the service needs about a known user: the user-tower input
+    (`user_embedding` from the data-service feature transform) and the cleaned profile
+    fields the ranker features are built from.
+
+    Both files are loaded once into memory; the features as one float32 matrix with a
+    pandas index on user_id, so a lookup is a hash probe and a row view.
+    """
+
+    def __init__(self, features_path: str, profiles_path: Optional[str] = None):
+        """
+        :param features_path: user_id + user_embedding, as JSON lines (data-service output) or Parquet.
+        :param profiles_path: Cleaned users (a JSON list with skills, years_of_experience, ...).
+        """
+        self.features_path = Path(features_path)
+        self.profiles_path = Path(profiles_path) if profiles_path else None
+
+        frame = self._read_features()
+        frame = frame.drop_duplicates(subset="user_id", keep="last")
+        self.index = pd.Index(frame["user_id"].astype(str))
+        self.features = np.asarray(np.stack(frame["user_embedding"].to_numpy()), dtype=np.float32)
+
+        self.profiles: Dict[str, Dict] = {}
+        if self.profiles_path is not None:
+            with open(self.profiles_path, "r", encoding="utf-8") as f:
+                self.profiles = {str(user["user_id"]): user for user in json.load(f)}
+        logging.info(
+            f"Loaded features for {len(self.index)} users (dim={self.input_dim}) "
+            f"and {len(self.profiles)} profiles"
+        )
+
+    @property
+    def input_dim(self) -> int:
+        return self.features.shape[1]
+
+    def features_for(self, user_id: str) -> Optional[np.ndarray]:
+        row = self.index.get_indexer([str(user_id)])[0]
+        return self.features[row] if row >= 0 else None
+
+    def profile_for(self, user_id: str) -> Dict:
+        return self.profiles.get(str(user_id), {})
+
+    def _read_features(self) -> pd.DataFrame:
+        if self.features_path.suffix == ".parquet":
+            return pd.read_parquet(self.features_path, columns=["user_id", "user_embedding"])
+        return pd.read_json(self.features_path, lines=True)[["user_id", "user_embedding"]]
@@ -0,0 +1,310 @@
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pyarrow.parquet as pq
+
+from src.utils.commons import file_fingerprint
+from src.utils.logging import logging
+
+
+@dataclass(frozen=True)
+class Shard:
+    shard_id: int
+    row_groups: List[int]
+    rows: int
+
+
+@dataclass(frozen=True)
+class WorkerSettings:
+    """
+    Everything a worker process needs to build its own model, reader and writer.
+    Only plain config dataclasses, so it pickles under the spawn start method.
+    """
+    ml_cfg: object
+    data_cfg: object
+    pc_cfg: object
+    pipeline_cfg: object
+    upsert_cfg: object
+    store_cfg: object
+    inference_cfg: object
+    model_version: str
+    torch_threads: int
+    namespace: Optional[str] = None  # versioned namespace to write to (blue-green publishing)
+    metadata_cfg: object = None  # attach filterable job metadata to the vectors when enabled
+    batch_tuning_cfg: object = None  # adaptive batch size, tuned per worker process
+
+
+def plan_shards(source_path: str, num_shards: int) -> List[Shard]:
+    """
+    Splits a Parquet file into contiguous runs of row groups with roughly equal row counts.
+    Row groups are the smallest unit a reader can seek to, so there are at most as many
+    shards as row groups.
+    """
+    metadata = pq.ParquetFile(source_path).metadata
+    sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+    num_shards = max(1, min(num_shards, len(sizes)))
+    target = sum(sizes) / num_shards
+
+    shards: List[Shard] = []
+    current: List[int] = []
+    cumulative = 0
+    for group, rows in enumerate(sizes):
+        current.append(group)
+        cumulative += rows
+
+        shards_left = num_shards - len(shards) - 1
+        groups_left = len(sizes) - group - 1
+        # Cut where the boundary is closest: before the next group if it would overshoot by more than half
+        next_rows = sizes[group + 1] if groups_left else 0
+        boundary = target * (len(shards) + 1)
+        if shards_left > 0 and (cumulative + next_rows / 2 >= boundary or groups_left == shards_left):
+            shards.append(Shard(len(shards), current, sum(sizes[g] for g in current)))
+            current = []
+
+    if current:
+        shards.append(Shard(len(shards), current, sum(sizes[g] for g in current)))
+    return shards
+
+
+class ShardState:
+    """
+    Per-shard completion markers for one (source file, model version) pair.
+
+    Layout of `state_dir`:
+      plan.json             source fingerprint, model version and the shard plan
+      shard-00003.done.json rows and seconds of a finished shard
+
+    The plan is kept as long as the source file and model version are unchanged, so a
+    restarted run gets the same shards and skips the ones already marked done.
+    """
+
+    def __init__(self, state_dir: str, source_path: str, model_name: str, model_version: str):
+        self.state_dir = Path(state_dir)
+        self.source_path = source_path
+        self.key = {
+            "source": file_fingerprint(source_path),
+            "model_name": model_name,
+            "model_version": str(model_version),
+        }
+
+    def load_or_plan(self, num_shards: int, resume: bool = True) -> List[Shard]:
+        plan_path = self.state_dir / "plan.json"
+        if resume and plan_path.exists():
+            with open(plan_path, "r") as f:
+                saved = json.load(f)
+            if saved.get("key") == self.key:
+                return [Shard(**shard) for shard in saved["shards"]]
+            logging.info("Source file or model version changed since the last sharded run; starting over.")
+
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        shards = plan_shards(self.source_path, num_shards)
+        self._write_json(plan_path, {"key": self.key, "shards": [asdict(shard) for shard in shards]})
+        return shards
+
+    def is_done(self, shard: Shard) -> bool:
+        return self._done_path(shard.shard_id).exists()
+
+    def mark_done(self, shard: Shard, result: Dict):
+        self._write_json(self._done_path(shard.shard_id), result)
+
+    def _done_path(self, shard_id: int) -> Path:
+        return self.state_dir / f"shard-{shard_id:05d}.done.json"
+
+    @staticmethod
+    def _write_json(path: Path, payload: Dict):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+
+# ---- worker process ----
+
+# Set once per worker by _init_worker; the model is loaded once and reused for every shard
+_worker: Dict = {}
+
+
+def _init_worker(settings: WorkerSettings):
+    import torch
+
+    from src.batch_tuner import build_batch_sizer
+    from src.embedder import JobEmbedder
+    from src.job_metadata import JobMetadataBuilder
+    from src.model_loader import ModelLoader
+    from src.vector_store.factory import build_backend
+
+    # N processes each using every core would oversubscribe the box
+    torch.set_num_threads(settings.torch_threads)
+
+    ml_cfg, inference_cfg = settings.ml_cfg, settings.inference_cfg
+    loader = ModelLoader(
+        ml_cfg.model_name,
+        settings.model_version,
+        cache_dir=str(ml_cfg.cache_dir) if ml_cfg.cache_dir else None,
+        fuse=inference_cfg.fuse_batchnorm,
+        quantize=inference_cfg.quantize_int8
+    )
+    _worker["settings"] = settings
+    # One sizer per worker, kept across its shards, so later shards start at the tuned size
+    tuning_cfg = settings.batch_tuning_cfg
+    _worker["batch_sizer"] = build_batch_sizer(tuning_cfg, settings.pipeline_cfg) if tuning_cfg is not None else None
+    _worker["embedder"] = JobEmbedder(model=loader.get_model(), batch_sizer=_worker["batch_sizer"])
+    _worker["backend"] = build_backend(
+        settings.store_cfg, settings.pc_cfg, pool_threads=settings.upsert_cfg.parallelism, namespace=settings.namespace
+    )
+    metadata_cfg = settings.metadata_cfg
+    _worker["metadata"] = (
+        JobMetadataBuilder(str(metadata_cfg.source_path)) if metadata_cfg is not None and metadata_cfg.enabled else None
+    )
+    logging.info(f"Shard worker {os.getpid()} ready with {settings.torch_threads} torch threads")
+
+
+def _run_shard(shard: Shard) -> Dict:
+    """
+    Embeds and writes one shard. Errors are returned rather than raised so the parent
+    keeps collecting the other shards and only the failed ones are redone on resume.
+    """
+    from src.feature_reader import FeatureReader
+    from src.pipeline import EmbeddingPipeline
+    from src.vector_writer import VectorWriter
+
+    settings: WorkerSettings = _worker["settings"]
+    data_cfg, pipeline_cfg, upsert_cfg = settings.data_cfg, settings.pipeline_cfg, settings.upsert_cfg
+    started = time.perf_counter()
+    writer = VectorWriter(
+        backend=_worker["backend"],
+        dimension=settings.pc_cfg.dimension,
+        max_records_per_chunk=upsert_cfg.max_records_per_chunk,
+        max_payload_bytes=upsert_cfg.max_payload_bytes,
+        parallelism=upsert_cfg.parallelism,
+        max_retries=upsert_cfg.max_retries,
+        backoff_base=upsert_cfg.backoff_base,
+        backoff_max=upsert_cfg.backoff_max
+    )
+    try:
+        reader = FeatureReader(
+            source_path=str(data_cfg.source_path),
+            batch_size=data_cfg.batch_size,
+            streaming=data_cfg.streaming,
+            row_groups=shard.row_groups,
+            batch_sizer=_worker["batch_sizer"]
+        )
+        pipeline = EmbeddingPipeline(
+            reader=reader,
+            embedder=_worker["embedder"],
+            writer=writer,
+            queue_depth=pipeline_cfg.queue_depth,
+            embed_workers=1,
+            upsert_workers=pipeline_cfg.upsert_workers,
+            metadata=_worker["metadata"]
+        )
+        pipeline.run()
+        return {"shard_id": shard.shard_id, "rows": shard.rows, "seconds": time.perf_counter() - started, "pid": os.getpid()}
+    except Exception as e:
+        logging.error(f"Shard {shard.shard_id} failed: {e}")
+        return {"shard_id": shard.shard_id, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        writer.close()
+
+
+# ---- parent process ----
+
+class ShardedEmbeddingRunner:
+    """
+    Runs the embedding pipeline over a Parquet file with `workers` processes.
+
+    The file is split by row groups into `workers * shards_per_worker` shards. Every worker
+    loads the model once and writes its vectors through its own backend client; the parent
+    only hands out shards and records each one as done when its vectors are written.
+    A crashed or failed run, restarted with the same file and model version, redoes only
+    the unfinished shards.
+    """
+
+    def __init__(
+        self,
+        settings: WorkerSettings,
+        workers: int,
+        state_dir: str,
+        shards_per_worker: int = 4,
+        resume: bool = True,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        if settings.store_cfg.backend == "local":
+            # The memory-mapped store has a single writer; several processes would corrupt it
+            raise ValueError("The sharded runner needs a shared vector store backend, not 'local'")
+
+        self.settings = settings
+        self.workers = workers
+        self.shards_per_worker = max(1, shards_per_worker)
+        self.resume = resume
+        self.state = ShardState(
+            state_dir,
+            str(settings.data_cfg.source_path),
+            settings.ml_cfg.model_name,
+            settings.model_version
+        )
+
+    def run(self) -> List[Dict]:
+        shards = self.state.load_or_plan(self.workers * self.shards_per_worker, resume=self.resume)
+        pending = [shard for shard in shards if not self.state.is_done(shard)]
+        logging.info(
+            f"Sharded run: {len(shards)} shards, {len(shards) - len(pending)} already done, "
+            f"{len(pending)} to embed on {self.workers} workers"
+        )
+        if not pending:
+            return []
+
+        by_id = {shard.shard_id: shard for shard in pending}
+        results, failures = [], []
+        started = time.perf_counter()
+
+        # Unlike multiprocessing.Pool, the executor notices a worker killed outright (e.g. by the
+        # OOM killer) and fails the outstanding shards instead of waiting for them forever
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(pending)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.settings,)
+        ) as pool:
+            futures = {pool.submit(_run_shard, shard): shard for shard in pending}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    result = {"shard_id": futures[future].shard_id, "error": f"a worker process died, the pool was shut down: {e}"}
+                except Exception as e:
+                    result = {"shard_id": futures[future].shard_id, "error": f"{type(e).__name__}: {e}"}
+                if "error" in result:
+                    failures.append(result)
+                    continue
+                self.state.mark_done(by_id[result["shard_id"]], result)
+                results.append(result)
+                logging.info(
+                    f"Shard {result['shard_id']} done: {result['rows']} rows in {result['seconds']:.1f}s "
+                    f"({len(results)}/{len(pending)})"
+                )
+
+        wall_time = time.perf_counter() - started
+        rows = sum(result["rows"] for result in results)
+        logging.info(f"Sharded run embedded {rows} rows in {wall_time:.1f}s ({rows / max(wall_time, 1e-9):.0f} rows/s)")
+
+        if failures:
+            details = "; ".join(f"shard {f['shard_id']}: {f['error']}" for f in failures)
+            raise RuntimeError(f"{len(failures)} of {len(pending)} shards failed, rerun to resume them ({details})")
+        return results
+
+
+def default_torch_threads(workers: int, configured: Optional[int] = None) -> int:
+    if configured:
+        return configured
+    return max(1, (os.cpu_count() or 1) // workers)
@@ -0,0 +1,148 @@
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Set
+
+from src.utils.logging import logging
+
+
+class IndexIdSet:
+    """
+    The job_ids known to be in the vector index, persisted as a sorted text file with
+    one id per line.
+
+    Used as a pipeline sink, so every id is recorded as soon as its vector is written,
+    including ids written by a run that later fails.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.ids: Set[str] = set()
+        self._lock = threading.Lock()
+        self.exists = self.path.exists()
+        if self.exists:
+            with open(self.path, "r") as f:
+                self.ids = {line.rstrip("\n") for line in f if line.strip()}
+            logging.info(f"Loaded {len(self.ids)} indexed ids from {self.path}")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: Iterable[str], vectors=None):
+        # Sink signature: add(ids, vectors); only the ids matter here
+        with self._lock:
+            self.ids.update(str(i) for i in ids)
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            self.ids.difference_update(str(i) for i in ids)
+
+    def save(self):
+        with self._lock:
+            ids = sorted(self.ids)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            f.writelines(f"{record_id}\n" for record_id in ids)
+        os.replace(tmp_path, self.path)
+        self.exists = True
+
+
+class TombstoneSync:
+    """
+    Deletes from the index every job that is no longer in the feature source.
+
+    The stale set is (ids in the index) - (ids in the source), where the ids in the index
+    come from the persisted IndexIdSet rather than from listing the store on every run.
+    Deletes go through VectorWriter.delete_ids: large batches, sent concurrently, retried;
+    the same ids are then deleted from the local ANN and quantized indexes. A run refuses to
+    delete more than `max_delete_fraction` of the index, which protects the catalog from a
+    truncated or empty source file.
+
+    An id set seeded from the store has never been checked against a source, so the sync
+    right after seeding is a dry run: it only logs what it would delete.
+    """
+
+    def __init__(
+        self,
+        id_set: IndexIdSet,
+        writer,
+        batch_size: int = 1000,
+        max_delete_fraction: float = 0.5,
+        manifest=None,
+        metrics=None,
+        indexes: Optional[Sequence] = None,
+    ):
+        """
+        :param writer: VectorWriter whose backend holds the index.
+        :param batch_size: Ids per delete request.
+        :param manifest: EmbeddingManifest to forget deleted jobs in, so a job that comes back is re-embedded.
+        :param metrics: EmbeddingMetrics; the deleted count goes to embedding_vectors_deleted_total.
+        :param indexes: Local indexes (HNSWIndex, IVFIndex, QuantizedIndex) to delete the same ids from.
+        """
+        self.id_set = id_set
+        self.writer = writer
+        self.batch_size = batch_size
+        self.max_delete_fraction = max_delete_fraction
+        self.manifest = manifest
+        self.metrics = metrics
+        self.indexes = list(indexes or [])
+        self.seeded = False
+
+    def seed_from_backend(self) -> bool:
+        """
+        On the first run there is no id set yet; take it from the store if the backend can list ids.
+        """
+        if self.id_set.exists:
+            return False
+        try:
+            ids = self.writer.backend.list_ids()
+        except NotImplementedError:
+            logging.warning("No indexed id set yet and the backend cannot list ids; stale jobs are tracked from this run on")
+            return False
+        self.id_set.add(ids)
+        self.seeded = True
+        logging.info(f"Seeded the indexed id set with {len(ids)} ids from the vector store")
+        return True
+
+    def sync(self, source_ids: Iterable[str], dry_run: Optional[bool] = None) -> int:
+        """
+        Call after a successful run over the full source. Returns the number of ids deleted.
+        :param dry_run: Only log the stale ids; defaults to True right after seeding from the store.
+        """
+        if dry_run is None:
+            dry_run = self.seeded
+        source = {str(i) for i in source_ids}
+        # Every source job was written (or left unchanged) by the run that just finished
+        self.id_set.add(source)
+        stale: List[str] = sorted(self.id_set.ids - source)
+
+        if not stale:
+            logging.info("Tombstone sync: no stale jobs")
+            return 0
+
+        fraction = len(stale) / max(len(self.id_set), 1)
+        if dry_run:
+            logging.warning(
+                f"Tombstone sync (dry run): would delete {len(stale)} of {len(self.id_set)} indexed jobs "
+                f"({fraction:.0%}), e.g. {stale[:10]}; the next run deletes them unless {self.id_set.path} is removed"
+            )
+            return 0
+        if fraction > self.max_delete_fraction:
+            raise ValueError(
+                f"Tombstone sync would delete {len(stale)} of {len(self.id_set)} indexed jobs ({fraction:.0%}), "
+                f"above max_delete_fraction={self.max_delete_fraction:.0%}; is the source file complete?"
+            )
+
+        deleted = self.writer.delete_ids(stale, batch_size=self.batch_size)
+        for index in self.indexes:
+            index.delete(stale)
+        self.id_set.remove(stale)
+        if self.manifest is not None:
+            self.manifest.forget(stale)
+        if self.metrics is not None:
+            self.metrics.vectors_deleted.inc(len(stale))
+        logging.info(f"Tombstone sync: deleted {len(stale)} stale jobs (store acknowledged {deleted})")
+        return len(stale)
+
@@ -0,0 +1,287 @@
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.embedding_export import ExportedCatalog
+from src.serving.embedding_cache import profile_hash
+from src.utils.logging import logging
+
+MANIFEST_FILE = "topk.json"
+
+
+def blocked_top_k(
+    queries: np.ndarray,
+    catalog: np.ndarray,
+    k: int,
+    query_block: int = 512,
+    catalog_block: int = 16384,
+    threads: int = 1,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k inner products of every query against every catalog row.
+
+    The score matrix is never materialized: each (query_block x catalog_block) tile is
+    reduced to its k best columns with argpartition and merged into the running top-k of
+    its queries. Query blocks run on a thread pool; the matmul and argpartition release
+    the GIL, so the threads overlap. Peak extra memory is about
+    threads * query_block * catalog_block * 4 bytes.
+
+    Returns (rows, scores) of shape (n_queries, k), best first; rows are -1 and scores
+    -inf past the end of a catalog smaller than k.
+    """
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    n, total = len(queries), len(catalog)
+    rows = np.full((n, k), -1, dtype=np.int32)
+    scores = np.full((n, k), -np.inf, dtype=np.float32)
+
+    def run(start: int):
+        end = min(start + query_block, n)
+        best_rows, best_scores = rows[start:end], scores[start:end]
+        for offset in range(0, total, catalog_block):
+            tile = queries[start:end] @ np.asarray(catalog[offset:offset + catalog_block], dtype=np.float32).T
+            keep = min(k, tile.shape[1])
+            # Partitioning for the largest directly saves negating the whole tile
+            top = np.argpartition(tile, tile.shape[1] - keep, axis=1)[:, -keep:]
+
+            merged_scores = np.concatenate([best_scores, np.take_along_axis(tile, top, axis=1)], axis=1)
+            merged_rows = np.concatenate([best_rows, (top + offset).astype(np.int32)], axis=1)
+            winners = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            best_scores[:] = np.take_along_axis(merged_scores, winners, axis=1)
+            best_rows[:] = np.take_along_axis(merged_rows, winners, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores[:] = np.take_along_axis(best_scores, order, axis=1)
+        best_rows[:] = np.take_along_axis(best_rows, order, axis=1)
+
+    starts = range(0, n, query_block)
+    if threads > 1 and n > query_block:
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="topk") as pool:
+            list(pool.map(run, starts))
+    else:
+        for start in starts:
+            run(start)
+    return rows, scores
+
+
+class UserTopKStore:
+    """
+    Precomputed retrieval results: the top-k jobs of every user, for serving known users
+    without running the user tower or the vector search.
+
+    Layout of `path`:
+      topk.json               manifest: model version, catalog generation, k, current file names
+      users.<gen>.txt         one user_id per line, in row order
+      hashes.<gen>.npy        profile hash of each user's tower input when it was computed
+      rows.<gen>.npy          int32 (users, k), rows into jobs.<gen>.txt, -1 past the catalog end
+      scores.<gen>.npy        float32 (users, k), retrieval scores, best first
+      jobs.<gen>.txt          job_ids of the catalog the rows point into
+
+    Jobs are stored as int32 rows rather than strings, and the matrices are memory-mapped,
+    so a store of millions of users opens instantly and a lookup is one dict probe plus
+    a row read. Like the embedding export, every refresh writes a new generation and then
+    swaps the manifest atomically.
+    """
+
+    def __init__(self, path: Path, manifest: Dict, users: List[str], jobs: List[str],
+                 hashes: np.ndarray, rows: np.ndarray, scores: np.ndarray):
+        self.path = path
+        self.manifest = manifest
+        self.users = users
+        self.jobs = jobs
+        self.hashes = hashes
+        self.rows = rows
+        self.scores = scores
+        self._row_of = {user_id: row for row, user_id in enumerate(users)}
+
+    @property
+    def model_version(self) -> str:
+        return str(self.manifest["model_version"])
+
+    @property
+    def catalog_generation(self) -> str:
+        return self.manifest["catalog_generation"]
+
+    @property
+    def k(self) -> int:
+        return self.manifest["k"]
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def lookup(self, user_id: str, features_hash: Optional[str] = None, top_k: Optional[int] = None) -> Optional[List[Tuple[str, float]]]:
+        """
+        :param features_hash: profile_hash of the user's current tower input; a store row
+                              computed from other features is treated as missing.
+        :param top_k: Entries wanted, at most k.
+        Returns (job_id, score) pairs best first, or None when the user is not in the store.
+        """
+        row = self._row_of.get(str(user_id))
+        if row is None or (features_hash is not None and self.hashes[row].decode() != features_hash):
+            return None
+        count = min(top_k or self.k, self.k)
+        job_rows, scores = self.rows[row, :count], self.scores[row, :count]
+        return [(self.jobs[j], float(s)) for j, s in zip(job_rows, scores) if j >= 0]
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = True) -> "UserTopKStore":
+        src = Path(path)
+        with open(src / MANIFEST_FILE, "r") as f:
+            manifest = json.load(f)
+        files = manifest["files"]
+        mode = "r" if mmap else None
+        with open(src / files["users"], "r") as f:
+            users = [line.rstrip("\n") for line in f]
+        with open(src / files["jobs"], "r") as f:
+            jobs = [line.rstrip("\n") for line in f]
+        hashes = np.load(src / files["hashes"], mmap_mode=mode)
+        rows = np.load(src / files["rows"], mmap_mode=mode)
+        scores = np.load(src / files["scores"], mmap_mode=mode)
+        if rows.shape != (len(users), manifest["k"]) or scores.shape != rows.shape or len(hashes) != len(users):
+            raise ValueError(f"User top-k store at {src} does not match its manifest")
+        return cls(src, manifest, users, jobs, hashes, rows, scores)
+
+
+class UserTopKBuilder:
+    """
+    Offline job that fills a UserTopKStore from the user features and the exported catalog.
+
+    Refresh is incremental: against a store of the same model version, catalog generation
+    and k, only users whose tower input changed (or who are new) are embedded and
+    searched; the others keep their rows and users gone from the features are dropped.
+    A new model or catalog invalidates every row, so those runs start over.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embed: Callable[[np.ndarray], np.ndarray],
+        catalog: ExportedCatalog,
+        k: int = 200,
+        embed_batch_size: int = 4096,
+        query_block: int = 512,
+        catalog_block: int = 16384,
+        threads: int = 1,
+    ):
+        """
+        :param embed: Normalized user-tower outputs of a (n, input_dim) feature batch.
+        :param catalog: Normalized job embeddings of the model version being served.
+        :param k: Jobs kept per user; at least the serving candidate count to replace retrieval.
+        :param threads: Threads of the blocked search.
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.embed = embed
+        self.catalog = catalog
+        self.k = k
+        self.embed_batch_size = embed_batch_size
+        self.query_block = query_block
+        self.catalog_block = catalog_block
+        self.threads = threads
+        self.catalog_generation = catalog.manifest["vectors_file"]
+
+    def build(self, user_ids: Sequence[str], features: np.ndarray, full: bool = False) -> Dict[str, int]:
+        """
+        :param features: (len(user_ids), input_dim) user-tower inputs, row i belonging to user_ids[i].
+        :param full: Recompute every user even if a reusable store exists.
+        Returns counts of users computed, reused and dropped.
+        """
+        started = time.perf_counter()
+        user_ids = [str(u) for u in user_ids]
+        hashes = np.array([profile_hash(row) for row in features], dtype="S32")
+
+        previous = None if full else self._reusable_store()
+        reuse = np.full(len(user_ids), -1, dtype=np.int64)
+        dropped = 0
+        if previous is not None:
+            reuse = np.fromiter((previous._row_of.get(u, -1) for u in user_ids), dtype=np.int64, count=len(user_ids))
+            known = reuse >= 0
+            dropped = len(previous) - int(known.sum())
+            known[known] = previous.hashes[reuse[known]] == hashes[known]
+            reuse[~known] = -1
+        changed = np.flatnonzero(reuse < 0)
+
+        rows = np.full((len(user_ids), self.k), -1, dtype=np.int32)
+        scores = np.full((len(user_ids), self.k), -np.inf, dtype=np.float32)
+        kept = np.flatnonzero(reuse >= 0)
+        if len(kept):
+            rows[kept] = previous.rows[reuse[kept]]
+            scores[kept] = previous.scores[reuse[kept]]
+
+        for start in range(0, len(changed), self.embed_batch_size):
+            batch = changed[start:start + self.embed_batch_size]
+            user_vectors = self.embed(np.asarray(features[batch], dtype=np.float32))
+            rows[batch], scores[batch] = blocked_top_k(
+                user_vectors, self.catalog.vectors, self.k,
+                query_block=self.query_block, catalog_block=self.catalog_block, threads=self.threads
+            )
+
+        self._save(user_ids, hashes, rows, scores)
+        counts = {
+            "computed": len(changed),
+            "reused": len(kept),
+            "dropped": dropped,
+        }
+        logging.info(
+            f"User top-{self.k} store at {self.path}: {counts['computed']} computed, {counts['reused']} reused, "
+            f"{counts['dropped']} dropped in {time.perf_counter() - started:.1f}s"
+        )
+        return counts
+
+    def _reusable_store(self) -> Optional[UserTopKStore]:
+        if not (self.path / MANIFEST_FILE).exists():
+            return None
+        previous = UserTopKStore.open(str(self.path))
+        if (previous.model_version, previous.catalog_generation, previous.k) != (
+            self.catalog.model_version, self.catalog_generation, self.k
+        ):
+            logging.info(
+                f"User top-k store at {self.path} was built for another model, catalog or k; recomputing every user"
+            )
+            return None
+        return previous
+
+    def _save(self, user_ids: List[str], hashes: np.ndarray, rows: np.ndarray, scores: np.ndarray):
+        generation = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        files = {
+            "users": f"users.{generation}.txt",
+            "jobs": f"jobs.{generation}.txt",
+            "hashes": f"hashes.{generation}.npy",
+            "rows": f"rows.{generation}.npy",
+            "scores": f"scores.{generation}.npy",
+        }
+        with open(self.path / files["users"], "w") as f:
+            f.writelines(f"{user_id}\n" for user_id in user_ids)
+        with open(self.path / files["jobs"], "w") as f:
+            f.writelines(f"{job_id}\n" for job_id in self.catalog.ids)
+        np.save(self.path / files["hashes"], hashes)
+        np.save(self.path / files["rows"], rows)
+        np.save(self.path / files["scores"], scores)
+
+        manifest = {
+            "model_version": self.catalog.model_version,
+            "catalog_generation": self.catalog_generation,
+            "k": self.k,
+            "users": len(user_ids),
+            "jobs": len(self.catalog),
+            "files": files,
+            "created_at": time.time(),
+        }
+        tmp_path = self.path / (MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.path / MANIFEST_FILE)
+
+        keep = set(files.values())
+        for file in self.path.iterdir():
+            if file.name.startswith(("users.", "jobs.", "hashes.", "rows.", "scores.")) and file.name not in keep:
+                try:
+                    file.unlink()
+                except OSError:
+                    # Still mapped by a reader on a platform that forbids it; the next save retries
+                    pass
@@ -0,0 +1,10 @@
+import os
+from typing import Dict
+
+
+def file_fingerprint(path: str) -> Dict:
+    """
+    Cheap identity of a file (no hashing): a rewritten source file gets a new size or mtime.
+    """
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
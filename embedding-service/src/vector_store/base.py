@@ -0,0 +1,81 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class TransientBackendError(Exception):
+    """
+    Raised by a backend for failures that are worth retrying (throttling, timeouts, 5xx).
+    """
+
+
+class VectorBackend(ABC):
+    """
+    Where VectorWriter sends its chunks. A backend only needs to know how to
+    write one chunk; chunking, concurrency and retries live in VectorWriter.
+    delete, fetch and query are optional and used by retrieval and maintenance jobs.
+
+    A backend writes to and reads from one namespace. count, namespaces and
+    drop_namespace let the blue-green publisher (src/vector_store/versioning.py)
+    verify a freshly written namespace and garbage-collect old ones.
+    """
+
+    @abstractmethod
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadata: Optional[List[Dict]] = None) -> int:
+        """
+        Writes one chunk and returns the number of vectors the store accepted.
+        :param ids: Job IDs of the chunk.
+        :param vectors: float32 array of shape (len(ids), dimension).
+        :param metadata: Optional per-vector metadata dicts.
+        """
+
+    def delete(self, ids: List[str]) -> int:
+        raise NotImplementedError(f"{type(self).__name__} does not support delete")
+
+    def fetch(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        raise NotImplementedError(f"{type(self).__name__} does not support fetch")
+
+    def query(self, vectors: np.ndarray, top_k: int = 10, filter: Optional[Dict] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k search for a batch of query vectors. Returns, per query, (id, score) pairs best first.
+        :param filter: Optional metadata filter in Pinecone's syntax, e.g. {"remote": True, "country": {"$in": ["us", "ca"]}}.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support query")
+
+    def list_ids(self) -> List[str]:
+        """
+        Every id in this backend's namespace. Used once to seed the tombstone id set.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support list_ids")
+
+    def count(self) -> int:
+        """
+        Number of vectors in this backend's namespace.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support count")
+
+    def namespaces(self) -> List[str]:
+        raise NotImplementedError(f"{type(self).__name__} does not support namespaces")
+
+    def drop_namespace(self, namespace: str):
+        """
+        Deletes every vector of another namespace of the same index.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support drop_namespace")
+
+    def estimate_record_bytes(self, record_id: str, dimension: int, metadata: Optional[Dict] = None) -> int:
+        """
+        Approximate size of one record on the wire, used to keep chunks under the payload limit.
+        """
+        size = len(record_id) + dimension * 4
+        if metadata:
+            size += len(json.dumps(metadata))
+        return size
+
+    def is_transient(self, error: Exception) -> bool:
+        return isinstance(error, (TransientBackendError, ConnectionError, TimeoutError))
+
+    def close(self):
+        pass
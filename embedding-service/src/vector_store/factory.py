@@ -0,0 +1,40 @@
+from typing import Optional
+
+from src.vector_store.base import VectorBackend
+from src.utils.logging import logging
+
+
+def build_backend(store_cfg, pc_cfg, pool_threads: int = 4, namespace: Optional[str] = None) -> VectorBackend:
+    """
+    Picks the vector store named in vector_store_config.backend.
+    :param store_cfg: VectorStoreConfig
+    :param pc_cfg: PineconeConfig (dimension and metric are shared by every backend)
+    :param namespace: Versioned namespace to read and write (see src/vector_store/versioning.py).
+                      None uses the store's default one.
+    """
+    if store_cfg.backend == "local":
+        from src.vector_store.local_backend import LocalVectorStore
+
+        logging.info(f"Using local vector store at {store_cfg.local_path} (namespace={namespace})")
+        return LocalVectorStore(
+            path=str(store_cfg.local_path),
+            dimension=pc_cfg.dimension,
+            metric=pc_cfg.metric,
+            namespace=namespace
+        )
+
+    if store_cfg.backend == "pinecone":
+        # Imported lazily so local runs don't need the Pinecone client
+        from src.pc_embeds_index import IndexManager
+        from src.vector_store.pinecone_backend import PineconeBackend
+
+        manager = IndexManager(api_key=pc_cfg.api_key, index_name=pc_cfg.index_name)
+        manager.ensure_index_exists(dimension=pc_cfg.dimension, metric=pc_cfg.metric)
+        return PineconeBackend(
+            api_key=pc_cfg.api_key,
+            index_name=pc_cfg.index_name,
+            pool_threads=pool_threads,
+            namespace=namespace or ""
+        )
+
+    raise ValueError(f"Unknown vector store backend '{store_cfg.backend}', expected 'pinecone' or 'local'")
@@ -0,0 +1,408 @@
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.vector_store.base import VectorBackend
+from src.utils.logging import logging
+
+SUPPORTED_METRICS = {"dotproduct", "cosine", "euclidean"}
+
+
+class LocalVectorStore(VectorBackend):
+    """
+    On-disk vector store that needs no external service.
+
+    Layout of `path`:
+      vectors.f32  float32 matrix of shape (capacity, dimension), memory-mapped
+      ids.json     row -> job_id (null for freed rows)
+      meta.json    dimension, metric, capacity
+      metadata.npz / metadata_values.json
+                   per-field metadata columns, see below
+
+    Rows freed by delete() are reused by later upserts. Search is exact and batched.
+
+    Metadata is stored by column rather than as one dict per row: each field is an int32
+    array of codes into that field's list of distinct values (-1 where a row has no value).
+    City, country, remote and employment type have few distinct values, so this costs 4
+    bytes per row and field, and a query filter turns into a vectorized mask over the codes.
+    With a namespace, the files live in `path/<namespace>/` and sibling namespaces are
+    independent stores.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dimension: int = 256,
+        metric: str = "dotproduct",
+        initial_capacity: int = 1024,
+        namespace: Optional[str] = None,
+    ):
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"Unsupported metric '{metric}', expected one of {sorted(SUPPORTED_METRICS)}")
+
+        self.root = Path(path)
+        self.namespace = namespace
+        self.path = self.root / namespace if namespace else self.root
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.metric = metric
+
+        self._vectors_path = self.path / "vectors.f32"
+        self._ids_path = self.path / "ids.json"
+        self._meta_path = self.path / "meta.json"
+        self._metadata_codes_path = self.path / "metadata.npz"
+        self._metadata_values_path = self.path / "metadata_values.json"
+        self._lock = threading.RLock()
+
+        self.row_ids: List[Optional[str]] = []
+        self.id_to_row: Dict[str, int] = {}
+        self._free: List[int] = []
+        # field -> codes per row, field -> distinct values, field -> value key -> code
+        self.metadata_codes: Dict[str, np.ndarray] = {}
+        self.metadata_values: Dict[str, List] = {}
+        self._metadata_lookup: Dict[str, Dict] = {}
+
+        if self._meta_path.exists():
+            self._load()
+        else:
+            self.capacity = max(1, initial_capacity)
+            self._valid = np.zeros(self.capacity, dtype=bool)
+            self._open_vectors(create=True)
+            self.flush()
+
+    def __len__(self) -> int:
+        return len(self.id_to_row)
+
+    # ---- writes ----
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadata: Optional[List[Dict]] = None) -> int:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of shape (n, {self.dimension}), got {vectors.shape}")
+
+        with self._lock:
+            rows = np.empty(len(ids), dtype=np.int64)
+            for i, record_id in enumerate(ids):
+                rows[i] = self._row_for(str(record_id))
+            self.vectors[rows] = vectors
+            # Like Pinecone, an upsert replaces the record's metadata as a whole
+            self._clear_metadata(rows)
+            if metadata:
+                self._set_metadata(rows, metadata)
+        return len(ids)
+
+    def delete(self, ids: List[str]) -> int:
+        deleted = 0
+        with self._lock:
+            for record_id in ids:
+                row = self.id_to_row.pop(str(record_id), None)
+                if row is None:
+                    continue
+                self.row_ids[row] = None
+                self._valid[row] = False
+                self._free.append(row)
+                self._clear_metadata([row])
+                deleted += 1
+        return deleted
+
+    def flush(self):
+        with self._lock:
+            self.vectors.flush()
+            self._write_json(self._ids_path, self.row_ids)
+            self._write_metadata()
+            self._write_json(self._meta_path, {
+                "dimension": self.dimension,
+                "metric": self.metric,
+                "capacity": self.capacity,
+            })
+
+    def close(self):
+        self.flush()
+
+    # ---- namespaces ----
+
+    def namespaces(self) -> List[str]:
+        return sorted(p.name for p in self.root.iterdir() if (p / "meta.json").exists())
+
+    def drop_namespace(self, namespace: str):
+        if namespace == self.namespace:
+            raise ValueError(f"Refusing to drop namespace '{namespace}' while this store has it open")
+        shutil.rmtree(self.root / namespace, ignore_errors=True)
+
+    # ---- reads ----
+
+    def count(self) -> int:
+        return len(self)
+
+    def list_ids(self) -> List[str]:
+        with self._lock:
+            return list(self.id_to_row)
+
+    def fetch(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            return {
+                str(record_id): np.array(self.vectors[self.id_to_row[str(record_id)]])
+                for record_id in ids
+                if str(record_id) in self.id_to_row
+            }
+
+    def fetch_metadata(self, ids: List[str]) -> Dict[str, Dict]:
+        with self._lock:
+            result = {}
+            for record_id in ids:
+                row = self.id_to_row.get(str(record_id))
+                if row is None:
+                    continue
+                result[str(record_id)] = {
+                    field: self.metadata_values[field][codes[row]]
+                    for field, codes in self.metadata_codes.items()
+                    if codes[row] >= 0
+                }
+            return result
+
+    def query(
+        self,
+        vectors: np.ndarray,
+        top_k: int = 10,
+        filter: Optional[Dict] = None,
+        block_rows: int = 65536,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Exact top-k search for a batch of query vectors.
+        Scores follow the store's metric: dot product or cosine similarity (higher is better),
+        or euclidean distance (lower is better). The catalog is scanned in blocks of
+        `block_rows` so the score matrix stays small.
+        :param filter: Metadata filter in Pinecone's syntax, e.g.
+                       {"country": "us", "remote": True, "employment_type": {"$in": ["FULL_TIME", "CONTRACTOR"]}}.
+                       Supports exact values, $eq, $ne, $in, $nin and $and; rows without the field never match.
+                       Only rows passing the filter are scored, so fewer than top_k may come back.
+        """
+        queries = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if self.metric == "cosine":
+            queries = _normalize(queries)
+
+        with self._lock:
+            # Kept up to date by every write, so a query never walks the id list
+            used = len(self.row_ids)
+            valid = self._valid[:used].copy()
+            if filter:
+                valid &= self._filter_mask(filter, used)
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+
+        for start in range(0, used, block_rows):
+            end = min(start + block_rows, used)
+            rows = np.nonzero(valid[start:end])[0] + start
+            if not len(rows):
+                continue
+
+            # Fancy indexing copies the rows; _grow rebinds and drops the memmap under this lock
+            with self._lock:
+                block = self.vectors[rows]
+            block_scores = self._score(queries, block)
+            scores = np.concatenate([best_scores, block_scores], axis=1)
+            candidates = np.concatenate([best_rows, np.broadcast_to(rows, block_scores.shape)], axis=1)
+
+            keep = min(top_k, scores.shape[1])
+            top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(candidates, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+
+        sign = -1.0 if self.metric == "euclidean" else 1.0
+        with self._lock:
+            return [
+                [(self.row_ids[row], float(sign * score)) for row, score in zip(q_rows, q_scores)]
+                for q_rows, q_scores in zip(best_rows, best_scores)
+            ]
+
+    # ---- metadata ----
+
+    def _set_metadata(self, rows: np.ndarray, metadata: List[Dict]):
+        fields = {field for record in metadata if record for field in record}
+        for field in fields:
+            if field not in self.metadata_codes:
+                self.metadata_codes[field] = np.full(self.capacity, -1, dtype=np.int32)
+                self.metadata_values[field] = []
+                self._metadata_lookup[field] = {}
+            codes = np.fromiter(
+                (self._code_for(field, record.get(field)) if record else -1 for record in metadata),
+                dtype=np.int32,
+                count=len(metadata),
+            )
+            self.metadata_codes[field][rows] = codes
+
+    def _clear_metadata(self, rows):
+        for codes in self.metadata_codes.values():
+            codes[rows] = -1
+
+    def _code_for(self, field: str, value) -> int:
+        if value is None:
+            return -1
+        lookup = self._metadata_lookup[field]
+        key = _value_key(value)
+        code = lookup.get(key)
+        if code is None:
+            code = len(self.metadata_values[field])
+            self.metadata_values[field].append(value)
+            lookup[key] = code
+        return code
+
+    def _filter_mask(self, filter: Dict, used: int) -> np.ndarray:
+        mask = np.ones(used, dtype=bool)
+        for field, condition in filter.items():
+            if field == "$and":
+                for clause in condition:
+                    mask &= self._filter_mask(clause, used)
+                continue
+            if field.startswith("$"):
+                raise ValueError(f"Unsupported filter operator '{field}'")
+
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            codes = self.metadata_codes.get(field)
+            codes = codes[:used] if codes is not None else np.full(used, -1, dtype=np.int32)
+            for op, operand in condition.items():
+                mask &= self._condition_mask(field, codes, op, operand)
+        return mask
+
+    def _condition_mask(self, field: str, codes: np.ndarray, op: str, operand) -> np.ndarray:
+        lookup = self._metadata_lookup.get(field, {})
+        if op in ("$eq", "$ne"):
+            wanted = np.array([lookup.get(_value_key(operand), -2)], dtype=np.int32)
+        elif op in ("$in", "$nin"):
+            wanted = np.array([lookup.get(_value_key(v), -2) for v in operand], dtype=np.int32)
+        else:
+            raise ValueError(f"Unsupported filter operator '{op}' on field '{field}'")
+
+        matches = np.isin(codes, wanted)
+        if op in ("$eq", "$in"):
+            return matches
+        return (codes >= 0) & ~matches
+
+    def _write_metadata(self):
+        used = len(self.row_ids)
+        tmp_path = self._metadata_codes_path.with_suffix(".npz.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **{field: codes[:used] for field, codes in self.metadata_codes.items()})
+        os.replace(tmp_path, self._metadata_codes_path)
+        self._write_json(self._metadata_values_path, self.metadata_values)
+
+    def _load_metadata(self):
+        if not self._metadata_codes_path.exists():
+            return
+        with open(self._metadata_values_path, "r") as f:
+            self.metadata_values = json.load(f)
+        with np.load(self._metadata_codes_path) as saved:
+            for field in saved.files:
+                codes = np.full(self.capacity, -1, dtype=np.int32)
+                codes[:len(saved[field])] = saved[field]
+                self.metadata_codes[field] = codes
+        self._metadata_lookup = {
+            field: {_value_key(value): code for code, value in enumerate(values)}
+            for field, values in self.metadata_values.items()
+        }
+
+    # ---- internals ----
+
+    def _score(self, queries: np.ndarray, block: np.ndarray) -> np.ndarray:
+        if self.metric == "dotproduct":
+            return queries @ block.T
+        if self.metric == "cosine":
+            return queries @ _normalize(block).T
+        # euclidean: negate the squared distance so that higher is better everywhere
+        sq = (queries ** 2).sum(axis=1, keepdims=True) - 2 * queries @ block.T + (block ** 2).sum(axis=1)
+        return -np.sqrt(np.maximum(sq, 0.0))
+
+    def _row_for(self, record_id: str) -> int:
+        row = self.id_to_row.get(record_id)
+        if row is not None:
+            return row
+
+        if self._free:
+            row = self._free.pop()
+            self.row_ids[row] = record_id
+        else:
+            row = len(self.row_ids)
+            if row >= self.capacity:
+                self._grow(max(self.capacity * 2, row + 1))
+            self.row_ids.append(record_id)
+
+        self.id_to_row[record_id] = row
+        self._valid[row] = True
+        return row
+
+    def _grow(self, capacity: int):
+        self.vectors.flush()
+        del self.vectors
+        with open(self._vectors_path, "r+b") as f:
+            f.truncate(capacity * self.dimension * 4)
+        for field, codes in self.metadata_codes.items():
+            grown = np.full(capacity, -1, dtype=np.int32)
+            grown[:len(codes)] = codes
+            self.metadata_codes[field] = grown
+        valid = np.zeros(capacity, dtype=bool)
+        valid[:len(self._valid)] = self._valid
+        self._valid = valid
+        self.capacity = capacity
+        self._open_vectors(create=False)
+        logging.info(f"Grew local vector store to {capacity} rows")
+
+    def _open_vectors(self, create: bool):
+        self.vectors = np.memmap(
+            self._vectors_path,
+            dtype=np.float32,
+            mode="w+" if create else "r+",
+            shape=(self.capacity, self.dimension),
+        )
+
+    def _load(self):
+        with open(self._meta_path, "r") as f:
+            meta = json.load(f)
+
+        if meta["dimension"] != self.dimension or meta["metric"] != self.metric:
+            raise ValueError(
+                f"Local store at {self.path} was created with dimension={meta['dimension']} "
+                f"metric={meta['metric']}, not dimension={self.dimension} metric={self.metric}"
+            )
+
+        self.capacity = meta["capacity"]
+        self._open_vectors(create=False)
+
+        with open(self._ids_path, "r") as f:
+            self.row_ids = json.load(f)
+        self._valid = np.zeros(self.capacity, dtype=bool)
+        self._valid[:len(self.row_ids)] = [record_id is not None for record_id in self.row_ids]
+        for row, record_id in enumerate(self.row_ids):
+            if record_id is None:
+                self._free.append(row)
+            else:
+                self.id_to_row[record_id] = row
+        self._load_metadata()
+        logging.info(f"Opened local vector store at {self.path} with {len(self.id_to_row)} vectors")
+
+    @staticmethod
+    def _write_json(path: Path, payload):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+
+def _value_key(value):
+    # True == 1 in a dict, so keep the type in the key to tell a bool from a number
+    return (type(value).__name__, value)
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
@@ -0,0 +1,63 @@
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.vector_store.base import TransientBackendError, VectorBackend
+
+
+class InMemoryBackend(VectorBackend):
+    """
+    In-process stand-in for a vector DB. Useful to exercise VectorWriter
+    (chunking, concurrency, retries) without a live service.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        """
+        :param latency: Seconds each upsert call sleeps, to mimic a network round-trip.
+        :param failure_rate: Probability that a call raises TransientBackendError.
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.vectors: Dict[str, np.ndarray] = {}
+        self.metadata: Dict[str, Dict] = {}
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadata: Optional[List[Dict]] = None) -> int:
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.failure_rate
+
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise TransientBackendError("simulated transient failure")
+
+        with self._lock:
+            for i, record_id in enumerate(ids):
+                self.vectors[str(record_id)] = np.array(vectors[i], dtype=np.float32)
+                if metadata:
+                    self.metadata[str(record_id)] = metadata[i]
+        return len(ids)
+
+    def delete(self, ids: List[str]) -> int:
+        with self._lock:
+            deleted = [str(i) for i in ids if self.vectors.pop(str(i), None) is not None]
+            for record_id in deleted:
+                self.metadata.pop(record_id, None)
+        return len(deleted)
+
+    def list_ids(self) -> List[str]:
+        with self._lock:
+            return list(self.vectors)
+
+    def fetch(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            return {str(i): self.vectors[str(i)] for i in ids if str(i) in self.vectors}
+
+    def count(self) -> int:
+        return len(self.vectors)
@@ -0,0 +1,85 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pinecone import Pinecone
+
+from src.vector_store.base import VectorBackend
+
+# Pinecone answers these when it is throttling or briefly unavailable
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class PineconeBackend(VectorBackend):
+    def __init__(self, api_key: str, index_name: str, pool_threads: int = 4, namespace: str = ""):
+        """
+        :param pool_threads: Size of the client's shared HTTP connection pool.
+                             Should match the writer's parallelism.
+        :param namespace: Namespace every read and write goes to ("" is Pinecone's default).
+        """
+        self.pc = Pinecone(api_key=api_key)
+        self.index = self.pc.Index(index_name, pool_threads=pool_threads)
+        self.namespace = namespace or ""
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadata: Optional[List[Dict]] = None) -> int:
+        # One tolist() per chunk is much cheaper than one per vector
+        values = vectors.tolist()
+
+        records = []
+        for i in range(len(ids)):
+            record = {"id": str(ids[i]), "values": values[i]}
+            if metadata:
+                record["metadata"] = metadata[i]
+            records.append(record)
+
+        response = self.index.upsert(vectors=records, namespace=self.namespace)
+        return response["upserted_count"]
+
+    def delete(self, ids: List[str]) -> int:
+        self.index.delete(ids=[str(i) for i in ids], namespace=self.namespace)
+        return len(ids)
+
+    def fetch(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        response = self.index.fetch(ids=[str(i) for i in ids], namespace=self.namespace)
+        return {
+            record_id: np.asarray(record.values, dtype=np.float32)
+            for record_id, record in response.vectors.items()
+        }
+
+    def query(self, vectors: np.ndarray, top_k: int = 10, filter: Optional[Dict] = None) -> List[List[Tuple[str, float]]]:
+        results = []
+        for vector in np.atleast_2d(vectors).tolist():
+            response = self.index.query(vector=vector, top_k=top_k, namespace=self.namespace, filter=filter)
+            results.append([(match.id, match.score) for match in response.matches])
+        return results
+
+    def list_ids(self) -> List[str]:
+        # Paginated id listing; only serverless indexes support it
+        ids = []
+        for page in self.index.list(namespace=self.namespace):
+            ids.extend(page)
+        return ids
+
+    def count(self) -> int:
+        # Index stats are eventually consistent; they can trail the latest upserts by a few seconds
+        stats = self.index.describe_index_stats()
+        namespace = stats.namespaces.get(self.namespace)
+        return namespace.vector_count if namespace else 0
+
+    def namespaces(self) -> List[str]:
+        return list(self.index.describe_index_stats().namespaces)
+
+    def drop_namespace(self, namespace: str):
+        self.index.delete(delete_all=True, namespace=namespace)
+
+    def estimate_record_bytes(self, record_id: str, dimension: int, metadata: Optional[Dict] = None) -> int:
+        # Values travel as JSON text, roughly 12 bytes per float32
+        return super().estimate_record_bytes(record_id, dimension, metadata) + dimension * 8
+
+    def is_transient(self, error: Exception) -> bool:
+        if super().is_transient(error):
+            return True
+        status = getattr(error, "status", None)
+        if status in TRANSIENT_STATUS_CODES:
+            return True
+        # urllib3 connection errors are wrapped differently across client versions
+        return type(error).__name__ in {"MaxRetryError", "ProtocolError", "ReadTimeoutError", "NewConnectionError"}
@@ -0,0 +1,196 @@
+import json
+import os
+import random
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.vector_store.base import VectorBackend
+from src.utils.logging import logging
+
+
+def version_namespace(prefix: str, model_version: str) -> str:
+    """
+    Namespace a model version's catalog is written to, e.g. "model-v3".
+    """
+    return f"{prefix}{model_version}"
+
+
+class IndexAliases:
+    """
+    Maps an alias (what readers ask for) to the namespace currently published under it.
+
+    Stored as one small JSON file that writers replace atomically, so a reader always sees
+    either the old or the new namespace, never a mix. The file is re-read on every
+    resolve(), which lets long-running readers pick up a switch without a restart.
+
+      {"job-embeddings": {"namespace": "model-v3", "switched_at": 1700000000.0,
+                          "history": ["model-v1", "model-v2", "model-v3"]}}
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def resolve(self, alias: str) -> Optional[str]:
+        entry = self._read().get(alias)
+        return entry["namespace"] if entry else None
+
+    def history(self, alias: str) -> List[str]:
+        entry = self._read().get(alias)
+        return list(entry["history"]) if entry else []
+
+    def switch(self, alias: str, namespace: str) -> Optional[str]:
+        """
+        Points the alias at `namespace` and returns the namespace it pointed at before.
+        """
+        aliases = self._read()
+        entry = aliases.get(alias, {"namespace": None, "history": []})
+        previous = entry["namespace"]
+
+        history = [ns for ns in entry["history"] if ns != namespace] + [namespace]
+        aliases[alias] = {"namespace": namespace, "switched_at": time.time(), "history": history}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(aliases, f, indent=2)
+        os.replace(tmp_path, self.path)
+        return previous
+
+    def _read(self) -> Dict:
+        if not self.path.exists():
+            return {}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+
+def verify_namespace(
+    backend: VectorBackend,
+    expected_ids: Sequence[str],
+    sample_size: int = 100,
+    timeout: float = 120.0,
+    poll_interval: float = 5.0,
+    norm_tolerance: float = 1e-3,
+):
+    """
+    Checks that a freshly written namespace holds the whole catalog before it goes live:
+      - the vector count reaches the number of source ids (polled, since managed stores
+        report counts with a delay),
+      - a random sample of ids can be fetched and their vectors are finite and L2-normalized.
+    Raises ValueError on the first failed check.
+    """
+    expected = len(set(map(str, expected_ids)))
+    deadline = time.monotonic() + timeout
+    while True:
+        count = backend.count()
+        if count >= expected:
+            break
+        if time.monotonic() >= deadline:
+            raise ValueError(f"Namespace holds {count} vectors, expected at least {expected}")
+        time.sleep(poll_interval)
+
+    sample = random.sample([str(i) for i in expected_ids], min(sample_size, len(expected_ids)))
+    fetched = backend.fetch(sample) if sample else {}
+    missing = [record_id for record_id in sample if record_id not in fetched]
+    if missing:
+        raise ValueError(f"{len(missing)} of {len(sample)} sampled ids are missing, e.g. {missing[:5]}")
+
+    if fetched:
+        vectors = np.stack(list(fetched.values()))
+        if not np.isfinite(vectors).all():
+            raise ValueError("Sampled vectors contain NaN or Inf")
+        norms = np.linalg.norm(vectors, axis=1)
+        if np.abs(norms - 1.0).max() > norm_tolerance:
+            raise ValueError(f"Sampled vectors are not normalized (norms {norms.min():.4f} to {norms.max():.4f})")
+
+    logging.info(f"Verified namespace: {count} vectors, {len(sample)} sampled ids present and normalized")
+
+
+class VersionPublisher:
+    """
+    Blue-green publishing of a catalog: each model version is written to its own namespace
+    while readers keep using the one behind the alias. Only after the new namespace is
+    verified does the alias switch, and then namespaces beyond the newest `keep_versions`
+    are dropped, together with the local artifacts written for them. The previous version
+    is kept by default so a rollback is one switch().
+    """
+
+    def __init__(
+        self,
+        aliases: IndexAliases,
+        alias: str,
+        namespace_prefix: str,
+        keep_versions: int = 2,
+        local_artifacts: Optional[Callable[[str], Sequence[Path]]] = None,
+    ):
+        """
+        :param local_artifacts: Files and directories written for a namespace (manifest, cursor,
+                                local indexes, export); removed when the namespace is dropped.
+        """
+        if keep_versions < 1:
+            raise ValueError("keep_versions must be >= 1")
+        self.aliases = aliases
+        self.alias = alias
+        self.namespace_prefix = namespace_prefix
+        self.keep_versions = keep_versions
+        self.local_artifacts = local_artifacts
+
+    def publish(self, backend: VectorBackend, namespace: str, expected_ids: Sequence[str], **verify_kwargs) -> List[str]:
+        """
+        Verifies `namespace`, switches the alias to it and garbage-collects old versions.
+        Returns the namespaces that were dropped.
+        """
+        verify_namespace(backend, expected_ids, **verify_kwargs)
+        previous = self.aliases.switch(self.alias, namespace)
+        logging.info(f"Alias '{self.alias}' switched from {previous} to {namespace}")
+        return self.collect_garbage(backend)
+
+    def collect_garbage(self, backend: VectorBackend) -> List[str]:
+        keep = set(self.aliases.history(self.alias)[-self.keep_versions:])
+        live = self.aliases.resolve(self.alias)
+        if live:
+            keep.add(live)
+
+        dropped = []
+        for namespace in backend.namespaces():
+            # Only touch namespaces this publisher created
+            if namespace.startswith(self.namespace_prefix) and namespace not in keep:
+                backend.drop_namespace(namespace)
+                dropped.append(namespace)
+        if dropped:
+            logging.info(f"Dropped old catalog versions: {', '.join(sorted(dropped))}")
+
+        if self.local_artifacts is not None:
+            # Also versions whose namespace is already gone from the store
+            retired = set(dropped) | {ns for ns in self.aliases.history(self.alias) if ns not in keep}
+            for namespace in sorted(retired):
+                self._remove_local(namespace)
+        return dropped
+
+    def _remove_local(self, namespace: str):
+        removed = []
+        for path in map(Path, self.local_artifacts(namespace)):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.exists():
+                path.unlink(missing_ok=True)
+            else:
+                continue
+            removed.append(str(path))
+        if removed:
+            logging.info(f"Removed local artifacts of {namespace}: {', '.join(removed)}")
+
+
+def resolve_live_namespace(versioning_cfg) -> Optional[str]:
+    """
+    Namespace readers should query: the alias target when versioning is on, else the default.
+    """
+    if not versioning_cfg.enabled:
+        return None
+    namespace = IndexAliases(str(versioning_cfg.aliases_path)).resolve(versioning_cfg.alias)
+    if namespace is None:
+        raise ValueError(f"Alias '{versioning_cfg.alias}' has not been published yet")
+    return namespace
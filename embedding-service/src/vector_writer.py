@@ -1,43 +1,180 @@
 import logging
-from typing import List, Dict
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
 import numpy as np
-from pinecone import Pinecone
 
+from src.vector_store.base import VectorBackend
 from src.utils.logging import logging
 
 
+@dataclass
+class UpsertReport:
+    """
+    Outcome of one upsert_batch call.
+    chunk_latencies: seconds per chunk, including retries and backoff
+    """
+    upserted: int = 0
+    chunks: int = 0
+    retries: int = 0
+    chunk_latencies: List[float] = field(default_factory=list)
+
+
 class VectorWriter:
-    def __init__(self, api_key: str, index_name: str, dimension: int = 256):
-        self.pc = Pinecone(api_key=api_key)
-        self.index = self.pc.Index(index_name)
+    def __init__(
+        self,
+        backend: VectorBackend,
+        dimension: int = 256,
+        max_records_per_chunk: int = 500,
+        max_payload_bytes: int = 2_000_000,
+        parallelism: int = 4,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        metrics=None,
+    ):
+        """
+        :param backend: Vector store the chunks are sent to (Pinecone, in-memory, ...).
+        :param max_records_per_chunk: Upper bound on vectors per request.
+        :param max_payload_bytes: Upper bound on the estimated request size.
+        :param parallelism: Chunks in flight at once. The thread pool is shared by every
+                            upsert_batch call, so concurrent pipeline workers share it too.
+        :param max_retries: Retries per chunk for transient failures.
+        :param metrics: EmbeddingMetrics to record upsert latency, vectors written, retries and failures into.
+        """
+        self.backend = backend
         self.dimension = dimension
+        self.max_records_per_chunk = max_records_per_chunk
+        self.max_payload_bytes = max_payload_bytes
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="upsert")
 
-    def upsert_batch(self, ids: List[str], vectors: np.ndarray, metadata: List[Dict] = None):
+    def upsert_batch(self, ids: List[str], vectors: np.ndarray, metadata: List[Dict] = None) -> UpsertReport:
         """
-        Formats and sends vectors to the DB.
+        Splits the batch into chunks and sends them concurrently to the DB.
         :param ids: List of unique Job IDs.
         :param vectors: NumPy array of shape (Batch, 256).
         :param metadata: List of dicts (e.g., [{'title': 'Dev', 'loc': 'NY'}, ...]).
         """
-     
+
         if vectors.shape[1] != self.dimension:
             raise ValueError(f"Vector dimension mismatch! DB expects {self.dimension}, got {vectors.shape[1]}")
 
-       
-        records = []
+        started = time.perf_counter()
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        chunks = self._plan_chunks(ids, metadata)
+
+        futures = [
+            self.executor.submit(
+                self._send_chunk,
+                ids[start:end],
+                vectors[start:end],
+                metadata[start:end] if metadata else None,
+            )
+            for start, end in chunks
+        ]
+
+        report = UpsertReport(chunks=len(chunks))
+        errors = []
+        for future in futures:
+            try:
+                upserted, retries, latency = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            report.upserted += upserted
+            report.retries += retries
+            report.chunk_latencies.append(latency)
+
+        if self.metrics is not None:
+            self.metrics.upsert_seconds.observe(time.perf_counter() - started)
+            self.metrics.vectors_written.inc(report.upserted)
+            self.metrics.upsert_retries.inc(report.retries)
+            self.metrics.upsert_failures.inc(len(errors))
+
+        if errors:
+            logging.error(f"Vector DB Upsert failed for {len(errors)}/{len(chunks)} chunks: {errors[0]}")
+            raise errors[0]
+
+        logging.info(
+            f"Successfully upserted {report.upserted} vectors in {report.chunks} chunks "
+            f"(retries={report.retries}, max chunk latency={max(report.chunk_latencies, default=0.0):.3f}s)"
+        )
+        return report
+
+    def delete_ids(self, ids: List[str], batch_size: int = 1000) -> int:
+        """
+        Deletes ids in batches of `batch_size` (Pinecone accepts up to 1000 per request),
+        sent concurrently on the upsert pool with the same retry policy.
+        Raises the first error after every batch has been attempted; returns the count deleted.
+        """
+        futures = [
+            self.executor.submit(self._with_retries, self.backend.delete, ids[start:start + batch_size])
+            for start in range(0, len(ids), batch_size)
+        ]
+
+        deleted, errors = 0, []
+        for future in futures:
+            try:
+                count, _, _ = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            deleted += count
+
+        if errors:
+            logging.error(f"Vector DB delete failed for {len(errors)}/{len(futures)} batches: {errors[0]}")
+            raise errors[0]
+        return deleted
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.backend.close()
+
+    def _plan_chunks(self, ids: List[str], metadata: Optional[List[Dict]]) -> List[Tuple[int, int]]:
+        """
+        Greedy split into [start, end) ranges bounded by record count and estimated payload size.
+        """
+        chunks = []
+        start, size = 0, 0
         for i in range(len(ids)):
-            record = {
-                "id": str(ids[i]),
-                "values": vectors[i].tolist(), 
-            }
-            if metadata:
-                record["metadata"] = metadata[i]
-            records.append(record)
-
-      
-        try:
-            response = self.index.upsert(vectors=records)
-            logging.info(f"Successfully upserted {response['upserted_count']} vectors.")
-        except Exception as e:
-            logging.error(f"Vector DB Upsert failed: {e}")
-            raise
\ No newline at end of file
+            record_bytes = self.backend.estimate_record_bytes(
+                str(ids[i]), self.dimension, metadata[i] if metadata else None
+            )
+            full = (i - start) >= self.max_records_per_chunk or size + record_bytes > self.max_payload_bytes
+            if full and i > start:
+                chunks.append((start, i))
+                start, size = i, 0
+            size += record_bytes
+
+        if start < len(ids):
+            chunks.append((start, len(ids)))
+        return chunks
+
+    def _send_chunk(self, ids: List[str], vectors: np.ndarray, metadata: Optional[List[Dict]]) -> Tuple[int, int, float]:
+        return self._with_retries(self.backend.upsert, ids, vectors, metadata)
+
+    def _with_retries(self, call, *args) -> Tuple[int, int, float]:
+        """
+        Runs one backend request, retrying transient failures with jittered exponential backoff.
+        Returns (result, retries, seconds including backoff).
+        """
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                result = call(*args)
+                return result, attempt, time.perf_counter() - started
+            except Exception as e:
+                if attempt >= self.max_retries or not self.backend.is_transient(e):
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                delay *= random.uniform(0.5, 1.0)  # jitter so parallel chunks don't retry in lockstep
+                attempt += 1
+                logging.warning(f"Transient {call.__name__} failure ({e}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
@@ -0,0 +1,65 @@
+import pytest
+import torch
+import torch.nn as nn
+
+from src.inference_export import fold_batchnorm, fuse_tower, verify_parity
+from src.two_tower_training.src_retriever.two_tower.retriver_model_archi import Tower
+
+
+def _populate_batchnorm(tower: nn.Module, input_dim: int, seed: int = 0) -> nn.Module:
+    """
+    Gives every BatchNorm non-trivial affine parameters and running statistics, as after training.
+    """
+    torch.manual_seed(seed)
+    for module in tower.modules():
+        if isinstance(module, nn.BatchNorm1d):
+            with torch.no_grad():
+                module.weight.uniform_(0.5, 2.0)
+                module.bias.uniform_(-1.0, 1.0)
+    tower.train()
+    with torch.no_grad():
+        for _ in range(20):
+            tower(torch.randn(64, input_dim) * 3.0 + 1.0)
+    return tower.eval()
+
+
+def test_fold_batchnorm_matches_linear_then_batchnorm():
+    linear, bn = nn.Linear(16, 8), nn.BatchNorm1d(8)
+    reference = _populate_batchnorm(nn.Sequential(linear, bn), 16)
+    x = torch.randn(32, 16)
+    with torch.no_grad():
+        assert torch.allclose(fold_batchnorm(linear, bn)(x), reference(x), atol=1e-5)
+
+
+def test_fused_tower_matches_unfused_eval_output():
+    tower = _populate_batchnorm(Tower(input_dim=24, hidden_dims=[32, 16], output_dim=8), 24)
+    fused = fuse_tower(tower)
+
+    assert not any(isinstance(m, (nn.BatchNorm1d, nn.Dropout)) for m in fused.modules())
+    x = torch.randn(128, 24)
+    with torch.no_grad():
+        assert torch.allclose(fused(x), tower(x), atol=1e-5)
+
+
+def test_batchnorm_right_before_final_projection_is_folded():
+    tower = Tower(input_dim=12, hidden_dims=[20], output_dim=6)
+    # Linear -> BatchNorm1d as the last layers of the MLP, feeding final_projection directly
+    tower.mlp = nn.Sequential(nn.Linear(12, 20), nn.BatchNorm1d(20), nn.ReLU(), nn.Linear(20, 20), nn.BatchNorm1d(20))
+    tower = _populate_batchnorm(tower, 12)
+    fused = fuse_tower(tower)
+
+    assert [type(m) for m in fused] == [nn.Linear, nn.ReLU, nn.Linear, nn.Linear]
+    x = torch.randn(128, 12)
+    with torch.no_grad():
+        assert torch.allclose(fused(x), tower(x), atol=1e-5)
+
+
+def test_verify_parity_rejects_a_drifted_tower():
+    tower = _populate_batchnorm(Tower(input_dim=10, hidden_dims=[16], output_dim=4), 10)
+    fused = fuse_tower(tower)
+    assert verify_parity(tower, fused, 10) < 1e-4
+
+    with torch.no_grad():
+        fused[-1].bias.add_(1.0)
+    with pytest.raises(ValueError):
+        verify_parity(tower, fused, 10)